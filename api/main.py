@@ -1,7 +1,7 @@
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
-from api.routers import auth, ideas, webhooks
+from api.routers import auth, ideas, webhooks, metrics
 from database.connection import init_db
 from config.settings import settings
 import os
@@ -37,3 +37,4 @@ def privacy_page():
 app.include_router(auth.router, prefix="/auth", tags=["Auth"])
 app.include_router(ideas.router, prefix="/ideas", tags=["Ideas"])
 app.include_router(webhooks.router, prefix="/webhooks", tags=["Webhooks"])
+app.include_router(metrics.router, prefix="/metrics", tags=["Metrics"])
@@ -5,6 +5,7 @@ from datetime import datetime, timedelta
 from database.connection import get_db, SessionLocal
 from database.models import User, Idea
 from api.services.scanner import run_scan_for_idea
+from llm.image_prep import PreparedImage, prepare_image
 
 router = APIRouter()
 
@@ -16,13 +17,14 @@ class IdeaSubmission(BaseModel):
     monitor_months: int = 0 # Options: 0 (off), 1, 3
     image_base64: Optional[str] = None # New: Optional visual input
 
-def background_scan_wrapper(idea_id: int, image_base64: str = None):
+def background_scan_wrapper(idea_id: int, image: PreparedImage = None):
     """
     Wrapper to ensure the background task has its own DB session.
+    `image` was already decoded and downscaled by submit_idea - the base64 upload isn't kept.
     """
     db = SessionLocal()
     try:
-        run_scan_for_idea(idea_id, db, image_base64=image_base64)
+        run_scan_for_idea(idea_id, db, image=image)
     finally:
         db.close()
 
@@ -48,6 +50,14 @@ def submit_idea(submission: IdeaSubmission, background_tasks: BackgroundTasks, d
                 detail="Rate limit exceeded. You can submit 3 ideas per 20 minutes. Please try again later."
             )
 
+    # Decode/downscale the upload once, here - the background scan only gets the prepared bytes
+    image = None
+    if submission.image_base64:
+        try:
+            image = prepare_image(submission.image_base64)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=f"Unusable image: {e}")
+
     # Calculate monitoring period
     monitoring_enabled = False
     monitoring_ends_at = None
@@ -68,7 +78,7 @@ def submit_idea(submission: IdeaSubmission, background_tasks: BackgroundTasks, d
     db.refresh(new_idea)
 
     # Trigger background scan - Pass image if provided
-    background_tasks.add_task(background_scan_wrapper, new_idea.id, submission.image_base64)
+    background_tasks.add_task(background_scan_wrapper, new_idea.id, image)
 
     return {
         "message": "Idea received. Scanning started.", 
@@ -93,6 +103,7 @@ def get_user_results(email: str, db: Session = Depends(get_db)):
         results.append({
             "idea_id": idea.id,
             "description": idea.user_description,
+            "partial": bool(idea.scan_partial),
             "competitors": [
                 {
                     "name": c.product_name,
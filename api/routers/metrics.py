@@ -0,0 +1,29 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from llm.metrics import get_llm_metrics
+from llm.key_pool import key_pool_snapshots
+from llm.rate_limiter import rate_limiter_snapshots
+from scrapers.http_client import http_snapshots
+from scrapers.serper_batch import serper_batch_snapshot
+from scrapers.result_cache import scraper_cache_stats
+from scrapers.single_flight import single_flight_stats
+
+router = APIRouter()
+
+@router.get("", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """LLM call counters and histograms in Prometheus text format"""
+    return get_llm_metrics().render_prometheus()
+
+@router.get("/llm")
+def llm_metrics():
+    """Same numbers as JSON, plus the current state of each rate limiter and API key"""
+    return {
+        "calls": get_llm_metrics().snapshot(),
+        "rate_limiters": rate_limiter_snapshots(),
+        "key_pools": key_pool_snapshots(),
+        "scraper_http": http_snapshots(),
+        "serper_batching": serper_batch_snapshot(),
+        "scraper_cache": scraper_cache_stats(),
+        "scraper_single_flight": single_flight_stats()
+    }
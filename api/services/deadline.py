@@ -0,0 +1,79 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+class ScanDeadline:
+    """
+    Time budget for one interactive scan: a total (settings.SCAN_DEADLINE_SECONDS) plus a cap
+    per stage (settings.SCAN_STAGE_BUDGETS - extract / scrape / match / verdict). A stage gets
+    its own cap or whatever is left of the total, whichever is smaller.
+
+    Stages that run out of time keep what they have and call mark_partial(); the scan then
+    saves and emails the best-so-far result and queues a follow-up pass.
+    A total of 0 disables the deadline (every timeout is None).
+    """
+
+    def __init__(self, total: float = None, stage_budgets: dict = None, clock=time.monotonic):
+        self.total = settings.SCAN_DEADLINE_SECONDS if total is None else total
+        self.stage_budgets = stage_budgets if stage_budgets is not None else settings.SCAN_STAGE_BUDGETS
+        self._clock = clock
+        self.started = clock()
+        self._stage_ends = {}
+        self.partial_stages = []  # (stage, detail) for every stage cut short
+
+    @property
+    def enabled(self) -> bool:
+        return self.total > 0
+
+    @property
+    def partial(self) -> bool:
+        return bool(self.partial_stages)
+
+    def remaining(self) -> float:
+        """Seconds left of the total budget (inf when disabled)"""
+        if not self.enabled:
+            return float("inf")
+        return max(0.0, self.started + self.total - self._clock())
+
+    def stage_timeout(self, stage: str):
+        """Seconds `stage` may take from now, or None for no limit. Starts the stage's clock"""
+        if not self.enabled:
+            return None
+        timeout = min(self.stage_budgets.get(stage, self.total), self.remaining())
+        self._stage_ends[stage] = self._clock() + timeout
+        return timeout
+
+    def stage_deadline(self, stage: str):
+        """Like stage_timeout(), as an absolute time.monotonic() value (None for no limit)"""
+        timeout = self.stage_timeout(stage)
+        return None if timeout is None else self._stage_ends[stage]
+
+    def stage_expired(self, stage: str) -> bool:
+        end = self._stage_ends.get(stage)
+        return end is not None and self._clock() >= end
+
+    def mark_partial(self, stage: str, detail: str):
+        self.partial_stages.append((stage, detail))
+        logger.warning(f"[DEADLINE] {stage} cut short after {self._clock() - self.started:.0f}s: {detail}")
+        print(f"⏱️  Deadline: {stage} cut short - {detail}")
+
+    def summary(self) -> dict:
+        return {
+            "elapsed_s": round(self._clock() - self.started, 1),
+            "budget_s": self.total,
+            "partial": [f"{stage}: {detail}" for stage, detail in self.partial_stages],
+        }
+
+def run_with_timeout(timeout, fn, *args, **kwargs):
+    """
+    Call fn in a worker thread and wait at most `timeout` seconds (None = no limit).
+    Raises concurrent.futures.TimeoutError on expiry; the call is abandoned, not killed.
+    """
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        return executor.submit(fn, *args, **kwargs).result(timeout=timeout)
+    finally:
+        executor.shutdown(wait=False)
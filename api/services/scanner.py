@@ -1,17 +1,125 @@
+import asyncio
 import json
 import logging
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from database.models import Idea, Competitor, User
-from llm.matcher import ConceptMatcher
+from llm.matcher import ConceptMatcher, PartialScoringError
+from llm.concept_cache import ConceptCache
+from api.services.deadline import ScanDeadline, run_with_timeout
+from llm.early_stop import EarlyStopPolicy
+from llm.image_prep import PreparedImage, prepare_image
+from llm.ranker import LexicalRanker
+from llm.similarity_memo import SimilarityMemo
+from llm.rate_limiter import PRIORITY_INTERACTIVE
 from scrapers.registry import ScraperRegistry
+from scrapers.complaints import ComplaintFinder
+from scrapers.query_planner import QueryPlanner
+from scrapers.canonical import product_key
 from config.settings import settings
 from notifications.email import EmailService
 
 logger = logging.getLogger(__name__)
 
-def run_scan_for_idea(idea_id: int, db: Session, image_base64: str = None):
+async def _verdict_and_gaps(matcher, complaint_finder, idea, concepts, top_competitors, gap_targets, cached_complaints, to_search, deadline: ScanDeadline = None) -> tuple:
+    """
+    Verdict and Gap Hunter concurrently - the verdict call overlaps the complaint searches.
+    Returns (verdict, gap_analysis, freshly searched snippet lists aligned with to_search).
+    Failures are logged and yield None, never fail the scan. Whatever hasn't finished when the
+    deadline's verdict budget runs out is abandoned (None).
+    """
+    searched = []
+
+    async def verdict_task():
+        if not settings.ENABLE_VERDICT:
+            return None
+        try:
+            logger.info(f"[VERDICT] Generating AI verdict")
+            print("Generating AI Verdict...")
+            competitor_dicts = [
+                {"product_name": c.product_name, "similarity_score": c.similarity_score}
+                for c in top_competitors
+            ]
+            verdict = await matcher.agenerate_verdict(concepts.get('core_function', idea.user_description), competitor_dicts)
+            logger.info(f"[VERDICT] {verdict[:100]}...")
+            print(f"Verdict: {verdict}")
+            return verdict
+        except Exception as e:
+            logger.error(f"[VERDICT] Generation failed: {e}")
+            print(f"Verdict generation ERROR: {e}")
+            return None
+
+    async def gap_task():
+        nonlocal searched
+        if not gap_targets:
+            return None
+        try:
+            # The "Hate Search" - parallel Google searches for negative sentiment, off the event loop.
+            # Own executor, so an abandoned search doesn't hold up asyncio.run()'s shutdown
+            executor = ThreadPoolExecutor(max_workers=1)
+            try:
+                searched = await asyncio.get_running_loop().run_in_executor(executor, complaint_finder.search_all, to_search)
+            finally:
+                executor.shutdown(wait=False)
+            fresh = {c.product_name: snippets for c, snippets in zip(to_search, searched)}
+
+            complaints = {}
+            for comp in gap_targets:
+                snippets = cached_complaints.get(comp.product_name) or fresh.get(comp.product_name)
+                if snippets:
+                    complaints[comp.product_name] = snippets
+
+            if not complaints:
+                logger.warning(f"[GAP_HUNT] No complaint snippets found")
+                print("Gap Hunter: No complaint snippets found.")
+                return None
+
+            gap_analysis = await matcher.aanalyze_gaps_across(idea.user_description, complaints)
+            logger.info(f"[GAP_HUNT] Analysis across {len(complaints)} competitors complete: {gap_analysis[:100]}...")
+            print(f"Gap Analysis: {gap_analysis}")
+            return gap_analysis
+        except Exception as e:
+            logger.error(f"[GAP_HUNT] Failed: {e}")
+            print(f"Gap Hunter Error: {e}")
+            return None
+
+    tasks = [asyncio.ensure_future(verdict_task()), asyncio.ensure_future(gap_task())]
+    done, pending = await asyncio.wait(tasks, timeout=deadline.stage_timeout("verdict") if deadline else None)
+    for task in pending:
+        task.cancel()
+    if pending:
+        unfinished = [name for name, task in zip(("verdict", "gap analysis"), tasks) if task in pending]
+        deadline.mark_partial("verdict", f"abandoned {', '.join(unfinished)}")
+    verdict, gap_analysis = [task.result() if task in done else None for task in tasks]
+    return verdict, gap_analysis, searched
+
+def _record_scan_outcome(idea: Idea, deadline: ScanDeadline, db: Session, followup: bool) -> bool:
+    """
+    Save whether the scan was cut short and, if it left products unscraped/unscored, when the
+    follow-up pass should pick up the rest (at most one follow-up per scan). Returns True if queued.
+    """
+    idea.scan_partial = deadline.partial
+    needs_followup = any(stage != "verdict" for stage, _ in deadline.partial_stages)
+    queue = needs_followup and not followup
+    idea.followup_scan_at = datetime.utcnow() + timedelta(minutes=settings.SCAN_FOLLOWUP_DELAY_MINUTES) if queue else None
+    db.commit()
+    if queue:
+        logger.info(f"[DEADLINE] Follow-up scan queued for {idea.followup_scan_at:%H:%M} UTC")
+    return queue
+
+def run_followup_scans(db: Session) -> int:
+    """Finish scans that hit their deadline, once their follow-up time has come. Returns how many ran"""
+    due = db.query(Idea).filter(Idea.followup_scan_at != None, Idea.followup_scan_at <= datetime.utcnow()).all()
+    for idea in due:
+        idea.followup_scan_at = None
+        db.commit()
+        logger.info(f"[FOLLOWUP] Resuming partial scan for Idea #{idea.id}")
+        run_scan_for_idea(idea.id, db, followup=True)
+    return len(due)
+
+def run_scan_for_idea(idea_id: int, db: Session, image_base64: str = None, image: PreparedImage = None, followup: bool = False):
     """
     Orchestrates the full scanning process for a single idea:
     1. Extract concepts (if not already done)
@@ -20,6 +128,10 @@ def run_scan_for_idea(idea_id: int, db: Session, image_base64: str = None):
     4. Calculate similarity
     5. Save results
     6. Send email if new competitors found
+
+    Every stage runs against a ScanDeadline. Stages that run out of time keep what they have;
+    the partial result is saved and emailed, and a follow-up pass is queued for the rest
+    (followup=True for that pass - memoized scores make it pick up where this one stopped).
     """
     logger.info(f"{'='*80}")
     logger.info(f"[SCAN_START] Idea #{idea_id}")
@@ -32,14 +144,41 @@ def run_scan_for_idea(idea_id: int, db: Session, image_base64: str = None):
             return
 
         logger.info(f"[IDEA] {idea.user_description[:150]}...")
-        matcher = ConceptMatcher()
+        # A user is waiting on this scan - its LLM calls go ahead of monitoring/backfill work
+        matcher = ConceptMatcher(priority=PRIORITY_INTERACTIVE, tenant=idea.user_id)
         scraper_registry = ScraperRegistry()
+        deadline = ScanDeadline()
 
         # 1. Concept Extraction (only if not already extracted)
         if not idea.extracted_concepts:
-            logger.info(f"[CONCEPTS] Extracting concepts (Image: {bool(image_base64)})")
-            print(f"Extracting concepts for Idea #{idea.id} (Image provided: {bool(image_base64)})")
-            concepts = matcher.extract_concepts(idea.user_description, image_base64)
+            # Decode/downscale the upload once - the concept cache and the LLM call share the result
+            if image is None and image_base64:
+                try:
+                    image = prepare_image(image_base64)
+                except ValueError as e:
+                    logger.warning(f"[IMAGE_PREP] Ignoring unusable image: {e}")
+            if image:
+                logger.info(
+                    f"[IMAGE_PREP] {image.mime_type}, saved {image.bytes_saved / 1024:.0f}KB "
+                    f"in {image.elapsed * 1000:.0f}ms"
+                )
+
+            # Identical / near-identical ideas (resubmissions, popular ideas) reuse earlier extractions
+            concept_cache = ConceptCache(db)
+            concepts, hit_type = concept_cache.lookup(idea.user_description, image)
+            if concepts:
+                logger.info(f"[CONCEPTS] Reusing {hit_type} match from concept cache")
+            else:
+                logger.info(f"[CONCEPTS] Extracting concepts (Image: {bool(image)})")
+                print(f"Extracting concepts for Idea #{idea.id} (Image provided: {bool(image)})")
+                try:
+                    concepts = run_with_timeout(deadline.stage_timeout("extract"), matcher.extract_concepts, idea.user_description, image=image)
+                except FuturesTimeout:
+                    # Nothing to search for yet - leave the whole scan to the follow-up pass
+                    deadline.mark_partial("extract", "concept extraction did not finish")
+                    _record_scan_outcome(idea, deadline, db, followup)
+                    return
+                concept_cache.store(idea.user_description, concepts, image)
             idea.extracted_concepts = json.dumps(concepts)
             if 'negative_keywords' in concepts:
                 idea.negative_keywords = json.dumps(concepts['negative_keywords'])
@@ -59,107 +198,137 @@ def run_scan_for_idea(idea_id: int, db: Session, image_base64: str = None):
             logger.warning(f"[SCAN_ABORT] No search keywords for idea {idea_id}")
             return
 
-        # 2. Scrape Sources
-        query = " ".join(search_keywords[:3])
-        logger.info(f"[SCRAPE] Query: '{query}'")
-        
+        # 2. Scrape Sources - several focused queries per source, fused by reciprocal rank
         all_scrapers = scraper_registry.get_all_scrapers()
-        raw_results = []
-
+        planner = QueryPlanner()
         logger.info(f"[SCRAPE] Running {len(all_scrapers)} scrapers in parallel")
 
-        # Run scrapers in parallel (Optional optimization, but good practice)
-        with ThreadPoolExecutor(max_workers=len(all_scrapers)) as executor:
-            futures = {executor.submit(scraper.search, query): name for name, scraper in all_scrapers}
-
-            for future in as_completed(futures):
-                scraper_name = futures[future]
-                try:
-                    logger.info(f"[SCRAPE] {scraper_name} - Starting")
-                    print(f"Starting {scraper_name} scraper...")
-                    results = future.result()
-                    logger.info(f"[SCRAPE] {scraper_name} - Found {len(results)} results")
-                    print(f"{scraper_name}: Found {len(results)} results")
-                    for r in results:
-                        r['source'] = scraper_name
-                    raw_results.extend(results)
-                except Exception as e:
-                    logger.error(f"[SCRAPE] {scraper_name} - FAILED: {e}")
-                    print(f"ERROR in {scraper_name}: {e}")
+        # Searches still running when the scrape budget runs out are abandoned
+        fanout = planner.search(all_scrapers, search_keywords, timeout=deadline.stage_timeout("scrape"))
+        logger.info(f"[SCRAPE] {len(fanout.queries)} queries: {sorted({q for _, q in fanout.queries})}")
+        for scraper_name, results in sorted(fanout.found.items()):
+            logger.info(f"[SCRAPE] {scraper_name} - Found {len(results)} results")
+            print(f"{scraper_name}: Found {len(results)} results")
+        for scraper_name, query, error in fanout.failed:
+            logger.error(f"[SCRAPE] {scraper_name} - FAILED ('{query}'): {error}")
+            print(f"ERROR in {scraper_name}: {error}")
+        if fanout.abandoned:
+            slow = sorted({name for name, _ in fanout.abandoned})
+            deadline.mark_partial("scrape", f"abandoned {', '.join(slow)}")
+        raw_results = fanout.products
+        logger.info(f"[SCRAPE] {sum(len(r) for r in fanout.found.values())} results, {len(raw_results)} distinct products")
 
         # 3. Filter Noise
         logger.info(f"[FILTER] Total scraped: {len(raw_results)} products")
         clean_results = matcher.filter_noise(raw_results, negative_keywords)
         logger.info(f"[FILTER] After noise removal: {len(clean_results)} products")
 
+        # Rank locally (BM25 vs extracted concepts) so the LLM budget goes to the best candidates,
+        # not just whichever scrapers finished first
+        clean_results = LexicalRanker().rank(concepts, clean_results)
+        if clean_results:
+            logger.info(f"[RANK] Top candidate: {clean_results[0].get('name', 'Unknown')[:50]} (rank {clean_results[0]['rank_score']})")
+
+        # Candidates the local relevance model is sure about never reach the LLM (or use up a slot)
+        clean_results = matcher.skip_irrelevant(concepts, clean_results)
+
         # Limit to top 15 products
         MAX_PRODUCTS = 15
         if len(clean_results) > MAX_PRODUCTS:
             logger.info(f"[FILTER] Limiting to top {MAX_PRODUCTS} products (had {len(clean_results)})")
             clean_results = clean_results[:MAX_PRODUCTS]
 
-        # 4. Calculate Similarity & Save (Parallelized)
+        # 4. Calculate Similarity & Save (Batched - N products per LLM call, batches awaited concurrently)
         new_competitors = []
         matching_failures = []
-        logger.info(f"[MATCH] Starting similarity matching for {len(clean_results)} products")
-        print(f"Starting parallel similarity matching for {len(clean_results)} products...")
-
-        def process_product(product):
-            # Skip if URL already exists for this idea (deduplication)
-            # Note: DB check inside thread is tricky with shared session.
-            # Ideally check before, but for MVP valid to just proceed or create new session.
-            # We will trust the outer loop filtered duplicates or just re-check later.
-            # Actually, let's just run the LLM check.
 
+        # Skip products already saved for this idea (deduplication by canonical product key, so a
+        # tracking-parameter or other-marketplace variant of a saved listing isn't re-scored)
+        saved_keys = {product_key(url) for (url,) in db.query(Competitor.url).filter(Competitor.idea_id == idea.id)}
+        to_match = [p for p in clean_results if product_key(p.get('url')) not in saved_keys]
+
+        # Reuse scores from previous scans of this idea against unchanged listings
+        memo = SimilarityMemo(db, idea.user_description)
+        similarities, missing = memo.lookup(to_match)
+        to_score = [to_match[i] for i in missing]
+        logger.info(f"[MEMO] Reusing {len(to_match) - len(to_score)}/{len(to_match)} scores from previous scans")
+
+        logger.info(f"[MATCH] Starting batched similarity matching for {len(to_score)} products (batch size {settings.SIMILARITY_BATCH_SIZE})")
+        print(f"Starting batched similarity matching for {len(to_score)} products...")
+
+        # Best-ranked candidates first; stop early once the policy says the rest isn't worth the quota
+        policy = EarlyStopPolicy() if settings.EARLY_STOP_ENABLED else None
+        known_scores = [s.get('score', 0) for s in similarities if s is not None]
+        batch_failed = False
+        scored_count = len(to_score)
+        try:
+            if not to_score:
+                fresh = []
+            else:
+                fresh, scored_count = asyncio.run(matcher.acalculate_similarity_ranked(
+                    idea.user_description, to_score, policy, known_scores, deadline=deadline.stage_deadline("match")
+                ))
+        except Exception as e:
+            # A batch call failed (rate limit / API error) - keep whatever the other batches scored
+            if isinstance(e, PartialScoringError):
+                fresh, scored_count = e.results, e.scored
+            else:
+                fresh = [None] * len(to_score)
+            unscored_count = sum(1 for similarity in fresh[:scored_count] if similarity is None)
+            error_msg = f"{e} ({unscored_count}/{len(to_score)} products unscored)"
+            logger.error(f"[MATCH] Batch matching failed: {error_msg}")
+            print(f"Error matching products: {error_msg}")
+            if "429" in error_msg or "quota" in error_msg.lower() or "rate limit" in error_msg.lower():
+                logger.error(f"[MATCH] RATE LIMIT DETECTED - Stopping")
+                print("⚠️  RATE LIMIT DETECTED - Stopping further matching")
+            matching_failures.append(error_msg)
+            batch_failed = True
+
+        skipped = set(missing[scored_count:])
+        if skipped:
+            logger.info(f"[EARLY_STOP] Scored {scored_count}/{len(to_score)} products - skipped {len(skipped)} lower-ranked")
+
+        # Products the deadline cut off aren't failures - the follow-up pass scores them
+        unscored = [i for i, similarity in zip(missing, fresh) if similarity is None and i not in skipped]
+        if unscored and not batch_failed and deadline.stage_expired("match"):
+            skipped.update(unscored)
+            deadline.mark_partial("match", f"{len(unscored)}/{len(to_score)} products unscored")
+
+        # Memoize every fresh score - matches and non-matches - for the next scan
+        for i, similarity in zip(missing, fresh):
+            similarities[i] = similarity
+            if similarity is not None:
+                memo.store(to_match[i], similarity)
+        db.commit()
+
+        for i, (product, similarity) in enumerate(zip(to_match, similarities)):
             product_name = product.get('name', 'Unknown')[:50]
-            logger.info(f"[MATCH] Processing: {product_name}...")
-            print(f"Matching: {product.get('name', 'Unknown')[:30]}...")
-            similarity = matcher.calculate_similarity(idea.user_description, product)
-            logger.info(f"[MATCH] {product_name} - Score: {similarity.get('score', 0)}%")
-            return product, similarity
-
-        # Use ThreadPool for LLM calls
-        with ThreadPoolExecutor(max_workers=1) as executor:
-            future_to_product = {
-                executor.submit(process_product, p): p
-                for p in clean_results
-                # Pre-check DB to avoid unnecessary threads
-                if not db.query(Competitor).filter(Competitor.idea_id == idea.id, Competitor.url == p.get('url')).first()
-            }
-
-            for future in as_completed(future_to_product):
-                try:
-                    product, similarity = future.result()
-
-                    if similarity.get('score', 0) >= settings.SIMILARITY_THRESHOLD:
-                        competitor = Competitor(
-                            idea_id=idea.id,
-                            product_name=product.get('name'),
-                            source=product.get('source'),
-                            url=product.get('url'),
-                            price=product.get('price'),
-                            similarity_score=similarity.get('score'),
-                            reasoning=similarity.get('reasoning'),
-                            is_relevant=None
-                        )
-                        new_competitors.append(competitor)
-                except Exception as e:
-                    error_msg = str(e)
-                    logger.error(f"[MATCH] Product matching failed: {e}")
-                    print(f"Error matching product: {e}")
-                    matching_failures.append(error_msg)
-
-                    # Check if this is a rate limit error
-                    if "429" in error_msg or "quota" in error_msg.lower() or "rate limit" in error_msg.lower():
-                        logger.error(f"[MATCH] RATE LIMIT DETECTED - Stopping")
-                        print("⚠️  RATE LIMIT DETECTED - Stopping further matching")
-                        # Cancel remaining futures to avoid wasting quota
-                        for f in future_to_product:
-                            f.cancel()
-                        break
+            if similarity is None:
+                if not batch_failed and i not in skipped:
+                    matching_failures.append(f"No score returned for {product_name}")
+                continue
+
+            logger.info(f"[MATCH] {product_name} - Score: {similarity.get('score', 0)}% (rank {product.get('rank_score')})")
+            if similarity.get('score', 0) >= settings.SIMILARITY_THRESHOLD:
+                competitor = Competitor(
+                    idea_id=idea.id,
+                    product_name=product.get('name'),
+                    source=product.get('source'),
+                    url=product.get('url'),
+                    price=product.get('price'),
+                    similarity_score=similarity.get('score'),
+                    reasoning=similarity.get('reasoning'),
+                    is_relevant=None
+                )
+                new_competitors.append(competitor)
 
         logger.info(f"[MATCH] Completed: {len(new_competitors)} matches found, {len(matching_failures)} failures")
 
+        scored = [(p.get('rank_score', 0), s.get('score', 0)) for p, s in zip(to_match, similarities) if s is not None]
+        correlation = LexicalRanker.rank_correlation([r for r, _ in scored], [l for _, l in scored])
+        if correlation is not None:
+            logger.info(f"[RANK] Ranker vs LLM Spearman correlation: {correlation:.2f} over {len(scored)} products")
+
         # Save all at once
         if new_competitors:
             logger.info(f"[DB] Saving {len(new_competitors)} new competitors")
@@ -175,68 +344,22 @@ def run_scan_for_idea(idea_id: int, db: Session, image_base64: str = None):
             top_competitors = sorted(new_competitors, key=lambda x: x.similarity_score, reverse=True)[:MAX_EMAIL_COMPETITORS]
             logger.info(f"[EMAIL] Preparing email with {len(top_competitors)} top competitors")
 
-            # Generate Verdict (If Enabled)
-            verdict = None
-            if settings.ENABLE_VERDICT:
-                try:
-                    logger.info(f"[VERDICT] Generating AI verdict")
-                    print("Generating AI Verdict...")
-                    competitor_dicts = [
-                        {"product_name": c.product_name, "similarity_score": c.similarity_score}
-                        for c in top_competitors
-                    ]
-                    verdict = matcher.generate_verdict(concepts.get('core_function', idea.user_description), competitor_dicts)
-                    logger.info(f"[VERDICT] {verdict[:100]}...")
-                    print(f"Verdict: {verdict}")
-                except Exception as e:
-                    logger.error(f"[VERDICT] Generation failed: {e}")
-                    print(f"Verdict generation ERROR: {e}")
-            
-            # Gap Hunter (If Enabled)
-            gap_analysis = None
-            if settings.ENABLE_GAP_HUNT and top_competitors:
-                try:
-                    # Target the #1 competitor
-                    top_comp = top_competitors[0]
-                    logger.info(f"[GAP_HUNT] Analyzing complaints for: {top_comp.product_name}")
-                    print(f"Gap Hunter: Hunting complaints for {top_comp.product_name}...")
-
-                    # The "Hate Search" - Search Google for negative sentiment
-                    # We reuse the Google Scraper logic but with a specific query
-                    hate_query = f"{top_comp.product_name} review problem OR broken OR bad OR disappointed OR hate"
-                    
-                    # We need a quick way to search. We can instantiate SerperScraper directly or use registry.
-                    # For simplicity/robustness, let's use the SerperScraper directly if available.
-                    from scrapers.serper import SerperScraper
-                    serper = SerperScraper()
-                    
-                    # Search (limit to 5 results for speed)
-                    complaint_results = serper.search(hate_query)
-                    
-                    if complaint_results:
-                        # Extract snippets
-                        snippets = [r.get('description', '') or r.get('name', '') for r in complaint_results]
-                        # Filter empty snippets
-                        snippets = [s for s in snippets if s]
-                        
-                        if snippets:
-                            gap_analysis = matcher.analyze_gaps(
-                                user_idea=idea.user_description,
-                                competitor_name=top_comp.product_name,
-                                complaints=snippets
-                            )
-                            logger.info(f"[GAP_HUNT] Analysis complete: {gap_analysis[:100]}...")
-                            print(f"Gap Analysis: {gap_analysis}")
-                        else:
-                            logger.warning(f"[GAP_HUNT] No complaint snippets found")
-                            print("Gap Hunter: No complaint snippets found.")
-                    else:
-                        logger.warning(f"[GAP_HUNT] No negative results found")
-                        print("Gap Hunter: No negative results found.")
-
-                except Exception as e:
-                    logger.error(f"[GAP_HUNT] Failed: {e}")
-                    print(f"Gap Hunter Error: {e}")
+            # Verdict + Gap Hunter (if enabled) run side by side. Gap Hunter covers the top N
+            # competitors, reusing cached complaint snippets, with one combined analysis call.
+            gap_targets = top_competitors[:settings.GAP_HUNT_TOP_N] if settings.ENABLE_GAP_HUNT else []
+            complaint_finder = ComplaintFinder(db)
+            cached_complaints, to_search = complaint_finder.lookup(gap_targets)
+            if gap_targets:
+                logger.info(f"[GAP_HUNT] Complaints for {len(gap_targets)} competitors ({len(cached_complaints)} cached)")
+                print(f"Gap Hunter: Hunting complaints for {len(to_search)} competitors ({len(cached_complaints)} cached)...")
+
+            verdict, gap_analysis, searched = asyncio.run(_verdict_and_gaps(
+                matcher, complaint_finder, idea, concepts, top_competitors, gap_targets, cached_complaints, to_search, deadline
+            ))
+            if to_search and len(searched) == len(to_search):
+                complaint_finder.store(to_search, searched)
+                db.commit()
+            _record_scan_outcome(idea, deadline, db, followup)
 
             logger.info(f"[EMAIL] Preparing to send to user")
             print(f"Preparing email with top {len(top_competitors)} competitors...")
@@ -251,7 +374,8 @@ def run_scan_for_idea(idea_id: int, db: Session, image_base64: str = None):
                         idea_title=concepts.get('core_function', 'Your Idea'),
                         competitors=top_competitors,
                         verdict=verdict,
-                        gap_analysis=gap_analysis
+                        gap_analysis=gap_analysis,
+                        partial=deadline.partial
                     )
                     logger.info(f"[EMAIL] Sent successfully")
                     print("Email sent successfully")
@@ -266,7 +390,8 @@ def run_scan_for_idea(idea_id: int, db: Session, image_base64: str = None):
                 has_rate_limit_error = any("429" in err or "quota" in err.lower() or "rate limit" in err.lower() for err in matching_failures)
 
                 if has_rate_limit_error:
-                    error_msg = f"❌ Scan failed due to API rate limits. Processed 0/{len(clean_results)} products before hitting quota."
+                    processed = sum(1 for similarity in similarities if similarity is not None)
+                    error_msg = f"❌ Scan failed due to API rate limits. Processed {processed}/{len(clean_results)} products before hitting quota."
                     print(error_msg)
                     logger.error(error_msg)
                     raise Exception(f"Rate limit exceeded - could not complete scan. Please try again later or upgrade API tier.")
@@ -276,9 +401,13 @@ def run_scan_for_idea(idea_id: int, db: Session, image_base64: str = None):
                     logger.warning(error_msg)
                     # Fall through to send "no matches" since we did process some products
 
-            print("No competitors found - sending 'no matches' email")
-            user = db.query(User).get(idea.user_id)
+            followup_queued = _record_scan_outcome(idea, deadline, db, followup)
+            # A partial scan's follow-up has the final say; a follow-up only reports "no matches"
+            # if the first pass found nothing either
+            already_reported = followup and db.query(Competitor).filter(Competitor.idea_id == idea.id).first() is not None
+            user = db.query(User).get(idea.user_id) if not (followup_queued or already_reported) else None
             if user:
+                print("No competitors found - sending 'no matches' email")
                 try:
                     email_service = EmailService()
                     email_service.send_no_matches_email(
@@ -291,6 +420,9 @@ def run_scan_for_idea(idea_id: int, db: Session, image_base64: str = None):
                     print(f"❌ Email failed: {e}")
                     # Don't raise - email failure shouldn't crash the scan
 
+        logger.info(f"[SCAN_REPORT] {json.dumps(matcher.stats, sort_keys=True)}")
+        logger.info(f"[DEADLINE] {json.dumps(deadline.summary())}")
+        logger.info(f"[LLM_SUMMARY] {json.dumps(matcher.call_metrics.summary(), sort_keys=True)}")
         logger.info(f"{'='*80}")
         logger.info(f"[SCAN_COMPLETE] Idea #{idea_id} - Found {len(new_competitors)} new competitors")
         logger.info(f"{'='*80}")
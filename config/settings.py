@@ -12,6 +12,64 @@ class Settings:
     GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash-preview-09-2025")
     GEMINI_LITE_MODEL = os.getenv("GEMINI_LITE_MODEL", "gemini-2.5-flash-lite")  # For bulk matching
 
+    # Key pool: comma-separated keys, each call goes to the least-loaded key that isn't quota-exhausted
+    GEMINI_API_KEYS = [k.strip() for k in os.getenv("GEMINI_API_KEYS", "").split(",") if k.strip()] or [GEMINI_API_KEY]
+    # Models to fall back to (in order), per requested model, once every key is out of daily quota for it
+    GEMINI_FALLBACK_MODELS = {
+        GEMINI_MODEL: [m.strip() for m in os.getenv("GEMINI_FALLBACK_MODELS", GEMINI_LITE_MODEL).split(",") if m.strip()],
+        GEMINI_LITE_MODEL: [m.strip() for m in os.getenv("GEMINI_LITE_FALLBACK_MODELS", GEMINI_MODEL).split(",") if m.strip()],
+    }
+    GEMINI_QUOTA_RESET_TZ = os.getenv("GEMINI_QUOTA_RESET_TZ", "America/Los_Angeles")  # Daily quotas reset at midnight here
+
+    # Per-model rate limits (requests/min, tokens/min, burst). Each model + API key gets its own limiter.
+    GEMINI_RATE_LIMITS = {
+        GEMINI_MODEL: {
+            "rpm": int(os.getenv("GEMINI_RPM", "5")),
+            "tpm": int(os.getenv("GEMINI_TPM", "250000")),
+            "burst": int(os.getenv("GEMINI_BURST", "1")),
+        },
+        GEMINI_LITE_MODEL: {
+            "rpm": int(os.getenv("GEMINI_LITE_RPM", "10")),
+            "tpm": int(os.getenv("GEMINI_LITE_TPM", "250000")),
+            "burst": int(os.getenv("GEMINI_LITE_BURST", "2")),
+        },
+        "default": {"rpm": 5, "tpm": 250000, "burst": 1},
+    }
+    # Max share of each model's rpm that lower-priority LLM work may take (interactive scans are uncapped)
+    LLM_PRIORITY_QUOTA_CAPS = {
+        "monitoring": float(os.getenv("LLM_MONITORING_QUOTA_SHARE", "0.6")),
+        "backfill": float(os.getenv("LLM_BACKFILL_QUOTA_SHARE", "0.3")),
+    }
+    SIMILARITY_MAX_WORKERS = int(os.getenv("SIMILARITY_MAX_WORKERS", "2"))  # Concurrent batch calls per scan
+    LLM_ASYNC_CONCURRENCY = int(os.getenv("LLM_ASYNC_CONCURRENCY", "16"))  # In-flight async LLM calls per event loop
+
+    # LLM response cache (content-addressed, skips API + rate limit on hit)
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+    LLM_CACHE_TTLS = {  # seconds, per call type
+        "extract": 30 * 86400,
+        "similarity": 7 * 86400,
+        "verdict": 86400,
+        "gap": 3 * 86400,
+        "default": 86400,
+    }
+
+    # Structured output: JSON calls send a response schema (falls back to plain prompts if the
+    # SDK/model rejects it); unparseable answers get this many cheap "fix this JSON" re-asks
+    LLM_STRUCTURED_OUTPUT = os.getenv("LLM_STRUCTURED_OUTPUT", "true").lower() == "true"
+    LLM_JSON_REPAIR_ATTEMPTS = int(os.getenv("LLM_JSON_REPAIR_ATTEMPTS", "1"))
+
+    # Monitoring batch mode: the weekly pass writes its similarity prompts as one offline JSONL job
+    # for the Gemini Batch API instead of sending them through the real-time rate limiter.
+    # Jobs are polled every MONITORING_BATCH_POLL_MINUTES and abandoned (ideas stay due) after
+    # MONITORING_BATCH_TIMEOUT seconds
+    MONITORING_BATCH_MODE = os.getenv("MONITORING_BATCH_MODE", "false").lower() == "true"
+    MONITORING_BATCH_BACKEND = os.getenv("MONITORING_BATCH_BACKEND", "gemini")
+    MONITORING_BATCH_DIR = os.getenv("MONITORING_BATCH_DIR", "batch_jobs")
+    MONITORING_BATCH_POLL_MINUTES = int(os.getenv("MONITORING_BATCH_POLL_MINUTES", "10"))
+    MONITORING_BATCH_TIMEOUT = int(os.getenv("MONITORING_BATCH_TIMEOUT", str(24 * 3600)))  # Batch API turnaround target
+
     # Email
     SMTP_SERVER = "smtp.gmail.com"
     SMTP_PORT = 587
@@ -24,19 +82,114 @@ class Settings:
     USER_AGENT = "IdeaValidator/1.0"
     REQUEST_TIMEOUT = 30
 
+    # Shared HTTP session for all scrapers (scrapers/http_client.py): keep-alive pools per host
+    HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))  # Hosts kept pooled
+    HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))  # Sockets per host (>= concurrent scrapers)
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))  # seconds
+    HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", str(REQUEST_TIMEOUT)))  # seconds
+    HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))  # On connection errors and 5xx
+    HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "0.5"))  # 0.5s, 1s, ...
+
     # Serper API (add to .env: SERPER_API_KEY)
     SERPER_API_KEY = os.getenv("SERPER_API_KEY", "")
 
+    # Serper queries issued within this window go out as one array-payload request (0 = off)
+    SERPER_BATCH_WINDOW_MS = int(os.getenv("SERPER_BATCH_WINDOW_MS", "50"))
+    SERPER_BATCH_MAX_QUERIES = int(os.getenv("SERPER_BATCH_MAX_QUERIES", "100"))  # Serper's array limit
+    SERPER_BATCH_MAX_IDEAS = int(os.getenv("SERPER_BATCH_MAX_IDEAS", "8"))  # Monitored ideas scraped together
+
+    # Scraper result cache, keyed by (source, normalized query): memory LRU + standalone SQLite file
+    SCRAPER_CACHE_ENABLED = os.getenv("SCRAPER_CACHE_ENABLED", "true").lower() == "true"
+    SCRAPER_CACHE_PATH = os.getenv("SCRAPER_CACHE_PATH", "scraper_cache.db")
+    SCRAPER_CACHE_MEMORY_ENTRIES = int(os.getenv("SCRAPER_CACHE_MEMORY_ENTRIES", "500"))
+    SCRAPER_CACHE_MAX_ENTRIES = int(os.getenv("SCRAPER_CACHE_MAX_ENTRIES", "20000"))
+    SCRAPER_CACHE_TTLS = {  # seconds, per source
+        "aliexpress": 6 * 3600,
+        "amazon": 12 * 3600,
+        "google": 12 * 3600,
+        "kickstarter": 86400,
+        "producthunt": 86400,
+        "patents": 30 * 86400,
+        "default": 12 * 3600,
+    }
+    # Older than TTL but within TTL x this: served immediately, refreshed in the background
+    SCRAPER_CACHE_STALE_FACTOR = float(os.getenv("SCRAPER_CACHE_STALE_FACTOR", "3"))
+
+    # Identical concurrent scraper searches (same source + normalized query) share one request
+    SCRAPER_SINGLE_FLIGHT_ENABLED = os.getenv("SCRAPER_SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+
+    # Query planning: focused queries per source (broad, per keyword, keyword pairs), fused with RRF.
+    # Searches per scan, all sources. 0 = one broad query per source, the same paid search count as a
+    # single joined query; every extra search is one more billed Serper/SerpAPI query per scan.
+    QUERY_PLANNER_BUDGET = int(os.getenv("QUERY_PLANNER_BUDGET", "0"))
+    QUERY_PLANNER_MAX_PER_SOURCE = int(os.getenv("QUERY_PLANNER_MAX_PER_SOURCE", "4"))
+    QUERY_PLANNER_RRF_K = 60  # Reciprocal rank fusion constant
+
     # SerpAPI (for Google Patents - add to .env: SERPAPI_API_KEY)
     SERPAPI_API_KEY = os.getenv("SERPAPI_API_KEY", "")
 
+    # Image preprocessing for multimodal concept extraction
+    IMAGE_MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", "1024"))  # px, longest side
+    IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "85"))
+    IMAGE_OUTPUT_FORMAT = os.getenv("IMAGE_OUTPUT_FORMAT", "jpeg").lower()  # jpeg or webp
+
+    # Concept extraction cache (exact + near-duplicate idea descriptions)
+    CONCEPT_CACHE_NEAR_DUP_ENABLED = os.getenv("CONCEPT_CACHE_NEAR_DUP_ENABLED", "true").lower() == "true"
+    CONCEPT_CACHE_NEAR_DUP_THRESHOLD = float(os.getenv("CONCEPT_CACHE_NEAR_DUP_THRESHOLD", "0.85"))  # Estimated Jaccard
+    CONCEPT_CACHE_SCAN_LIMIT = 500  # Most recent entries compared for near-duplicates
+    CONCEPT_CACHE_TTL_DAYS = int(os.getenv("CONCEPT_CACHE_TTL_DAYS", "30"))  # Also bounds staleness after prompt changes
+    CONCEPT_CACHE_MAX_ENTRIES = int(os.getenv("CONCEPT_CACHE_MAX_ENTRIES", "5000"))  # LRU cap, by last access
+
+    # Prompt compaction: scraped text is normalized and truncated to these budgets (~4 chars/token)
+    PROMPT_COMPACTION_ENABLED = os.getenv("PROMPT_COMPACTION_ENABLED", "true").lower() == "true"
+    PROMPT_IDEA_TOKENS = int(os.getenv("PROMPT_IDEA_TOKENS", "500"))
+    PROMPT_PRODUCT_NAME_TOKENS = int(os.getenv("PROMPT_PRODUCT_NAME_TOKENS", "30"))
+    PROMPT_PRODUCT_DESCRIPTION_TOKENS = int(os.getenv("PROMPT_PRODUCT_DESCRIPTION_TOKENS", "80"))
+    PROMPT_SNIPPET_TOKENS = int(os.getenv("PROMPT_SNIPPET_TOKENS", "60"))
+
     # Similarity matching
     SIMILARITY_THRESHOLD = 60  # 0-100, products above this are considered competitors
+    SIMILARITY_BATCH_SIZE = int(os.getenv("SIMILARITY_BATCH_SIZE", "8"))  # Products scored per LLM call
+    # Cascade: lite model scores everything, full model re-scores only the uncertain band
+    SIMILARITY_CASCADE_ENABLED = os.getenv("SIMILARITY_CASCADE_ENABLED", "false").lower() == "true"
+    SIMILARITY_CASCADE_BAND = (
+        int(os.getenv("SIMILARITY_CASCADE_LOW", "45")),
+        int(os.getenv("SIMILARITY_CASCADE_HIGH", "75")),
+    )
+    # Relevance model (llm/relevance.py, retrain with train_relevance_model.py): candidates it is
+    # confident are irrelevant skip the LLM. The skip threshold is picked on held-out labels so at
+    # most RELEVANCE_MAX_MISS_RATE of real competitors would be skipped
+    RELEVANCE_MODEL_ENABLED = os.getenv("RELEVANCE_MODEL_ENABLED", "true").lower() == "true"
+    RELEVANCE_MODEL_PATH = os.getenv("RELEVANCE_MODEL_PATH", "relevance_model.json")
+    RELEVANCE_MAX_MISS_RATE = float(os.getenv("RELEVANCE_MAX_MISS_RATE", "0.02"))
+    RELEVANCE_MIN_HOLDOUT_POSITIVES = int(os.getenv("RELEVANCE_MIN_HOLDOUT_POSITIVES", "20"))
+    # Early stop: ranked candidates are scored in waves (batch size x workers); stop once
+    # EARLY_STOP_MATCHES products score >= EARLY_STOP_SCORE, or the expected number of further
+    # competitors drops below EARLY_STOP_MIN_EXPECTED_GAIN (0 turns a rule off)
+    EARLY_STOP_ENABLED = os.getenv("EARLY_STOP_ENABLED", "true").lower() == "true"
+    EARLY_STOP_MATCHES = int(os.getenv("EARLY_STOP_MATCHES", "4"))  # = competitors per email
+    EARLY_STOP_SCORE = float(os.getenv("EARLY_STOP_SCORE", "90"))
+    EARLY_STOP_MIN_EXPECTED_GAIN = float(os.getenv("EARLY_STOP_MIN_EXPECTED_GAIN", "0"))
+
+    # Interactive scan deadline: total budget plus per-stage caps (seconds). Stages that run out
+    # keep what they have; the scan emails a partial result and queues a follow-up pass.
+    # SCAN_DEADLINE_SECONDS=0 disables it.
+    SCAN_DEADLINE_SECONDS = float(os.getenv("SCAN_DEADLINE_SECONDS", "240"))
+    SCAN_STAGE_BUDGETS = {
+        "extract": float(os.getenv("SCAN_BUDGET_EXTRACT", "45")),
+        "scrape": float(os.getenv("SCAN_BUDGET_SCRAPE", "60")),
+        "match": float(os.getenv("SCAN_BUDGET_MATCH", "150")),
+        "verdict": float(os.getenv("SCAN_BUDGET_VERDICT", "45")),
+    }
+    SCAN_FOLLOWUP_DELAY_MINUTES = int(os.getenv("SCAN_FOLLOWUP_DELAY_MINUTES", "15"))
+    SCAN_FOLLOWUP_POLL_MINUTES = int(os.getenv("SCAN_FOLLOWUP_POLL_MINUTES", "5"))
 
     # App
     API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
     ENABLE_MONITORING = os.getenv("ENABLE_MONITORING", "false").lower() == "true"
     ENABLE_VERDICT = os.getenv("ENABLE_VERDICT", "true").lower() == "true"
     ENABLE_GAP_HUNT = os.getenv("ENABLE_GAP_HUNT", "true").lower() == "true"
+    GAP_HUNT_TOP_N = int(os.getenv("GAP_HUNT_TOP_N", "3"))  # Competitors whose complaints feed the gap analysis
+    COMPLAINT_CACHE_TTL_DAYS = int(os.getenv("COMPLAINT_CACHE_TTL_DAYS", "14"))
 
 settings = Settings()
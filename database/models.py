@@ -29,6 +29,10 @@ class Idea(Base):
     monitoring_enabled = Column(Boolean, default=False)
     monitoring_ends_at = Column(DateTime, nullable=True)
 
+    # Scan deadline: last scan ran out of time, and when the follow-up pass should finish it
+    scan_partial = Column(Boolean, default=False)
+    followup_scan_at = Column(DateTime, nullable=True)
+
     user = relationship("User", back_populates="ideas")
     competitors = relationship("Competitor", back_populates="idea")
     scan_history = relationship("ScanHistory", back_populates="idea")
@@ -42,7 +46,7 @@ class ScanHistory(Base):
 
     id = Column(Integer, primary_key=True)
     idea_id = Column(Integer, ForeignKey("ideas.id"))
-    url_hash = Column(String(32), index=True) # MD5 hash of the product URL
+    url_hash = Column(String(32), index=True) # MD5 of the canonical product key (scrapers/canonical.py)
     is_relevant = Column(Boolean, default=False) # Cache the LLM decision
     last_seen = Column(DateTime, default=datetime.utcnow)
 
@@ -67,3 +71,53 @@ class Competitor(Base):
     discovered_at = Column(DateTime, default=datetime.utcnow)
 
     idea = relationship("Idea", back_populates="competitors")
+
+class SimilarityCache(Base):
+    """
+    Memo of LLM similarity scores across scans.
+    Keyed by (idea content hash, product URL hash, product content hash) so an unchanged idea
+    re-scanned against unchanged listings needs zero LLM calls - including non-matches,
+    which never make it into the competitors table.
+    """
+    __tablename__ = "similarity_cache"
+
+    id = Column(Integer, primary_key=True)
+    idea_hash = Column(String(32), index=True)     # MD5 of the idea description
+    url_hash = Column(String(32), index=True)      # MD5 of the canonical product key
+    content_hash = Column(String(32))              # MD5 of product name/description/price
+    score = Column(Float)
+    reasoning = Column(Text)
+    user_advantage = Column(Text)
+    # Kept so the relevance model (llm/relevance.py) can learn from LLM decisions
+    product_name = Column(String(500), nullable=True)
+    product_url = Column(Text, nullable=True)
+    source = Column(String(100), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class ConceptCache(Base):
+    """
+    Extracted concepts keyed by normalized idea text (+ image), so resubmitted or
+    near-identical ideas skip the extraction LLM call on the scan's critical path.
+    """
+    __tablename__ = "concept_cache"
+
+    id = Column(Integer, primary_key=True)
+    content_hash = Column(String(64), index=True)  # SHA256 of normalized text + image hash
+    image_hash = Column(String(64), index=True, default="")
+    minhash = Column(Text)      # JSON list of MinHash values for near-duplicate lookup
+    concepts = Column(Text)     # JSON string: same shape as Idea.extracted_concepts
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    last_accessed = Column(DateTime, default=datetime.utcnow)  # LRU eviction order
+
+class ComplaintCache(Base):
+    """
+    Gap Hunter complaint snippets per product, shared across ideas - the same top competitor
+    (e.g. a popular Amazon listing) shows up for many ideas, and its complaints don't change weekly.
+    """
+    __tablename__ = "complaint_cache"
+
+    id = Column(Integer, primary_key=True)
+    product_key = Column(String(32), index=True)  # MD5 of the canonical product key
+    product_name = Column(String(500))
+    snippets = Column(Text)  # JSON list of complaint snippets (may be empty)
+    created_at = Column(DateTime, default=datetime.utcnow)
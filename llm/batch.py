@@ -0,0 +1,236 @@
+import json
+import os
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from config.settings import settings
+
+# Job states reported by a BatchBackend
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+
+def write_job(path: str, requests: list[tuple]):
+    """
+    Write (key, prompt) pairs as a JSONL job, one request per line in the Gemini batch format:
+    {"key": ..., "request": {"contents": [{"parts": [{"text": prompt}]}]}}
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for key, prompt in requests:
+            f.write(json.dumps({"key": key, "request": {"contents": [{"parts": [{"text": prompt}]}]}}) + "\n")
+
+def read_job(path: str) -> list[tuple]:
+    """(key, prompt) pairs from a job file written by write_job()"""
+    requests = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                requests.append((entry["key"], entry["request"]["contents"][0]["parts"][0]["text"]))
+    return requests
+
+def read_results(path: str) -> dict:
+    """
+    {key: response text} from a results JSONL file. Lines are
+    {"key": ..., "response": {"candidates": [{"content": {"parts": [{"text": ...}]}}]}}
+    or {"key": ..., "error": ...}; failed requests map to None.
+    """
+    results = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            try:
+                parts = entry["response"]["candidates"][0]["content"]["parts"]
+                results[entry["key"]] = "".join(part.get("text", "") for part in parts)
+            except (KeyError, IndexError, TypeError):
+                results[entry["key"]] = None
+    return results
+
+class BatchBackend(ABC):
+    """
+    Where batch jobs run. Implementations take a JSONL job file (see write_job) and
+    eventually produce a results JSONL file (see read_results). status() must not block -
+    the scheduler polls it across runs.
+    """
+
+    @abstractmethod
+    def submit(self, job_path: str) -> str:
+        """Start the job. Returns a job id"""
+
+    @abstractmethod
+    def status(self, job_id: str) -> str:
+        """STATUS_RUNNING / STATUS_SUCCEEDED / STATUS_FAILED"""
+
+    @abstractmethod
+    def results_path(self, job_id: str) -> str:
+        """Local path of the results JSONL (only valid once the job succeeded)"""
+
+    def cleanup(self, job_id: str):
+        """Remove what the job left behind once its results were applied (or it was given up on)"""
+        if os.path.exists(self.results_path(job_id)):
+            os.remove(self.results_path(job_id))
+
+class GeminiBatchBackend(BatchBackend):
+    """
+    Gemini Batch API (batchGenerateContent) - jobs run asynchronously on Google's side, against
+    the batch quota rather than the real-time RPM/TPM limits, at a discount.
+
+    Requests are sent inline (the API caps inline jobs at 20MB, far above a weekly pass).
+    Once a job succeeds its responses are written to <work_dir>/<job>.results.jsonl in the
+    read_results() format.
+    """
+
+    BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+    DOWNLOAD_URL = "https://generativelanguage.googleapis.com/download/v1beta"
+    FAILED_STATES = ("BATCH_STATE_FAILED", "BATCH_STATE_CANCELLED", "BATCH_STATE_EXPIRED")
+
+    def __init__(self, work_dir: str = None, model_name: str = None, api_key: str = None):
+        self.work_dir = work_dir or settings.MONITORING_BATCH_DIR
+        self.model_name = model_name or settings.GEMINI_LITE_MODEL
+        self.api_key = api_key or settings.GEMINI_API_KEY
+        os.makedirs(self.work_dir, exist_ok=True)
+
+    def _request(self, method: str, url: str, client=None, **kwargs):
+        """Authenticated call through the shared HTTP client (or `client`). Raises on a non-200 response"""
+        from scrapers.http_client import get_http_client
+
+        response = (client or get_http_client()).request(method, url, headers={"x-goog-api-key": self.api_key}, **kwargs)
+        if response.status_code != 200:
+            raise RuntimeError(f"Gemini batch API returned {response.status_code}: {response.text[:200]}")
+        return response
+
+    def submit(self, job_path: str) -> str:
+        requests = read_job(job_path)
+        body = {
+            "batch": {
+                "display_name": os.path.basename(job_path),
+                "input_config": {"requests": {"requests": [
+                    {"request": {"contents": [{"parts": [{"text": prompt}]}]}, "metadata": {"key": key}}
+                    for key, prompt in requests
+                ]}},
+            }
+        }
+        # Creating a job isn't idempotent: the shared client retries POSTs on 5xx, which could start
+        # (and bill) the same batch twice. A failed submit is retried by the next daily run instead.
+        from scrapers.http_client import HTTPClient
+
+        client = HTTPClient(retries=0)
+        try:
+            job_id = self._request("POST", f"{self.BASE_URL}/models/{self.model_name}:batchGenerateContent", client=client, json=body).json()["name"]
+        finally:
+            client.close()
+        print(f"[BATCH] Submitted {job_id} ({len(requests)} requests)")
+        return job_id
+
+    def status(self, job_id: str) -> str:
+        if os.path.exists(self.results_path(job_id)):
+            return STATUS_SUCCEEDED
+
+        job = self._request("GET", f"{self.BASE_URL}/{job_id}").json()
+        state = job.get("metadata", {}).get("state") or job.get("state")
+        if state in self.FAILED_STATES or "error" in job:
+            print(f"[BATCH] {job_id} ended as {state}: {job.get('error')}")
+            return STATUS_FAILED
+        if state != "BATCH_STATE_SUCCEEDED":
+            return STATUS_RUNNING
+
+        self._save_results(job_id, job.get("response") or job.get("output") or {})
+        return STATUS_SUCCEEDED
+
+    def _save_results(self, job_id: str, output: dict):
+        """Write the finished job's responses as a results JSONL (inline responses or a responses file)"""
+        tmp_path = self.results_path(job_id) + ".tmp"
+        if output.get("responsesFile"):
+            text = self._request("GET", f"{self.DOWNLOAD_URL}/{output['responsesFile']}:download", params={"alt": "media"}).text
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+        else:
+            inlined = output.get("inlinedResponses", {})
+            entries = inlined.get("inlinedResponses", []) if isinstance(inlined, dict) else inlined
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for entry in entries:
+                    line = {"key": entry.get("metadata", {}).get("key")}
+                    if "response" in entry:
+                        line["response"] = entry["response"]
+                    else:
+                        line["error"] = entry.get("error")
+                    f.write(json.dumps(line) + "\n")
+        # Rename last, so a results file only ever appears complete
+        os.replace(tmp_path, self.results_path(job_id))
+
+    def results_path(self, job_id: str) -> str:
+        return os.path.join(self.work_dir, f"{job_id.replace('/', '-')}.results.jsonl")
+
+    def cleanup(self, job_id: str):
+        super().cleanup(job_id)
+        try:
+            # Deleting the job also drops its stored responses on Google's side
+            self._request("DELETE", f"{self.BASE_URL}/{job_id}")
+        except Exception as e:
+            print(f"[BATCH] Couldn't delete {job_id}: {e}")
+
+class LocalFileBatchBackend(BatchBackend):
+    """
+    Test-only, file-based stand-in for a hosted batch-inference service - not selectable
+    through settings.
+
+    Each job is processed in a background thread by `responder(prompt) -> text`; results and
+    failures are written next to the job as <job_id>.results.jsonl / <job_id>.failed.
+    """
+
+    def __init__(self, work_dir: str, responder):
+        self.work_dir = work_dir
+        self.responder = responder
+        os.makedirs(self.work_dir, exist_ok=True)
+
+    def _path(self, job_id: str, suffix: str) -> str:
+        return os.path.join(self.work_dir, f"{job_id}{suffix}")
+
+    def submit(self, job_path: str) -> str:
+        job_id = f"job-{uuid.uuid4().hex[:12]}"
+        requests = read_job(job_path)
+        threading.Thread(target=self._run, args=(job_id, requests), daemon=True).start()
+        print(f"[BATCH] Submitted {job_id} ({len(requests)} requests)")
+        return job_id
+
+    def _run(self, job_id: str, requests: list[tuple]):
+        tmp_path = self._path(job_id, ".results.jsonl.tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for key, prompt in requests:
+                    try:
+                        text = self.responder(prompt)
+                        line = {"key": key, "response": {"candidates": [{"content": {"parts": [{"text": text}]}}]}}
+                    except Exception as e:
+                        # One bad request doesn't fail the job - its products are retried next pass
+                        line = {"key": key, "error": f"{type(e).__name__}: {e}"}
+                    f.write(json.dumps(line) + "\n")
+            # Rename last, so a results file only ever appears complete
+            os.replace(tmp_path, self._path(job_id, ".results.jsonl"))
+        except Exception as e:
+            with open(self._path(job_id, ".failed"), "w", encoding="utf-8") as f:
+                f.write(f"{type(e).__name__}: {e}")
+
+    def status(self, job_id: str) -> str:
+        if os.path.exists(self._path(job_id, ".results.jsonl")):
+            return STATUS_SUCCEEDED
+        if os.path.exists(self._path(job_id, ".failed")):
+            return STATUS_FAILED
+        return STATUS_RUNNING
+
+    def results_path(self, job_id: str) -> str:
+        return self._path(job_id, ".results.jsonl")
+
+    def cleanup(self, job_id: str):
+        super().cleanup(job_id)
+        if os.path.exists(self._path(job_id, ".failed")):
+            os.remove(self._path(job_id, ".failed"))
+
+def get_batch_backend() -> BatchBackend:
+    """Backend selected by settings.MONITORING_BATCH_BACKEND"""
+    if settings.MONITORING_BATCH_BACKEND == "gemini":
+        return GeminiBatchBackend()
+    raise ValueError(f"Unknown batch backend: {settings.MONITORING_BATCH_BACKEND}")
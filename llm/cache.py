@@ -0,0 +1,115 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from config.settings import settings
+
+class LLMResponseCache:
+    """
+    Content-addressed on-disk cache for Gemini responses.
+
+    Key = sha256(model_name, sha256(prompt), sha256(image bytes)), so a byte-identical
+    request (resubmitted idea, re-scored product, recurring competitor) never hits the API.
+    Stored in a small standalone SQLite file so it works the same locally and on Render,
+    independent of the main Postgres DB.
+
+    - TTL per call type (settings.LLM_CACHE_TTLS, seconds)
+    - LRU size cap (settings.LLM_CACHE_MAX_ENTRIES), evicted by last access time
+    - Hit/miss counters per call type (see stats())
+    """
+
+    def __init__(self, path: str = None, max_entries: int = None, ttls: dict = None):
+        self.path = path or settings.LLM_CACHE_PATH
+        self.max_entries = max_entries or settings.LLM_CACHE_MAX_ENTRIES
+        self.ttls = ttls or settings.LLM_CACHE_TTLS
+        self._lock = threading.Lock()
+        self._hits = {}
+        self._misses = {}
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                cache_key TEXT PRIMARY KEY,
+                call_type TEXT,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_accessed REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_last_accessed ON llm_cache (last_accessed)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model_name: str, prompt: str, image_bytes: bytes = None) -> str:
+        """Build the content-addressed key for a request"""
+        prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        image_hash = hashlib.sha256(image_bytes).hexdigest() if image_bytes else ""
+        return hashlib.sha256(f"{model_name}|{prompt_hash}|{image_hash}".encode('utf-8')).hexdigest()
+
+    def _ttl_for(self, call_type: str) -> float:
+        return self.ttls.get(call_type, self.ttls.get("default", 86400))
+
+    def get(self, key: str, call_type: str = "default"):
+        """Return the cached response text, or None on miss/expiry"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+
+            if row and now - row[1] <= self._ttl_for(call_type):
+                self._conn.execute("UPDATE llm_cache SET last_accessed = ? WHERE cache_key = ?", (now, key))
+                self._conn.commit()
+                self._hits[call_type] = self._hits.get(call_type, 0) + 1
+                return row[0]
+
+            if row:
+                # Expired - drop it so the fresh response replaces it
+                self._conn.execute("DELETE FROM llm_cache WHERE cache_key = ?", (key,))
+                self._conn.commit()
+            self._misses[call_type] = self._misses.get(call_type, 0) + 1
+            return None
+
+    def set(self, key: str, response: str, call_type: str = "default"):
+        """Store a response and evict least-recently-used entries beyond the size cap"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (cache_key, call_type, response, created_at, last_accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, call_type, response, now, now)
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE cache_key IN (SELECT cache_key FROM llm_cache ORDER BY last_accessed ASC LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        """Hit/miss counters per call type plus current entry count"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            call_types = set(self._hits) | set(self._misses)
+            return {
+                "entries": entries,
+                "hits": sum(self._hits.values()),
+                "misses": sum(self._misses.values()),
+                "by_call_type": {
+                    ct: {"hits": self._hits.get(ct, 0), "misses": self._misses.get(ct, 0)}
+                    for ct in sorted(call_types)
+                }
+            }
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_llm_cache():
+    """Process-wide cache instance, or None when disabled via LLM_CACHE_ENABLED"""
+    global _cache
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMResponseCache()
+        return _cache
@@ -1,100 +1,307 @@
 import google.generativeai as genai
 from google.ai.generativelanguage_v1beta.types import content
-from google.api_core.exceptions import ResourceExhausted
+from google.api_core.exceptions import InvalidArgument, ResourceExhausted
 from config.settings import settings
-import base64
+from llm.cache import get_llm_cache
+from llm.key_pool import get_key_pool
+from llm.rate_limiter import PRIORITY_INTERACTIVE
+from llm.image_prep import PreparedImage, prepare_image
+from llm.metrics import LLMCallRecord, get_llm_metrics
+from llm.prompts import estimate_tokens
+import asyncio
 import time
 import re
-import threading
+import weakref
 
-class GeminiClient:
-    # Global rate limiting: 5 req/min = 13s between requests (safety margin)
-    _last_request_time = 0
-    _rate_limit_lock = threading.Lock()
-    _min_request_interval = 13.0  # seconds
+# Models whose SDK/API rejected response_mime_type/response_schema - plain text prompts from then on
+_structured_output_rejected = set()
+
+# One asyncio concurrency limiter per event loop (asyncio primitives can't be shared across loops)
+_async_semaphores = weakref.WeakKeyDictionary()
+
+def _get_async_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphore = _async_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(settings.LLM_ASYNC_CONCURRENCY)
+        _async_semaphores[loop] = semaphore
+    return semaphore
 
+class GeminiClient:
     def __init__(self, model_name=None):
         genai.configure(api_key=settings.GEMINI_API_KEY)
         self.model_name = model_name or settings.GEMINI_MODEL
-        self.model = genai.GenerativeModel(self.model_name)
+        # Every configured API key (then fallback models) for this model, shared process-wide.
+        # Each route has its own limiter per (model, key), shared across all clients/threads.
+        self.key_pool = get_key_pool(self.model_name)
+        # Optional per-scan collector (llm.metrics.ScanMetrics) - set by ConceptMatcher
+        self.scan_metrics = None
+        # Limiter queue position: priority class, and tenant (user) for fairness within the class
+        self.priority = PRIORITY_INTERACTIVE
+        self.tenant = None
 
-    def _enforce_rate_limit(self):
-        """Ensure minimum time between API requests (thread-safe)"""
-        with self._rate_limit_lock:
-            current_time = time.time()
-            elapsed = current_time - GeminiClient._last_request_time
+    def _estimate_tokens(self, prompt: str, image_bytes: bytes = None) -> int:
+        """Rough token estimate for TPM accounting (~4 chars/token, flat cost per image)"""
+        return estimate_tokens(prompt) + (258 if image_bytes else 0)
 
-            if elapsed < self._min_request_interval:
-                sleep_time = self._min_request_interval - elapsed
-                print(f"[RATE_LIMIT] Waiting {sleep_time:.1f}s before next {self.model_name} request")
-                time.sleep(sleep_time)
+    def _enforce_rate_limit(self, tokens: int, route) -> float:
+        """Wait for capacity on the route's limiter (thread-safe, queued). Returns seconds waited"""
+        waited = route.limiter.acquire(tokens, self.priority, self.tenant)
+        if waited > 0.05:
+            print(f"[RATE_LIMIT] Waited {waited:.1f}s before {route.name} request")
+        return waited
 
-            GeminiClient._last_request_time = time.time()
+    def _record_tokens(self, record: LLMCallRecord, response, prompt_tokens: int):
+        """Use the API's usage counts when the SDK exposes them, else the same estimate as the limiter"""
+        usage = getattr(response, "usage_metadata", None)
+        if isinstance(getattr(usage, "prompt_token_count", None), int):
+            record.prompt_tokens = usage.prompt_token_count
+            record.response_tokens = usage.candidates_token_count or 0
+        else:
+            record.prompt_tokens = prompt_tokens
+            record.response_tokens = len(response.text or "") // 4
 
-    def generate(self, prompt: str, image_base64: str = None) -> str:
-        """
-        Generate content from prompt, optionally with an image.
-        image_base64: Raw base64 string (with or without data URI prefix)
-        Handles 429 rate limit errors with automatic retry.
-        """
+    def _finish_record(self, record: LLMCallRecord):
+        get_llm_metrics().record(record)
+        if self.scan_metrics is not None:
+            self.scan_metrics.add(record)
+
+    def _prepare_contents(self, prompt: str, image_base64: str = None, image: PreparedImage = None) -> tuple:
+        """Build the request contents. Returns (contents, image_bytes or None)"""
         contents = [prompt]
 
-        if image_base64:
+        if image is None and image_base64:
             try:
-                # Handle Data URI if present (e.g., "data:image/png;base64,ABCD...")
-                if "base64," in image_base64:
-                    _, image_data = image_base64.split("base64,", 1)
-                else:
-                    image_data = image_base64
-
-                # Decode to bytes
-                image_bytes = base64.b64decode(image_data)
-
-                # Create image part (Assume JPEG/PNG, Gemini auto-detects mostly, but we can default to generic dict)
-                # The SDK allows passing a dict for inline data
-                image_part = {
-                    "mime_type": "image/jpeg", # Default, or we could parse it from the header
-                    "data": image_bytes
-                }
-
-                contents.append(image_part)
-            except Exception as e:
+                # Callers that already prepared the image (scanner) skip this decode entirely
+                image = prepare_image(image_base64)
+            except ValueError as e:
                 print(f"Error processing image: {e}")
                 # Fallback to text-only if image fails
-                pass
+                image = None
+
+        if image is None:
+            return contents, None
+
+        # The SDK allows passing a dict for inline data
+        contents.append({"mime_type": image.mime_type, "data": image.data})
+        return contents, image.data
 
+    def _generation_kwargs(self, route, response_schema: dict = None) -> dict:
+        """generate_content() kwargs asking for JSON output, if wanted and supported for this route"""
+        if response_schema is None or not settings.LLM_STRUCTURED_OUTPUT or route.model_name in _structured_output_rejected:
+            return {}
+        return {"generation_config": {"response_mime_type": "application/json", "response_schema": response_schema}}
+
+    @staticmethod
+    def _reject_structured_output(route, error: Exception) -> bool:
+        """
+        True if `error` is the SDK (unknown GenerationConfig field) or API (400) refusing
+        structured output - the model is then called without it for the rest of the process.
+        """
+        message = str(error)
+        rejected = (
+            (isinstance(error, (ValueError, TypeError)) and "GenerationConfig" in message)
+            or (isinstance(error, InvalidArgument) and ("response_mime_type" in message or "response_schema" in message))
+        )
+        if rejected:
+            _structured_output_rejected.add(route.model_name)
+            print(f"[STRUCTURED_OUTPUT] {route.model_name} rejected JSON mode ({type(error).__name__}) - using plain prompts")
+        return rejected
+
+    def _check_cache(self, prompt: str, image_bytes: bytes, call_type: str) -> tuple:
+        """Returns (cache, cache_key, cached_response or None)"""
+        cache = get_llm_cache()
+        if not cache:
+            return None, None, None
+
+        cache_key = cache.make_key(self.model_name, prompt, image_bytes)
+        cached = cache.get(cache_key, call_type)
+        if cached is not None:
+            print(f"[CACHE_HIT] {self.model_name} ({call_type})")
+        return cache, cache_key, cached
+
+    @staticmethod
+    def _classify_429(error: ResourceExhausted) -> str:
+        """'quota' for daily limits, 'rate' for per-minute limits"""
+        error_msg = str(error).lower()
+        if "perday" in error_msg or "per day" in error_msg or "daily" in error_msg:
+            return "quota"
+        # Per-minute 429s also say "quota exceeded", but name the minute metric / a short retry delay
+        if "perminute" in error_msg or "per minute" in error_msg or "retry in" in error_msg:
+            return "rate"
+        return "quota" if "quota" in error_msg else "rate"
+
+    def _handle_quota_error(self, route, record: LLMCallRecord) -> bool:
+        """Take an out-of-quota key out of rotation. True if another key/model can take the call"""
+        self.key_pool.mark_exhausted(route)
+        if not self.key_pool.has_healthy_route():
+            return False
+        record.failovers += 1
+        return True
+
+    def _retry_delay(self, error: ResourceExhausted, attempt: int, max_retries: int) -> float:
+        """
+        Seconds to wait before retrying a 429, or None when retries are used up.
+        """
+        # Extract retry delay from error message
+        error_msg = str(error)
+        retry_match = re.search(r'retry in ([\d.]+)s', error_msg)
+
+        if retry_match:
+            retry_seconds = float(retry_match.group(1))
+        else:
+            # Fallback: free tier = 5 req/min = 12s minimum
+            retry_seconds = 15
+
+        # Check if it's a quota error (daily limit) vs rate limit (per-minute)
+        error_type = "QUOTA_EXCEEDED" if self._classify_429(error) == "quota" else "RATE_LIMIT"
+
+        if attempt < max_retries - 1:
+            print(f"[{error_type}] {self.model_name} - Retrying in {retry_seconds:.1f}s (attempt {attempt + 1}/{max_retries})")
+            return retry_seconds
+
+        print(f"[{error_type}] {self.model_name} - Max retries reached. Error: {error_msg[:200]}")
+        return None
+
+    def generate(self, prompt: str, image_base64: str = None, call_type: str = "default", cache_if=None, image: PreparedImage = None, response_schema: dict = None) -> str:
+        """
+        Generate content from prompt, optionally with an image.
+        image_base64: Raw base64 string (with or without data URI prefix)
+        image: Already-prepared image (see llm.image_prep) - preferred over image_base64
+        call_type: extract / similarity / verdict / gap - selects the cache TTL
+        cache_if: optional callable(response) -> bool; rejected responses (e.g. malformed JSON) are not cached
+        response_schema: ask for JSON matching this schema (Gemini structured output) where the
+            SDK/model supports it; otherwise the prompt alone has to get JSON out of the model
+        Handles 429 rate limit errors with automatic retry. A daily-quota 429 takes that key out of
+        rotation until its reset and moves the call to the next key (or fallback model).
+        Cache hits return immediately without touching the rate limiter.
+        """
+        contents, image_bytes = self._prepare_contents(prompt, image_base64, image)
+        record = LLMCallRecord(self.model_name, call_type)
+
+        cache, cache_key, cached = self._check_cache(prompt, image_bytes, call_type)
+        if cached is not None:
+            record.cache_hit = True
+            self._finish_record(record)
+            return cached
+
+        prompt_tokens = self._estimate_tokens(prompt, image_bytes)
         max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                # Enforce rate limit before making request
-                self._enforce_rate_limit()
-
-                print(f"[API_CALL] Calling {self.model_name} (attempt {attempt + 1}/{max_retries})")
-                response = self.model.generate_content(contents)
-                print(f"[API_SUCCESS] {self.model_name} responded successfully")
-                return response.text
-            except ResourceExhausted as e:
-                # Extract retry delay from error message
-                error_msg = str(e)
-                retry_match = re.search(r'retry in ([\d.]+)s', error_msg)
-
-                if retry_match:
-                    retry_seconds = float(retry_match.group(1))
-                else:
-                    # Fallback: free tier = 5 req/min = 12s minimum
-                    retry_seconds = 15
-
-                # Check if it's a quota error (daily limit) vs rate limit (per-minute)
-                is_quota_error = "quota" in error_msg.lower() or "daily" in error_msg.lower()
-                error_type = "QUOTA_EXCEEDED" if is_quota_error else "RATE_LIMIT"
-
-                if attempt < max_retries - 1:
-                    print(f"[{error_type}] {self.model_name} - Retrying in {retry_seconds:.1f}s (attempt {attempt + 1}/{max_retries})")
+        attempt = 0
+        try:
+            while True:
+                route = self.key_pool.acquire()
+                record.model = route.model_name
+                generation_kwargs = self._generation_kwargs(route, response_schema)
+                try:
+                    # Enforce rate limit before making request
+                    record.queue_wait += self._enforce_rate_limit(prompt_tokens, route)
+
+                    print(f"[API_CALL] Calling {route.name} (attempt {attempt + 1}/{max_retries})")
+                    started = time.perf_counter()
+                    try:
+                        response = route.model.generate_content(contents, **generation_kwargs)
+                    finally:
+                        record.latency += time.perf_counter() - started
+                    print(f"[API_SUCCESS] {route.model_name} responded successfully")
+                    self._record_tokens(record, response, prompt_tokens)
+                    # Fallback-model answers aren't cached under the requested model's key
+                    if cache and route.model_name == self.model_name and (cache_if is None or cache_if(response.text)):
+                        cache.set(cache_key, response.text, call_type)
+                    return response.text
+                except ResourceExhausted as e:
+                    reason = self._classify_429(e)
+                    record.rate_limited.append(reason)
+                    if reason == "quota":
+                        if self._handle_quota_error(route, record):
+                            continue  # Straight to the next key - no backoff needed
+                        raise
+                    retry_seconds = self._retry_delay(e, attempt, max_retries)
+                    if retry_seconds is None:
+                        raise
+                    attempt += 1
+                    record.retries = attempt
+                    record.retry_wait += retry_seconds
                     time.sleep(retry_seconds)
-                else:
-                    print(f"[{error_type}] {self.model_name} - Max retries reached. Error: {error_msg[:200]}")
+                except Exception as e:
+                    if generation_kwargs and self._reject_structured_output(route, e):
+                        continue  # Same route again, without JSON mode
+                    # Other errors - don't retry
+                    print(f"[API_ERROR] {route.name} failed: {type(e).__name__}: {str(e)[:200]}")
                     raise
-            except Exception as e:
-                # Other errors - don't retry
-                print(f"[API_ERROR] {self.model_name} failed: {type(e).__name__}: {str(e)[:200]}")
-                raise
\ No newline at end of file
+                finally:
+                    self.key_pool.release(route)
+        except Exception as e:
+            record.error = type(e).__name__
+            raise
+        finally:
+            self._finish_record(record)
+
+    async def agenerate(self, prompt: str, image_base64: str = None, call_type: str = "default", cache_if=None, image: PreparedImage = None, response_schema: dict = None) -> str:
+        """
+        Async version of generate() using the SDK's native async client.
+        Rate-limit and retry waits use asyncio.sleep, and at most settings.LLM_ASYNC_CONCURRENCY
+        calls are in flight per event loop, so many scans can share one thread.
+        """
+        contents, image_bytes = self._prepare_contents(prompt, image_base64, image)
+        record = LLMCallRecord(self.model_name, call_type)
+
+        cache, cache_key, cached = self._check_cache(prompt, image_bytes, call_type)
+        if cached is not None:
+            record.cache_hit = True
+            self._finish_record(record)
+            return cached
+
+        prompt_tokens = self._estimate_tokens(prompt, image_bytes)
+        max_retries = 3
+        attempt = 0
+        try:
+            async with _get_async_semaphore():
+                while True:
+                    route = self.key_pool.acquire()
+                    record.model = route.model_name
+                    generation_kwargs = self._generation_kwargs(route, response_schema)
+                    try:
+                        waited = await route.limiter.aacquire(prompt_tokens, self.priority, self.tenant)
+                        record.queue_wait += waited
+                        if waited > 0.05:
+                            print(f"[RATE_LIMIT] Waited {waited:.1f}s before {route.name} request")
+
+                        print(f"[API_CALL] Calling {route.name} async (attempt {attempt + 1}/{max_retries})")
+                        started = time.perf_counter()
+                        try:
+                            response = await route.async_model().generate_content_async(contents, **generation_kwargs)
+                        finally:
+                            record.latency += time.perf_counter() - started
+                        print(f"[API_SUCCESS] {route.model_name} responded successfully")
+                        self._record_tokens(record, response, prompt_tokens)
+                        if cache and route.model_name == self.model_name and (cache_if is None or cache_if(response.text)):
+                            cache.set(cache_key, response.text, call_type)
+                        return response.text
+                    except ResourceExhausted as e:
+                        reason = self._classify_429(e)
+                        record.rate_limited.append(reason)
+                        if reason == "quota":
+                            if self._handle_quota_error(route, record):
+                                continue
+                            raise
+                        retry_seconds = self._retry_delay(e, attempt, max_retries)
+                        if retry_seconds is None:
+                            raise
+                        attempt += 1
+                        record.retries = attempt
+                        record.retry_wait += retry_seconds
+                        await asyncio.sleep(retry_seconds)
+                    except Exception as e:
+                        if generation_kwargs and self._reject_structured_output(route, e):
+                            continue
+                        # Other errors - don't retry
+                        print(f"[API_ERROR] {route.name} failed: {type(e).__name__}: {str(e)[:200]}")
+                        raise
+                    finally:
+                        self.key_pool.release(route)
+        except Exception as e:
+            record.error = type(e).__name__
+            raise
+        finally:
+            self._finish_record(record)
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import random
+import re
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from database.models import ConceptCache as ConceptCacheEntry
+from llm.image_prep import PreparedImage
+from config.settings import settings
+
+NUM_PERMUTATIONS = 64
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(42)  # Fixed seed - signatures must be comparable across processes/deploys
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_PERMUTATIONS)]
+
+class ConceptCache:
+    """
+    DB-backed cache of extract_concepts() results.
+
+    - Exact hit: same normalized description (case/punctuation/whitespace-insensitive) + same image
+    - Near-duplicate hit: MinHash over word 3-shingles, estimated Jaccard >= CONCEPT_CACHE_NEAR_DUP_THRESHOLD
+      against the most recent CONCEPT_CACHE_SCAN_LIMIT entries with the same image
+    - TTL (CONCEPT_CACHE_TTL_DAYS) and LRU size cap (CONCEPT_CACHE_MAX_ENTRIES), evicted by last
+      access time - same policy as the LLM response cache (llm/cache.py)
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return " ".join(re.findall(r"[a-z0-9]+", (text or "").lower()))
+
+    @staticmethod
+    def image_hash(image: PreparedImage = None) -> str:
+        # Hash of the uploaded bytes, so the key doesn't depend on re-encoding settings
+        return image.source_hash if image else ""
+
+    def _content_hash(self, normalized: str, image_hash: str) -> str:
+        return hashlib.sha256(f"{normalized}|{image_hash}".encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def minhash(normalized: str) -> list[int]:
+        words = normalized.split()
+        shingles = {" ".join(words[i:i + 3]) for i in range(max(1, len(words) - 2))}
+        hashes = [int.from_bytes(hashlib.md5(s.encode('utf-8')).digest()[:8], 'big') for s in shingles]
+        return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+    @staticmethod
+    def similarity(sig_a: list[int], sig_b: list[int]) -> float:
+        """Estimated Jaccard similarity of two MinHash signatures"""
+        return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / NUM_PERMUTATIONS
+
+    @staticmethod
+    def _cutoff() -> datetime:
+        return datetime.utcnow() - timedelta(days=settings.CONCEPT_CACHE_TTL_DAYS)
+
+    def _hit(self, entry: ConceptCacheEntry) -> dict:
+        entry.last_accessed = datetime.utcnow()
+        return json.loads(entry.concepts)
+
+    def lookup(self, description: str, image: PreparedImage = None):
+        """Returns (concepts dict, 'exact' | 'near') on a hit, else (None, None). Expired entries never hit"""
+        normalized = self.normalize(description)
+        image_hash = self.image_hash(image)
+        cutoff = self._cutoff()
+
+        entry = self.db.query(ConceptCacheEntry).filter(
+            ConceptCacheEntry.content_hash == self._content_hash(normalized, image_hash)
+        ).order_by(ConceptCacheEntry.created_at.desc()).first()
+        if entry and entry.created_at >= cutoff:
+            return self._hit(entry), "exact"
+
+        if not settings.CONCEPT_CACHE_NEAR_DUP_ENABLED or not normalized:
+            return None, None
+
+        signature = self.minhash(normalized)
+        candidates = self.db.query(ConceptCacheEntry).filter(
+            ConceptCacheEntry.image_hash == image_hash,
+            ConceptCacheEntry.created_at >= cutoff
+        ).order_by(ConceptCacheEntry.created_at.desc()).limit(settings.CONCEPT_CACHE_SCAN_LIMIT).all()
+
+        best, best_score = None, 0.0
+        for candidate in candidates:
+            score = self.similarity(signature, json.loads(candidate.minhash))
+            if score > best_score:
+                best, best_score = candidate, score
+
+        if best and best_score >= settings.CONCEPT_CACHE_NEAR_DUP_THRESHOLD:
+            return self._hit(best), "near"
+        return None, None
+
+    def store(self, description: str, concepts: dict, image: PreparedImage = None):
+        """
+        Cache freshly extracted concepts, replacing an expired entry for the same content, then drop
+        expired entries and evict least-recently-used ones beyond the size cap (caller commits)
+        """
+        normalized = self.normalize(description)
+        image_hash = self.image_hash(image)
+        content_hash = self._content_hash(normalized, image_hash)
+        self.db.query(ConceptCacheEntry).filter(ConceptCacheEntry.content_hash == content_hash).delete()
+        now = datetime.utcnow()
+        self.db.add(ConceptCacheEntry(
+            content_hash=content_hash,
+            image_hash=image_hash,
+            minhash=json.dumps(self.minhash(normalized)),
+            concepts=json.dumps(concepts),
+            created_at=now,
+            last_accessed=now
+        ))
+        self._evict()
+
+    def _evict(self):
+        self.db.query(ConceptCacheEntry).filter(ConceptCacheEntry.created_at < self._cutoff()).delete()
+        count = self.db.query(ConceptCacheEntry).count()
+        if count > settings.CONCEPT_CACHE_MAX_ENTRIES:
+            oldest = [row.id for row in self.db.query(ConceptCacheEntry.id).order_by(
+                func.coalesce(ConceptCacheEntry.last_accessed, ConceptCacheEntry.created_at).asc()
+            ).limit(count - settings.CONCEPT_CACHE_MAX_ENTRIES)]
+            self.db.query(ConceptCacheEntry).filter(ConceptCacheEntry.id.in_(oldest)).delete(synchronize_session=False)
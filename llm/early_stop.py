@@ -0,0 +1,51 @@
+from config.settings import settings
+
+class EarlyStopPolicy:
+    """
+    When to stop scoring rank-ordered candidates (see LexicalRanker) before the list runs out.
+
+    Checked after each wave of similarity batches:
+    - Saturated: `min_matches` products already scored >= `match_score` - the report and
+      email can't get much better, the idea clearly has close competitors.
+    - Diminishing returns: the expected number of further competitors among the remaining
+      candidates is below `min_expected_gain`. Estimated from the last wave's (smoothed) hit
+      rate, scaled per candidate by its rank score relative to that wave - lower-ranked
+      candidates are assumed less likely to match.
+    Either rule is off when its setting is 0.
+    """
+
+    def __init__(self, min_matches: int = None, match_score: float = None, min_expected_gain: float = None, threshold: float = None):
+        self.min_matches = settings.EARLY_STOP_MATCHES if min_matches is None else min_matches
+        self.match_score = settings.EARLY_STOP_SCORE if match_score is None else match_score
+        self.min_expected_gain = settings.EARLY_STOP_MIN_EXPECTED_GAIN if min_expected_gain is None else min_expected_gain
+        self.threshold = settings.SIMILARITY_THRESHOLD if threshold is None else threshold
+
+    def expected_gain(self, wave: list[tuple], remaining_ranks: list[float]) -> float:
+        """
+        Expected competitors among the remaining candidates.
+        wave: (rank score, similarity score) for the products scored in the last wave
+        """
+        hits = sum(1 for _, score in wave if score >= self.threshold)
+        hit_rate = (hits + 1) / (len(wave) + 2)  # Laplace smoothing - one empty wave isn't proof
+        wave_rank = sum(rank for rank, _ in wave) / len(wave) if wave else 0.0
+        if wave_rank <= 0:
+            return hit_rate * len(remaining_ranks)
+        return sum(hit_rate * min(1.0, max(rank, 0.0) / wave_rank) for rank in remaining_ranks)
+
+    def check(self, scores: list[float], wave: list[tuple], remaining_ranks: list[float]) -> str:
+        """
+        scores: every similarity score known so far (memoized ones included)
+        Returns the reason to stop, or None to keep going.
+        """
+        if not remaining_ranks:
+            return None
+
+        strong = sum(1 for score in scores if score >= self.match_score)
+        if self.min_matches and strong >= self.min_matches:
+            return f"{strong} matches >= {self.match_score:g}%"
+
+        if self.min_expected_gain and wave:
+            gain = self.expected_gain(wave, remaining_ranks)
+            if gain < self.min_expected_gain:
+                return f"expected {gain:.2f} more competitors in the remaining {len(remaining_ranks)} < {self.min_expected_gain:g}"
+        return None
@@ -0,0 +1,129 @@
+import base64
+import hashlib
+import io
+import threading
+import time
+from collections import OrderedDict
+from config.settings import settings
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional - without it images are sent as-is (with the correct MIME type)
+    Image = None
+
+# Magic-byte signatures -> MIME type
+_SIGNATURES = [
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+]
+
+class PreparedImage:
+    """Image bytes ready to send to Gemini, plus what preparation cost/saved"""
+
+    def __init__(self, data: bytes, mime_type: str, source_hash: str, original_size: int = None, elapsed: float = 0.0):
+        self.data = data
+        self.mime_type = mime_type
+        self.source_hash = source_hash  # SHA256 of the uploaded bytes - stable cache key for the upload
+        self.original_size = original_size if original_size is not None else len(data)
+        self.elapsed = elapsed
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_size - len(self.data)
+
+def detect_mime_type(data: bytes) -> str:
+    """Detect image type from magic bytes (None if unknown)"""
+    for signature, mime_type in _SIGNATURES:
+        if data.startswith(signature):
+            return mime_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[4:12] in (b"ftypheic", b"ftypheix", b"ftypmif1"):
+        return "image/heic"
+    return None
+
+def decode_image_base64(image_base64: str) -> bytes:
+    """Decode a raw base64 string or data URI (e.g. "data:image/png;base64,ABCD...")"""
+    if "base64," in image_base64:
+        _, image_base64 = image_base64.split("base64,", 1)
+    return base64.b64decode(image_base64)
+
+def _reencode(data: bytes) -> tuple:
+    """Downscale to IMAGE_MAX_EDGE and re-encode without metadata. Returns (bytes, mime_type)"""
+    with Image.open(io.BytesIO(data)) as img:
+        # Apply EXIF rotation before the metadata is dropped, so phone photos stay upright
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((settings.IMAGE_MAX_EDGE, settings.IMAGE_MAX_EDGE))
+
+        if img.mode in ("RGBA", "LA", "P"):
+            # Flatten transparency onto white - JPEG has no alpha channel
+            img = img.convert("RGBA")
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            background.paste(img, mask=img.split()[-1])
+            img = background
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+
+        out = io.BytesIO()
+        # A fresh save without exif=/icc_profile= writes no metadata
+        if settings.IMAGE_OUTPUT_FORMAT == "webp":
+            img.save(out, format="WEBP", quality=settings.IMAGE_QUALITY)
+            return out.getvalue(), "image/webp"
+        img.save(out, format="JPEG", quality=settings.IMAGE_QUALITY, optimize=True)
+        return out.getvalue(), "image/jpeg"
+
+_prepared = OrderedDict()  # source_hash -> PreparedImage (LRU)
+_prepared_lock = threading.Lock()
+_PREPARED_CACHE_SIZE = 32
+
+def prepare_image(image) -> PreparedImage:
+    """
+    Turn an upload (base64 string / data URI, or raw bytes) into a compact image for Gemini:
+    detect the real MIME type, downscale, re-encode to JPEG/WebP, strip metadata.
+    Results are cached by content hash, so the same upload is only processed once per process.
+    Raises ValueError if the data isn't a decodable image.
+    """
+    start = time.perf_counter()
+    try:
+        data = decode_image_base64(image) if isinstance(image, str) else bytes(image)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid base64 image: {e}")
+
+    source_hash = hashlib.sha256(data).hexdigest()
+    with _prepared_lock:
+        if source_hash in _prepared:
+            _prepared.move_to_end(source_hash)
+            return _prepared[source_hash]
+
+    mime_type = detect_mime_type(data)
+    prepared_data = data
+
+    if Image is not None:
+        try:
+            prepared_data, mime_type = _reencode(data)
+        except Exception as e:
+            if not mime_type:
+                raise ValueError(f"Unsupported image: {e}")
+            print(f"[IMAGE_PREP] Re-encode failed ({e}) - sending original {mime_type}")
+    elif not mime_type:
+        raise ValueError("Unsupported image type")
+
+    prepared = PreparedImage(
+        data=prepared_data,
+        mime_type=mime_type,
+        source_hash=source_hash,
+        original_size=len(data),
+        elapsed=time.perf_counter() - start
+    )
+    print(
+        f"[IMAGE_PREP] {prepared.original_size / 1024:.0f}KB -> {len(prepared.data) / 1024:.0f}KB {mime_type} "
+        f"(saved {prepared.bytes_saved / 1024:.0f}KB) in {prepared.elapsed * 1000:.0f}ms"
+    )
+
+    with _prepared_lock:
+        _prepared[source_hash] = prepared
+        while len(_prepared) > _PREPARED_CACHE_SIZE:
+            _prepared.popitem(last=False)
+    return prepared
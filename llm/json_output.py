@@ -0,0 +1,80 @@
+import json
+import re
+
+# Response schemas for the matcher's JSON calls (Gemini's OpenAPI subset). Sent as
+# response_schema when the SDK/model supports structured output; the prompts still spell
+# out the same shape for models that don't.
+EXTRACT_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "core_function": {"type": "STRING"},
+        "key_features": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "search_keywords": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "negative_keywords": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "category": {"type": "STRING"},
+    },
+    "required": ["core_function", "search_keywords", "negative_keywords", "category"],
+}
+
+SIMILARITY_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "score": {"type": "NUMBER"},
+        "reasoning": {"type": "STRING"},
+        "user_advantage": {"type": "STRING"},
+    },
+    "required": ["score", "reasoning"],
+}
+
+BATCH_SIMILARITY_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {"index": {"type": "INTEGER"}, **SIMILARITY_SCHEMA["properties"]},
+        "required": ["index", "score", "reasoning"],
+    },
+}
+
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$", re.IGNORECASE)
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
+class JSONExtractionError(ValueError):
+    """No valid JSON object or array could be found in an LLM response"""
+
+def strip_code_fences(text: str) -> str:
+    """Remove markdown code fences from LLM JSON responses"""
+    return _FENCE_RE.sub("", text.strip()).strip()
+
+def _first_json_value(text: str):
+    """First position in `text` where a complete JSON object/array decodes, or raise"""
+    decoder = json.JSONDecoder()
+    for match in re.finditer(r"[{\[]", text):
+        for candidate in (text[match.start():], _TRAILING_COMMA_RE.sub(r"\1", text[match.start():])):
+            try:
+                return decoder.raw_decode(candidate)[0]
+            except json.JSONDecodeError:
+                continue
+    raise JSONExtractionError(f"No JSON object or array in response: {text[:100]!r}")
+
+def parse_json(response: str) -> tuple:
+    """
+    Returns (data, outcome): outcome is "clean" when the (fence-stripped) response is JSON as a
+    whole, "extracted" when the first valid object/array had to be dug out of surrounding prose
+    or fixed (trailing commas). Raises JSONExtractionError if there is none.
+    """
+    if not isinstance(response, str):
+        raise JSONExtractionError(f"Expected a text response, got {type(response).__name__}")
+    text = strip_code_fences(response)
+    try:
+        return json.loads(text), "clean"
+    except json.JSONDecodeError:
+        return _first_json_value(text), "extracted"
+
+def has_json_start(response: str) -> bool:
+    return isinstance(response, str) and re.search(r"[{\[]", response) is not None
+
+def malformed_fragment(response: str, max_chars: int = 4000) -> str:
+    """The part of a broken response worth sending to a repair call: from the first bracket on"""
+    text = strip_code_fences(response or "")
+    match = re.search(r"[{\[]", text)
+    return (text[match.start():] if match else text)[:max_chars]
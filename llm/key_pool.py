@@ -0,0 +1,194 @@
+import asyncio
+import hashlib
+import threading
+import time
+import weakref
+from datetime import datetime, timedelta
+import google.generativeai as genai
+import google.ai.generativelanguage as glm
+from google.api_core.exceptions import ResourceExhausted
+from config.settings import settings
+from llm.rate_limiter import get_rate_limiter
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+
+def key_id(api_key: str) -> str:
+    """Short, log-safe identifier for an API key"""
+    return hashlib.sha256((api_key or "").encode('utf-8')).hexdigest()[:8]
+
+def next_quota_reset(now: float = None) -> float:
+    """Epoch seconds of the next daily quota reset (midnight in settings.GEMINI_QUOTA_RESET_TZ)"""
+    tz = None
+    if ZoneInfo is not None:
+        try:
+            tz = ZoneInfo(settings.GEMINI_QUOTA_RESET_TZ)
+        except Exception:
+            tz = None  # tzdata missing - fall back to UTC midnight
+    current = datetime.fromtimestamp(now if now is not None else time.time(), tz=tz)
+    midnight = (current + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return midnight.timestamp()
+
+def _bind_transport(model, client=None, async_client=None):
+    """
+    Put our own service clients on a GenerativeModel. google-generativeai 0.3.0 (pinned in
+    requirements.txt) has no per-model key or client option - GenerativeModel only falls back to
+    process-wide clients in these slots - so check they still exist and fail loudly after an upgrade.
+    """
+    for attr, value in (("_client", client), ("_async_client", async_client)):
+        if value is None:
+            continue
+        if not hasattr(model, attr):
+            raise RuntimeError(f"google-generativeai {genai.__version__} has no GenerativeModel.{attr} - per-key clients need the version pinned in requirements.txt")
+        setattr(model, attr, value)
+    return model
+
+class KeyRoute:
+    """
+    One (model, API key) pair: its own GenerativeModel bound to that key, the shared
+    rate limiter for the pair, and whether the key is out of daily quota for this model.
+
+    Async calls use async_model(): grpc.aio clients belong to the event loop they were first
+    used on (each asyncio.run() makes a new one), so every loop gets its own client.
+    """
+
+    def __init__(self, model_name: str, api_key: str, model=None):
+        self.model_name = model_name
+        self.key_id = key_id(api_key)
+        self.limiter = get_rate_limiter(model_name, api_key)
+        self._api_key = api_key
+        self._fixed_model = model is not None  # Injected model (tests) serves sync and async calls
+        self.model = model if model is not None else self._build_model(model_name, api_key)
+        self._async_models = weakref.WeakKeyDictionary()  # event loop -> GenerativeModel
+        self._async_lock = threading.Lock()
+        self.exhausted_until = 0.0
+        self.in_flight = 0
+        self.requests = 0
+        self.quota_errors = 0
+
+    @staticmethod
+    def _build_model(model_name: str, api_key: str):
+        model = genai.GenerativeModel(model_name)
+        if api_key and api_key != settings.GEMINI_API_KEY:
+            # genai.configure() holds a single global key - give other keys their own transport
+            _bind_transport(model, client=glm.GenerativeServiceClient(client_options={"api_key": api_key}))
+        return model
+
+    def async_model(self):
+        """GenerativeModel for async calls on the running event loop"""
+        if self._fixed_model:
+            return self.model
+        loop = asyncio.get_running_loop()
+        with self._async_lock:
+            model = self._async_models.get(loop)
+            if model is None:
+                # Created inside the loop, so the grpc.aio channel binds to it
+                async_client = glm.GenerativeServiceAsyncClient(client_options={"api_key": self._api_key or settings.GEMINI_API_KEY})
+                model = _bind_transport(genai.GenerativeModel(self.model_name), async_client=async_client)
+                self._async_models[loop] = model
+        return model
+
+    @property
+    def name(self) -> str:
+        return f"{self.model_name}/{self.key_id}"
+
+    def is_healthy(self, now: float) -> bool:
+        return now >= self.exhausted_until
+
+class KeyPool:
+    """
+    Routes calls for one requested model across API keys and fallback models.
+
+    Routes are grouped into tiers: the requested model first, then each fallback model.
+    A call goes to the least-loaded healthy route of the first tier that has one, so the
+    fallback model is only used once every key is out of quota for the primary.
+    """
+
+    def __init__(self, tiers: list[list[KeyRoute]]):
+        self.tiers = [tier for tier in tiers if tier]
+        self._lock = threading.Lock()
+
+    @property
+    def routes(self) -> list[KeyRoute]:
+        return [route for tier in self.tiers for route in tier]
+
+    def acquire(self) -> KeyRoute:
+        """Pick a route and count it as in flight (pair with release()). Raises ResourceExhausted if none is healthy"""
+        now = time.time()
+        with self._lock:
+            for tier in self.tiers:
+                healthy = [route for route in tier if route.is_healthy(now)]
+                if healthy:
+                    route = min(healthy, key=lambda r: (r.limiter.utilization(), r.in_flight))
+                    route.in_flight += 1
+                    route.requests += 1
+                    return route
+
+        reset = min(route.exhausted_until for route in self.routes)
+        raise ResourceExhausted(
+            f"Daily quota exhausted on all API keys for {self.tiers[0][0].model_name} "
+            f"(next reset at {datetime.fromtimestamp(reset).isoformat(timespec='minutes')})"
+        )
+
+    def release(self, route: KeyRoute):
+        with self._lock:
+            route.in_flight -= 1
+
+    def mark_exhausted(self, route: KeyRoute, until: float = None):
+        """Take a key out of rotation for this model until its quota resets"""
+        with self._lock:
+            route.quota_errors += 1
+            route.exhausted_until = until if until is not None else next_quota_reset()
+        print(f"[KEY_POOL] {route.name} out of daily quota until {datetime.fromtimestamp(route.exhausted_until).isoformat(timespec='minutes')}")
+
+    def has_healthy_route(self) -> bool:
+        now = time.time()
+        return any(route.is_healthy(now) for route in self.routes)
+
+    def snapshot(self) -> list[dict]:
+        now = time.time()
+        with self._lock:
+            return [
+                {
+                    "route": route.name,
+                    "healthy": route.is_healthy(now),
+                    "exhausted_until": datetime.fromtimestamp(route.exhausted_until).isoformat() if not route.is_healthy(now) else None,
+                    "in_flight": route.in_flight,
+                    "requests": route.requests,
+                    "quota_errors": route.quota_errors,
+                    "utilization": round(route.limiter.utilization(), 3),
+                }
+                for route in self.routes
+            ]
+
+_routes = {}  # (model, key_id) -> KeyRoute, shared so exhaustion is seen by every pool
+_pools = {}
+_registry_lock = threading.Lock()
+
+def _get_route(model_name: str, api_key: str) -> KeyRoute:
+    route = _routes.get((model_name, key_id(api_key)))
+    if route is None:
+        route = KeyRoute(model_name, api_key)
+        _routes[(model_name, route.key_id)] = route
+    return route
+
+def get_key_pool(model_name: str) -> KeyPool:
+    """Shared pool for a requested model: every configured key, then the model's fallbacks"""
+    with _registry_lock:
+        pool = _pools.get(model_name)
+        if pool is None:
+            models = [model_name] + [m for m in settings.GEMINI_FALLBACK_MODELS.get(model_name, []) if m != model_name]
+            pool = KeyPool([
+                [_get_route(model, api_key) for api_key in settings.GEMINI_API_KEYS]
+                for model in models
+            ])
+            _pools[model_name] = pool
+        return pool
+
+def key_pool_snapshots() -> dict:
+    """{requested model: route states} for the metrics endpoint"""
+    with _registry_lock:
+        pools = dict(_pools)
+    return {model_name: pool.snapshot() for model_name, pool in pools.items()}
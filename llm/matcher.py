@@ -1,30 +1,181 @@
+import asyncio
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from llm.client import GeminiClient
+from llm.early_stop import EarlyStopPolicy
+from llm.image_prep import PreparedImage
+from llm.json_output import (
+    BATCH_SIMILARITY_SCHEMA, EXTRACT_SCHEMA, SIMILARITY_SCHEMA, JSONExtractionError, has_json_start, malformed_fragment, parse_json
+)
+from llm.metrics import ScanMetrics, get_llm_metrics
+from llm.rate_limiter import PRIORITY_INTERACTIVE
+from llm.relevance import get_relevance_model
+from llm.prompts import (
+    compact_products, compact_snippets, compact_text, estimate_tokens,
+    strip_marketplace_boilerplate, truncate_tokens
+)
 from config.settings import settings
 
+class PartialScoringError(Exception):
+    """
+    A similarity call failed (rate limit / API error) after other batches had already been scored.
+    `results` is aligned with the products passed in: scores that came back, None for the rest.
+    `scored` is how many leading products weren't skipped by an early-stop policy.
+    """
+
+    def __init__(self, error: Exception, results: list, scored: int = None):
+        super().__init__(str(error))
+        self.error = error
+        self.results = results
+        self.scored = len(results) if scored is None else scored
+
 class ConceptMatcher:
-    def __init__(self):
+    def __init__(self, priority: str = PRIORITY_INTERACTIVE, tenant=None):
         # Use full model for important reasoning tasks
         self.client = GeminiClient()
         # Use lite model for bulk similarity matching (better rate limits)
         self.lite_client = GeminiClient(model_name=settings.GEMINI_LITE_MODEL)
+        self.set_priority(priority, tenant)
+        # Per-scan counters for the scan report (e.g. how many products each cascade tier handled)
+        self.stats = {}
+        self._stats_lock = threading.Lock()
+        # Per-scan LLM call metrics (queue wait, latency, retries, tokens) from both clients
+        self.call_metrics = ScanMetrics()
+        self.client.scan_metrics = self.call_metrics
+        self.lite_client.scan_metrics = self.call_metrics
 
-    def _clean_json_response(self, response: str) -> str:
-        """Remove markdown code fences from LLM JSON responses"""
-        clean = response.strip()
-        if clean.startswith("```json"):
-            clean = clean[7:]
-        if clean.startswith("```"):
-            clean = clean[3:]
-        if clean.endswith("```"):
-            clean = clean[:-3]
-        return clean.strip()
-
-    def extract_concepts(self, user_description: str, image_base64: str = None) -> dict:
-        """Extract searchable concepts from user's idea (and optional image)"""
-        
+    def set_priority(self, priority: str, tenant=None):
+        """Queue this matcher's LLM calls as `priority` (interactive / monitoring / backfill) on behalf of `tenant`"""
+        for client in (self.client, self.lite_client):
+            client.priority = priority
+            client.tenant = tenant
+
+    def reset_stats(self):
+        """Start a fresh scan report (for matchers reused across scans)"""
+        with self._stats_lock:
+            self.stats = {}
+        self.call_metrics = ScanMetrics()
+        self.client.scan_metrics = self.call_metrics
+        self.lite_client.scan_metrics = self.call_metrics
+
+    def _count(self, key: str, n: int = 1):
+        with self._stats_lock:
+            self.stats[key] = self.stats.get(key, 0) + n
+
+    def _is_valid_json(self, response: str) -> bool:
+        """Cache guard - only responses with usable JSON are worth replaying"""
+        try:
+            parse_json(response)
+            return True
+        except JSONExtractionError:
+            return False
+
+    def _record_parse(self, model: str, call_type: str, outcome: str):
+        """Count how a JSON answer was parsed (process-wide metrics; non-clean outcomes also in the scan report)"""
+        get_llm_metrics().record_json_parse(model, call_type, outcome)
+        if outcome != "clean":
+            self._count(f"json_{outcome}_{call_type}")
+
+    def _build_repair_prompt(self, response: str, schema: dict) -> str:
+        return f"""
+Fix this JSON. It was meant to match the schema below but does not parse.
+
+SCHEMA:
+{json.dumps(schema)}
+
+BROKEN JSON:
+{malformed_fragment(response)}
+
+Return the corrected JSON only - same content, valid syntax, no explanation.
+"""
+
+    def _parse_json(self, response: str, call_type: str, client: GeminiClient, schema: dict):
+        """
+        Parse a JSON answer, tolerating fences and surrounding prose. If there is no valid JSON,
+        only the broken fragment (from the first bracket on) is sent back to the lite model for repair, up to
+        settings.LLM_JSON_REPAIR_ATTEMPTS times - cheaper than re-running the original prompt.
+        Raises JSONExtractionError if it still can't be parsed.
+        """
+        try:
+            data, outcome = parse_json(response)
+            self._record_parse(client.model_name, call_type, outcome)
+            return data
+        except JSONExtractionError as e:
+            error = e
+
+        # Nothing JSON-like at all (e.g. a refusal) - there's no fragment to repair
+        attempts = settings.LLM_JSON_REPAIR_ATTEMPTS if has_json_start(response) else 0
+        for attempt in range(attempts):
+            print(f"[JSON_REPAIR] Unparseable {call_type} response - asking for a fix (attempt {attempt + 1}/{attempts})")
+            response = self.lite_client.generate(
+                self._build_repair_prompt(response, schema), call_type="json_repair",
+                cache_if=self._is_valid_json, response_schema=schema
+            )
+            try:
+                data, _ = parse_json(response)
+                self._record_parse(client.model_name, call_type, "repaired")
+                return data
+            except JSONExtractionError as e:
+                error = e
+
+        self._record_parse(client.model_name, call_type, "failed")
+        raise error
+
+    async def _aparse_json(self, response: str, call_type: str, client: GeminiClient, schema: dict):
+        """Async version of _parse_json()"""
+        try:
+            data, outcome = parse_json(response)
+            self._record_parse(client.model_name, call_type, outcome)
+            return data
+        except JSONExtractionError as e:
+            error = e
+
+        # Nothing JSON-like at all (e.g. a refusal) - there's no fragment to repair
+        attempts = settings.LLM_JSON_REPAIR_ATTEMPTS if has_json_start(response) else 0
+        for attempt in range(attempts):
+            print(f"[JSON_REPAIR] Unparseable {call_type} response - asking for a fix (attempt {attempt + 1}/{attempts})")
+            response = await self.lite_client.agenerate(
+                self._build_repair_prompt(response, schema), call_type="json_repair",
+                cache_if=self._is_valid_json, response_schema=schema
+            )
+            try:
+                data, _ = parse_json(response)
+                self._record_parse(client.model_name, call_type, "repaired")
+                return data
+            except JSONExtractionError as e:
+                error = e
+
+        self._record_parse(client.model_name, call_type, "failed")
+        raise error
+
+    def _compact_prompt(self, formatter, raw_args: tuple, compact_args: tuple) -> str:
+        """
+        Render a prompt from compacted inputs (see llm.prompts) and record estimated tokens
+        before/after compaction in the scan's LLM summary.
+        """
+        raw = formatter(*raw_args)
+        prompt = formatter(*compact_args) if settings.PROMPT_COMPACTION_ENABLED else raw
+        self.call_metrics.add_prompt(estimate_tokens(raw), estimate_tokens(prompt))
+        return prompt
+
+    def _compact_idea(self, user_idea: str) -> str:
+        return compact_text(user_idea, settings.PROMPT_IDEA_TOKENS)
+
+    def _compact_products(self, products: list[dict]) -> list[dict]:
+        return compact_products(products, settings.PROMPT_PRODUCT_NAME_TOKENS, settings.PROMPT_PRODUCT_DESCRIPTION_TOKENS)
+
+    def _build_extract_prompt(self, user_description: str, has_image: bool) -> str:
+        return self._compact_prompt(
+            self._format_extract_prompt,
+            (user_description, has_image),
+            (self._compact_idea(user_description), has_image)
+        )
+
+    def _format_extract_prompt(self, user_description: str, has_image: bool) -> str:
         prompt_intro = "Extract key concepts from this product idea for searching."
-        if image_base64:
+        if has_image:
             prompt_intro += " I have provided an image of the concept along with the description. Use visual details from the image (materials, shape, mechanism) to enhance the search keywords."
 
         prompt = f"""
@@ -46,8 +197,19 @@ Return JSON with:
 
 JSON only, no explanation.
 """
-        response = self.client.generate(prompt, image_base64=image_base64)
-        return json.loads(self._clean_json_response(response))
+        return prompt
+
+    def extract_concepts(self, user_description: str, image_base64: str = None, image: PreparedImage = None) -> dict:
+        """Extract searchable concepts from user's idea (and optional image - raw base64 or already prepared)"""
+        prompt = self._build_extract_prompt(user_description, bool(image_base64 or image))
+        response = self.client.generate(prompt, image_base64=image_base64, call_type="extract", cache_if=self._is_valid_json, image=image, response_schema=EXTRACT_SCHEMA)
+        return self._parse_json(response, "extract", self.client, EXTRACT_SCHEMA)
+
+    async def aextract_concepts(self, user_description: str, image_base64: str = None, image: PreparedImage = None) -> dict:
+        """Async version of extract_concepts()"""
+        prompt = self._build_extract_prompt(user_description, bool(image_base64 or image))
+        response = await self.client.agenerate(prompt, image_base64=image_base64, call_type="extract", cache_if=self._is_valid_json, image=image, response_schema=EXTRACT_SCHEMA)
+        return await self._aparse_json(response, "extract", self.client, EXTRACT_SCHEMA)
 
     def filter_noise(self, results: list[dict], negative_keywords: list[str]) -> list[dict]:
         """
@@ -81,13 +243,37 @@ JSON only, no explanation.
 
         return clean_results
 
-    def calculate_similarity(self, user_idea: str, competitor_product: dict) -> dict:
+    def skip_irrelevant(self, concepts: dict, products: list[dict]) -> list[dict]:
         """
-        Compare user's idea to found product
-        Returns: {score: 0-100, reasoning: str}
-        Uses lite model for better rate limits (bulk matching task)
+        Drop candidates the local relevance model (llm.relevance) is confident aren't competitors,
+        before any LLM call. No-op until a model with a validated skip threshold has been trained.
         """
-        prompt = f"""
+        model = get_relevance_model()
+        if model is None or not model.skip_below or not products:
+            return products
+
+        probabilities = model.predict(concepts, products)
+        kept = []
+        for product, probability in zip(products, probabilities):
+            product['relevance'] = round(float(probability), 3)
+            if probability >= model.skip_below:
+                kept.append(product)
+
+        skipped = len(products) - len(kept)
+        if skipped:
+            self._count('relevance_skipped', skipped)
+            print(f"[RELEVANCE] Skipped {skipped}/{len(products)} candidates below p={model.skip_below:.3f}")
+        return kept
+
+    def _build_similarity_prompt(self, user_idea: str, competitor_product: dict) -> str:
+        return self._compact_prompt(
+            self._format_similarity_prompt,
+            (user_idea, competitor_product),
+            (self._compact_idea(user_idea), self._compact_products([competitor_product])[0])
+        )
+
+    def _format_similarity_prompt(self, user_idea: str, competitor_product: dict) -> str:
+        return f"""
 Compare this invention idea to an existing product:
 
 USER'S IDEA:
@@ -107,13 +293,372 @@ Respond with JSON:
 
 JSON only.
 """
-        response = self.lite_client.generate(prompt)  # Use lite model for bulk matching
-        return json.loads(self._clean_json_response(response))
 
-    def generate_verdict(self, user_idea: str, competitors: list[dict]) -> str:
+    def calculate_similarity(self, user_idea: str, competitor_product: dict) -> dict:
         """
-        Generate a 1-sentence GO/NO-GO verdict based on the found competitors.
+        Compare user's idea to found product
+        Returns: {score: 0-100, reasoning: str}
+        Uses lite model for better rate limits (bulk matching task)
+        """
+        prompt = self._build_similarity_prompt(user_idea, competitor_product)
+        response = self.lite_client.generate(prompt, call_type="similarity", cache_if=self._is_valid_json, response_schema=SIMILARITY_SCHEMA)  # Use lite model for bulk matching
+        return self._parse_json(response, "similarity", self.lite_client, SIMILARITY_SCHEMA)
+
+    async def acalculate_similarity(self, user_idea: str, competitor_product: dict) -> dict:
+        """Async version of calculate_similarity()"""
+        prompt = self._build_similarity_prompt(user_idea, competitor_product)
+        response = await self.lite_client.agenerate(prompt, call_type="similarity", cache_if=self._is_valid_json, response_schema=SIMILARITY_SCHEMA)
+        return await self._aparse_json(response, "similarity", self.lite_client, SIMILARITY_SCHEMA)
+
+    def _build_batch_similarity_prompt(self, user_idea: str, products: list[dict]) -> str:
+        """Build one prompt that asks for a score per product, keyed by list index"""
+        return self._compact_prompt(
+            self._format_batch_similarity_prompt,
+            (user_idea, products),
+            (self._compact_idea(user_idea), self._compact_products(products))
+        )
+
+    def _format_batch_similarity_prompt(self, user_idea: str, products: list[dict]) -> str:
+        product_blocks = "\n".join([
+            f"""[{i}]
+Name: {p.get('name', 'N/A')}
+Description: {p.get('description', 'N/A')}
+Price: {p.get('price', 'N/A')}
+"""
+            for i, p in enumerate(products)
+        ])
+
+        return f"""
+Compare this invention idea to each of the existing products below.
+
+USER'S IDEA:
+{user_idea}
+
+EXISTING PRODUCTS:
+{product_blocks}
+Respond with a JSON array containing exactly one object per product:
+[
+  {{
+    "index": <product number from the list above>,
+    "score": <0-100 similarity percentage>,
+    "reasoning": "<why they are/aren't similar>",
+    "user_advantage": "<what makes user's idea unique, if anything>"
+  }}
+]
+
+Include every product index from 0 to {len(products) - 1}. JSON only.
+"""
+
+    def _parse_batch_similarity(self, data, count: int) -> dict:
         """
+        Turn a parsed batch similarity response into {index: similarity}.
+        Entries with an unknown index or a non-numeric score are dropped so they get resent,
+        as is everything if the response isn't an array/object (e.g. a bare JSON scalar).
+        """
+        if isinstance(data, dict):
+            # Some responses wrap the array, e.g. {"results": [...]}
+            data = next((v for v in data.values() if isinstance(v, list)), [])
+        elif not isinstance(data, list):
+            return {}
+
+        parsed = {}
+        for entry in data:
+            if not isinstance(entry, dict):
+                continue
+            try:
+                index = int(entry.get('index'))
+                score = float(entry.get('score'))
+            except (TypeError, ValueError):
+                continue
+            if 0 <= index < count and index not in parsed:
+                parsed[index] = {
+                    "score": score,
+                    "reasoning": entry.get('reasoning', ''),
+                    "user_advantage": entry.get('user_advantage', '')
+                }
+        return parsed
+
+    def _merge_batch_response(self, data, pending: list[int], scored: dict) -> list[int]:
+        """Record the scores in parsed response `data` (None if unparseable) for the `pending` products. Returns the indices still missing"""
+        parsed = self._parse_batch_similarity(data, len(pending)) if data is not None else {}
+
+        for local_index, similarity in parsed.items():
+            scored[pending[local_index]] = similarity
+
+        # Resend only the products the model skipped
+        return [i for i in pending if i not in scored]
+
+    def similarity_batch_prompts(self, user_idea: str, products: list[dict], batch_size: int = None) -> list[tuple]:
+        """
+        Split `products` into batch similarity prompts for offline scoring.
+        Returns [(product indices, prompt)]; parse each response with parse_similarity_batch().
+        """
+        batch_size = batch_size or settings.SIMILARITY_BATCH_SIZE
+        chunks = []
+        for start in range(0, len(products), batch_size):
+            indices = list(range(start, min(start + batch_size, len(products))))
+            chunks.append((indices, self._build_batch_similarity_prompt(user_idea, [products[i] for i in indices])))
+        return chunks
+
+    def parse_similarity_batch(self, response: str, indices: list[int]) -> dict:
+        """
+        Scores from one offline batch response as {product index: similarity}. No repair call here
+        (empty if unparseable) - the products are simply sent again in the next pass.
+        """
+        try:
+            data, outcome = parse_json(response)
+        except JSONExtractionError as e:
+            print(f"[MATCH_BATCH] Unparseable batch response for {len(indices)} products: {e}")
+            data, outcome = None, "failed"
+        self._record_parse(self.lite_client.model_name, "similarity", outcome)
+
+        scored = {}
+        self._merge_batch_response(data, indices, scored)
+        return scored
+
+    def _score_batch(self, user_idea: str, products: list[dict], indices: list[int], max_resends: int, client: GeminiClient = None) -> tuple:
+        """
+        Score one batch, resending only the products missing from a partial answer.
+        Returns ({index: similarity}, API error or None) - a failed resend keeps what was scored.
+        """
+        client = client or self.lite_client  # Lite model for bulk matching unless escalated
+        scored = {}
+        pending = list(indices)
+
+        try:
+            for attempt in range(max_resends + 1):
+                prompt = self._build_batch_similarity_prompt(user_idea, [products[i] for i in pending])
+                response = client.generate(prompt, call_type="similarity", cache_if=self._is_valid_json, response_schema=BATCH_SIMILARITY_SCHEMA)
+                try:
+                    data = self._parse_json(response, "similarity", client, BATCH_SIMILARITY_SCHEMA)
+                except JSONExtractionError as e:
+                    print(f"[MATCH_BATCH] Unparseable response for {len(pending)} products: {e}")
+                    data = None
+                pending = self._merge_batch_response(data, pending, scored)
+                if not pending:
+                    break
+                if attempt < max_resends:
+                    print(f"[MATCH_BATCH] {len(pending)} products missing from response - resending (attempt {attempt + 1}/{max_resends})")
+        except Exception as e:
+            return scored, e
+
+        return scored, None
+
+    async def _ascore_batch(self, user_idea: str, products: list[dict], indices: list[int], max_resends: int, client: GeminiClient = None) -> tuple:
+        """Async version of _score_batch()"""
+        client = client or self.lite_client
+        scored = {}
+        pending = list(indices)
+
+        try:
+            for attempt in range(max_resends + 1):
+                prompt = self._build_batch_similarity_prompt(user_idea, [products[i] for i in pending])
+                response = await client.agenerate(prompt, call_type="similarity", cache_if=self._is_valid_json, response_schema=BATCH_SIMILARITY_SCHEMA)
+                try:
+                    data = await self._aparse_json(response, "similarity", client, BATCH_SIMILARITY_SCHEMA)
+                except JSONExtractionError as e:
+                    print(f"[MATCH_BATCH] Unparseable response for {len(pending)} products: {e}")
+                    data = None
+                pending = self._merge_batch_response(data, pending, scored)
+                if not pending:
+                    break
+                if attempt < max_resends:
+                    print(f"[MATCH_BATCH] {len(pending)} products missing from response - resending (attempt {attempt + 1}/{max_resends})")
+        except Exception as e:
+            return scored, e
+
+        return scored, None
+
+    def calculate_similarity_batch(self, user_idea: str, products: list[dict], batch_size: int = None, max_resends: int = 2, client: GeminiClient = None) -> list:
+        """
+        Compare user's idea to many products, N products per LLM call.
+        Batches run concurrently (settings.SIMILARITY_MAX_WORKERS) - the per-model rate limiter paces them.
+        Returns a list aligned with `products`: {score, reasoning, user_advantage} per product,
+        or None for products the model never scored (after `max_resends` resends of the missing ones).
+        `client` defaults to the lite model. After an API error (e.g. a rate limit) batches not yet
+        sent are cancelled and PartialScoringError is raised, carrying the scores already returned.
+        """
+        batch_size = batch_size or settings.SIMILARITY_BATCH_SIZE
+        results = [None] * len(products)
+        batches = [
+            list(range(start, min(start + batch_size, len(products))))
+            for start in range(0, len(products), batch_size)
+        ]
+        if not batches:
+            return results
+
+        error = None
+        with ThreadPoolExecutor(max_workers=min(settings.SIMILARITY_MAX_WORKERS, len(batches))) as executor:
+            futures = [executor.submit(self._score_batch, user_idea, products, indices, max_resends, client) for indices in batches]
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                scored, batch_error = future.result()
+                for index, similarity in scored.items():
+                    results[index] = similarity
+                if batch_error is not None and error is None:
+                    error = batch_error
+                    # Don't start batches that haven't been sent yet (e.g. after a rate limit error)
+                    for f in futures:
+                        f.cancel()
+
+        if error is not None:
+            raise PartialScoringError(error, results)
+        return results
+
+    async def acalculate_similarity_batch(self, user_idea: str, products: list[dict], batch_size: int = None, max_resends: int = 2, client: GeminiClient = None, deadline: float = None) -> list:
+        """
+        Async version of calculate_similarity_batch() - all batches are awaited together
+        on the event loop; the shared async limiter and per-model rate limiter pace them.
+        deadline: time.monotonic() value; batches still outstanding then are abandoned and
+        their products left as None (finished batches are kept). API errors raise
+        PartialScoringError once the other batches are cancelled, as in the sync version.
+        """
+        batch_size = batch_size or settings.SIMILARITY_BATCH_SIZE
+        results = [None] * len(products)
+        batches = [
+            list(range(start, min(start + batch_size, len(products))))
+            for start in range(0, len(products), batch_size)
+        ]
+
+        if not batches:
+            return results
+
+        tasks = [asyncio.ensure_future(self._ascore_batch(user_idea, products, indices, max_resends, client)) for indices in batches]
+        pending = set(tasks)
+        error = None
+        while pending and error is None:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break  # Deadline
+            for task in done:
+                scored, batch_error = task.result()
+                for index, similarity in scored.items():
+                    results[index] = similarity
+                if batch_error is not None and error is None:
+                    error = batch_error
+
+        # Don't keep spending quota on the other batches (after a rate limit error, or past the deadline)
+        for task in pending:
+            task.cancel()
+
+        if error is not None:
+            raise PartialScoringError(error, results)
+        if pending:
+            abandoned = sum(len(indices) for indices, task in zip(batches, tasks) if task in pending)
+            print(f"[DEADLINE] Abandoned {len(pending)} outstanding batches ({abandoned} products)")
+            self._count('deadline_abandoned', abandoned)
+        return results
+
+    def _cascade_escalations(self, results: list) -> list[int]:
+        """Indices whose lite-model score falls in the uncertain band and should be re-scored by the full model"""
+        low, high = settings.SIMILARITY_CASCADE_BAND
+        return [
+            i for i, similarity in enumerate(results)
+            if similarity is not None and low <= similarity.get('score', 0) <= high
+        ]
+
+    def _apply_escalations(self, results: list, escalated: list[int], rescored: list):
+        """Replace uncertain lite scores with full-model scores and record tier counts"""
+        for i, similarity in zip(escalated, rescored):
+            if similarity is not None:
+                similarity['tier'] = 'full'
+                results[i] = similarity
+
+        lite_count = sum(1 for r in results if r is not None)
+        full_count = sum(1 for r in rescored if r is not None)
+        self._count('cascade_tier1_lite', lite_count)
+        self._count('cascade_tier2_full', full_count)
+        print(f"[CASCADE] lite scored {lite_count}, escalated {len(escalated)} to {self.client.model_name}")
+
+    def calculate_similarity_cascade(self, user_idea: str, products: list[dict]) -> list:
+        """
+        Two-tier scoring: the lite model scores every product, then only products inside
+        settings.SIMILARITY_CASCADE_BAND (uncertain, around the match threshold) are re-scored
+        by the full model. Confident lows/highs from the lite model are final.
+        Same return shape as calculate_similarity_batch(); escalated results carry tier='full'.
+        """
+        results = self.calculate_similarity_batch(user_idea, products)
+        escalated = self._cascade_escalations(results)
+        try:
+            rescored = self.calculate_similarity_batch(user_idea, [products[i] for i in escalated], client=self.client) if escalated else []
+        except PartialScoringError as e:
+            # Lite scores stand for the products the full model didn't get to
+            self._apply_escalations(results, escalated, e.results)
+            raise PartialScoringError(e.error, results)
+        self._apply_escalations(results, escalated, rescored)
+        return results
+
+    async def acalculate_similarity_cascade(self, user_idea: str, products: list[dict], deadline: float = None) -> list:
+        """Async version of calculate_similarity_cascade(). Past `deadline`, uncertain products keep their lite score"""
+        results = await self.acalculate_similarity_batch(user_idea, products, deadline=deadline)
+        escalated = self._cascade_escalations(results)
+        try:
+            rescored = await self.acalculate_similarity_batch(user_idea, [products[i] for i in escalated], client=self.client, deadline=deadline) if escalated else []
+        except PartialScoringError as e:
+            self._apply_escalations(results, escalated, e.results)
+            raise PartialScoringError(e.error, results)
+        self._apply_escalations(results, escalated, rescored)
+        return results
+
+    async def acalculate_similarity_ranked(self, user_idea: str, products: list[dict], policy: EarlyStopPolicy = None, known_scores: list = None, deadline: float = None) -> tuple:
+        """
+        Score rank-ordered `products` (best candidates first) in waves of one batch
+        (SIMILARITY_BATCH_SIZE products), cascaded if enabled, and ask `policy` after each wave
+        whether the rest is worth the quota. Waves are kept to a single batch so the policy gets
+        a say well before the scanner's top-15 cut runs out.
+        known_scores: similarity scores this scan already has (e.g. memoized) - they count too.
+        deadline: time.monotonic() value after which outstanding batches and further waves are dropped.
+        Returns (results aligned with `products`, number not skipped by the policy); products[scored:]
+        were skipped and have None results, as do products lost to API errors or the deadline.
+        An API error raises PartialScoringError with the same two values (results, scored) for the
+        waves that ran. Without a policy everything is scored in one go.
+        """
+        score_products = self.acalculate_similarity_cascade if settings.SIMILARITY_CASCADE_ENABLED else self.acalculate_similarity_batch
+        if policy is None:
+            return await score_products(user_idea, products, deadline=deadline), len(products)
+
+        wave_size = settings.SIMILARITY_BATCH_SIZE
+        results = []
+        scores = list(known_scores or [])
+        while len(results) < len(products):
+            if deadline is not None and time.monotonic() >= deadline:
+                print(f"[DEADLINE] {len(products) - len(results)} ranked products left unscored")
+                self._count('deadline_abandoned', len(products) - len(results))
+                return results + [None] * (len(products) - len(results)), len(products)
+            wave = products[len(results):len(results) + wave_size]
+            try:
+                wave_results = await score_products(user_idea, wave, deadline=deadline)
+            except PartialScoringError as e:
+                # Keep every earlier wave (and what this one scored) - later waves are dropped
+                results.extend(e.results)
+                raise PartialScoringError(e.error, results + [None] * (len(products) - len(results)), len(results))
+            results.extend(wave_results)
+
+            scored = [(p.get('rank_score', 0.0), s.get('score', 0)) for p, s in zip(wave, wave_results) if s is not None]
+            scores.extend(similarity for _, similarity in scored)
+            remaining = [p.get('rank_score', 0.0) for p in products[len(results):]]
+            reason = policy.check(scores, scored, remaining)
+            if reason:
+                print(f"[EARLY_STOP] Skipping {len(remaining)} lower-ranked products: {reason}")
+                self._count('early_stop_skipped', len(remaining))
+                break
+
+        return results + [None] * (len(products) - len(results)), len(results)
+
+    def _build_verdict_prompt(self, user_idea: str, competitors: list[dict]) -> str:
+        compact_competitors = [
+            {**c, "product_name": truncate_tokens(strip_marketplace_boilerplate(c['product_name']), settings.PROMPT_PRODUCT_NAME_TOKENS)}
+            for c in competitors
+        ]
+        return self._compact_prompt(
+            self._format_verdict_prompt,
+            (user_idea, competitors),
+            (self._compact_idea(user_idea), compact_competitors)
+        )
+
+    def _format_verdict_prompt(self, user_idea: str, competitors: list[dict]) -> str:
         competitor_summary = "\n".join([
             f"- {c['product_name']} ({c['similarity_score']}% match)" 
             for c in competitors[:5]
@@ -134,25 +679,50 @@ Task:
 
 Output ONE sentence only. Start with "Verdict:".
         """
-        return self.client.generate(prompt).strip()
+        return prompt
 
-    def analyze_gaps(self, user_idea: str, competitor_name: str, complaints: list[str]) -> str:
+    def generate_verdict(self, user_idea: str, competitors: list[dict]) -> str:
         """
-        Analyze competitor complaints and identify the market gap for the user's idea.
+        Generate a 1-sentence GO/NO-GO verdict based on the found competitors.
         """
-        complaints_text = "\n".join([f"- {c}" for c in complaints[:10]])
+        prompt = self._build_verdict_prompt(user_idea, competitors)
+        return self.client.generate(prompt, call_type="verdict").strip()
+
+    async def agenerate_verdict(self, user_idea: str, competitors: list[dict]) -> str:
+        """Async version of generate_verdict()"""
+        prompt = self._build_verdict_prompt(user_idea, competitors)
+        return (await self.client.agenerate(prompt, call_type="verdict")).strip()
+
+    def _build_gaps_prompt(self, user_idea: str, complaints_by_competitor: dict) -> str:
+        compact_complaints = {
+            truncate_tokens(strip_marketplace_boilerplate(name), settings.PROMPT_PRODUCT_NAME_TOKENS):
+                compact_snippets(complaints, settings.PROMPT_SNIPPET_TOKENS)
+            for name, complaints in complaints_by_competitor.items()
+        }
+        return self._compact_prompt(
+            self._format_gaps_prompt,
+            (user_idea, complaints_by_competitor),
+            (self._compact_idea(user_idea), compact_complaints)
+        )
+
+    def _format_gaps_prompt(self, user_idea: str, complaints_by_competitor: dict) -> str:
+        # Keep the prompt about the same size however many competitors are included
+        per_competitor = 10 if len(complaints_by_competitor) == 1 else 5
+        complaints_text = "\n\n".join([
+            f"Competitor Product: {name}\n" + "\n".join([f"- {c}" for c in complaints[:per_competitor]])
+            for name, complaints in complaints_by_competitor.items()
+        ])
 
         prompt = f"""
 Market Gap Analysis:
 
 User's Idea: {user_idea}
-Competitor Product: {competitor_name}
 
-Public Complaints Found about Competitor:
+Public Complaints Found about Competitors:
 {complaints_text}
 
 Task:
-1. Identify the top 2-3 recurring problems/pain points from the complaints.
+1. Identify the top 2-3 recurring problems/pain points from the complaints (across all competitors).
 2. Explain how the User's Idea solves (or fails to solve) these specific problems.
 3. Provide a "Marketing Hook" based on this gap.
 
@@ -160,4 +730,27 @@ Output plain text, max 3 sentences.
 Format:
 "Competitors suffer from [Problem]. Your idea [Solves/Doesn't Solve] this by [Feature]. Opportunity: [Marketing Hook]."
 """
-        return self.client.generate(prompt).strip()
+        return prompt
+
+    def analyze_gaps(self, user_idea: str, competitor_name: str, complaints: list[str]) -> str:
+        """
+        Analyze competitor complaints and identify the market gap for the user's idea.
+        """
+        return self.analyze_gaps_across(user_idea, {competitor_name: complaints})
+
+    async def aanalyze_gaps(self, user_idea: str, competitor_name: str, complaints: list[str]) -> str:
+        """Async version of analyze_gaps()"""
+        return await self.aanalyze_gaps_across(user_idea, {competitor_name: complaints})
+
+    def analyze_gaps_across(self, user_idea: str, complaints_by_competitor: dict) -> str:
+        """
+        One gap analysis over several competitors' complaints ({product name: snippets}),
+        so recurring problems across the market surface instead of one product's quirks.
+        """
+        prompt = self._build_gaps_prompt(user_idea, complaints_by_competitor)
+        return self.client.generate(prompt, call_type="gap").strip()
+
+    async def aanalyze_gaps_across(self, user_idea: str, complaints_by_competitor: dict) -> str:
+        """Async version of analyze_gaps_across()"""
+        prompt = self._build_gaps_prompt(user_idea, complaints_by_competitor)
+        return (await self.client.agenerate(prompt, call_type="gap")).strip()
@@ -0,0 +1,216 @@
+import bisect
+import threading
+
+# Upper bounds (seconds) for latency / wait histograms - Gemini calls range from ~0.3s to
+# minutes when the free-tier limiter or 429 backoff kicks in
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus style), plus a running max"""
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def cumulative(self) -> list:
+        """[(upper bound, count <= bound)], ending with ('+Inf', total)"""
+        result, running = [], 0
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            running += count
+            result.append((bound, running))
+        return result
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 3),
+            "avg": round(self.sum / self.count, 3) if self.count else 0.0,
+            "max": round(self.max, 3),
+        }
+
+class LLMCallRecord:
+    """What one generate()/agenerate() call cost, filled in by GeminiClient as the call progresses"""
+
+    def __init__(self, model: str, call_type: str):
+        self.model = model
+        self.call_type = call_type
+        self.cache_hit = False
+        self.queue_wait = 0.0      # Seconds spent in the rate limiter queue (all attempts)
+        self.latency = 0.0         # Seconds spent waiting on the API (all attempts)
+        self.retry_wait = 0.0      # Seconds slept between attempts after a 429
+        self.retries = 0
+        self.failovers = 0         # Switches to another key/model after a daily-quota 429
+        self.rate_limited = []     # One "quota" / "rate" entry per 429 received
+        self.prompt_tokens = 0
+        self.response_tokens = 0
+        self.error = None          # Exception class name if the call ultimately failed
+
+    @property
+    def total_time(self) -> float:
+        return self.queue_wait + self.latency + self.retry_wait
+
+class LLMMetrics:
+    """
+    Process-wide counters and histograms for Gemini calls, labelled by (model, call_type).
+    Served by the /metrics endpoint.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}    # (name, model, call_type) -> number
+        self._histograms = {}  # (name, model, call_type) -> Histogram
+
+    def _inc(self, name: str, labels: tuple, value: float = 1):
+        key = (name,) + labels
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def _observe(self, name: str, labels: tuple, value: float, buckets: tuple):
+        key = (name,) + labels
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram(buckets)
+        histogram.observe(value)
+
+    def record(self, record: LLMCallRecord):
+        labels = (record.model, record.call_type)
+        with self._lock:
+            self._inc("llm_calls_total", labels)
+            if record.cache_hit:
+                self._inc("llm_cache_hits_total", labels)
+                return
+
+            self._inc("llm_retries_total", labels, record.retries)
+            self._inc("llm_key_failovers_total", labels, record.failovers)
+            for reason in record.rate_limited:
+                self._inc(f"llm_429_{reason}_total", labels)
+            if record.error:
+                self._inc("llm_errors_total", labels)
+            self._inc("llm_prompt_tokens_total", labels, record.prompt_tokens)
+            self._inc("llm_response_tokens_total", labels, record.response_tokens)
+
+            self._observe("llm_queue_wait_seconds", labels, record.queue_wait, SECONDS_BUCKETS)
+            self._observe("llm_latency_seconds", labels, record.latency, SECONDS_BUCKETS)
+            self._observe("llm_retry_wait_seconds", labels, record.retry_wait, SECONDS_BUCKETS)
+            self._observe("llm_prompt_tokens", labels, record.prompt_tokens, TOKEN_BUCKETS)
+
+    def record_json_parse(self, model: str, call_type: str, outcome: str):
+        """
+        How a JSON response was parsed: "clean", "extracted" (dug out of surrounding text),
+        "repaired" (needed a repair call) or "failed"
+        """
+        with self._lock:
+            self._inc(f"llm_json_{outcome}_total", (model, call_type))
+
+    def snapshot(self) -> dict:
+        """{"model/call_type": {metric: value or histogram summary}}"""
+        with self._lock:
+            result = {}
+            for (name, model, call_type), value in self._counters.items():
+                result.setdefault(f"{model}/{call_type}", {})[name] = value
+            for (name, model, call_type), histogram in self._histograms.items():
+                result.setdefault(f"{model}/{call_type}", {})[name] = histogram.to_dict()
+            return result
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for (name, model, call_type), value in sorted(self._counters.items()):
+                lines.append(f'{name}{{model="{model}",call_type="{call_type}"}} {value}')
+            for (name, model, call_type), histogram in sorted(self._histograms.items()):
+                labels = f'model="{model}",call_type="{call_type}"'
+                for bound, count in histogram.cumulative():
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f"{name}_sum{{{labels}}} {histogram.sum:.6f}")
+                lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+class ScanMetrics:
+    """
+    Call records for one scan, summarised at the end so the scan report shows where the
+    time went: rate limiter queue, the model itself, or 429 retries.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.records = []
+        self.prompt_tokens_before = 0
+        self.prompt_tokens_after = 0
+
+    def add(self, record: LLMCallRecord):
+        with self._lock:
+            self.records.append(record)
+
+    def add_prompt(self, tokens_before: int, tokens_after: int):
+        """Estimated prompt size before and after compaction (see llm.prompts)"""
+        with self._lock:
+            self.prompt_tokens_before += tokens_before
+            self.prompt_tokens_after += tokens_after
+
+    def summary(self) -> dict:
+        with self._lock:
+            records = list(self.records)
+            before, after = self.prompt_tokens_before, self.prompt_tokens_after
+
+        by_call = {}
+        for r in records:
+            entry = by_call.setdefault(f"{r.model}/{r.call_type}", {
+                "calls": 0, "cache_hits": 0, "retries": 0, "failovers": 0, "429_quota": 0, "429_rate": 0, "errors": 0,
+                "queue_wait_s": 0.0, "latency_s": 0.0, "retry_wait_s": 0.0, "max_latency_s": 0.0,
+                "prompt_tokens": 0, "response_tokens": 0,
+            })
+            entry["calls"] += 1
+            entry["cache_hits"] += int(r.cache_hit)
+            entry["retries"] += r.retries
+            entry["failovers"] += r.failovers
+            entry["429_quota"] += r.rate_limited.count("quota")
+            entry["429_rate"] += r.rate_limited.count("rate")
+            entry["errors"] += int(r.error is not None)
+            entry["queue_wait_s"] += r.queue_wait
+            entry["latency_s"] += r.latency
+            entry["retry_wait_s"] += r.retry_wait
+            entry["max_latency_s"] = max(entry["max_latency_s"], r.latency)
+            entry["prompt_tokens"] += r.prompt_tokens
+            entry["response_tokens"] += r.response_tokens
+
+        for entry in by_call.values():
+            for key in ("queue_wait_s", "latency_s", "retry_wait_s", "max_latency_s"):
+                entry[key] = round(entry[key], 2)
+
+        # Summed across calls (calls overlap, so these are call-seconds, not wall time)
+        totals = {
+            "rate_limiter": sum(r.queue_wait for r in records),
+            "model": sum(r.latency for r in records),
+            "retries": sum(r.retry_wait for r in records),
+        }
+        return {
+            "by_call": by_call,
+            "time_s": {k: round(v, 2) for k, v in totals.items()},
+            "bottleneck": max(totals, key=totals.get) if any(totals.values()) else None,
+            "prompt_compaction": {
+                "tokens_before": before,
+                "tokens_after": after,
+                "saved_pct": round(100 * (before - after) / before, 1) if before else 0.0,
+            },
+        }
+
+_metrics = LLMMetrics()
+
+def get_llm_metrics() -> LLMMetrics:
+    """Process-wide metrics registry"""
+    return _metrics
@@ -0,0 +1,85 @@
+import html
+import re
+
+CHARS_PER_TOKEN = 4  # Rough Gemini ratio for English text - same estimate the rate limiter uses
+
+# Marketplace boilerplate scrapers pick up from page titles, e.g. "Surf Lamp | Amazon.com",
+# "Surf Lamp - AliExpress 13", "Amazon.com: Surf Lamp : Home & Kitchen"
+_MARKETPLACES = r"(?:amazon(?:\.[a-z.]+)?|aliexpress(?:\.[a-z.]+)?|ebay(?:\.[a-z.]+)?|etsy(?:\.com)?|walmart(?:\.com)?|target(?:\.com)?|kickstarter|product\s?hunt|alibaba(?:\.com)?|temu)"
+_SUFFIX_RE = re.compile(rf"\s*[|\-–—:]\s*{_MARKETPLACES}\b[^|]{{0,30}}$", re.IGNORECASE)
+_PREFIX_RE = re.compile(rf"^{_MARKETPLACES}\s*:\s*", re.IGNORECASE)
+_CATEGORY_SUFFIX_RE = re.compile(r"\s+:\s+[^:]{1,40}$")  # Amazon's trailing " : Home & Kitchen"
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+def estimate_tokens(text: str) -> int:
+    return len(text or "") // CHARS_PER_TOKEN
+
+def normalize(text) -> str:
+    """Unescape HTML entities, collapse whitespace, drop the '...' Google puts around snippets"""
+    text = html.unescape(str(text or ""))
+    text = re.sub(r"\s+", " ", text).strip()
+    return re.sub(r"^(?:\.\.\.|…)\s*|\s*(?:\.\.\.|…)$", "", text)
+
+def strip_marketplace_boilerplate(title: str) -> str:
+    title = normalize(title)
+    stripped = _PREFIX_RE.sub("", title)
+    if stripped != title:
+        stripped = _CATEGORY_SUFFIX_RE.sub("", stripped)
+    while True:
+        shorter = _SUFFIX_RE.sub("", stripped)
+        if shorter == stripped or not shorter:
+            return stripped or title
+        stripped = shorter
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cut to roughly `max_tokens`, on a word boundary"""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    if " " in cut[max_chars // 2:]:
+        cut = cut[:cut.rfind(" ")]
+    return cut.rstrip(" ,.;:-") + "…"
+
+def compact_text(text: str, max_tokens: int) -> str:
+    return truncate_tokens(normalize(text), max_tokens)
+
+def compact_products(products: list[dict], name_tokens: int, description_tokens: int) -> list[dict]:
+    """
+    Products as they should appear in a (batch) prompt: marketplace suffixes stripped, text
+    normalized and truncated, and description text already shown for an earlier product in the
+    same batch left out (a listing whose whole description repeats an earlier one says so).
+    """
+    compacted = []
+    seen_descriptions = {}  # normalized description -> index of the first product with it
+    seen_sentences = set()
+
+    for i, product in enumerate(products):
+        name = truncate_tokens(strip_marketplace_boilerplate(product.get('name')), name_tokens)
+        description = normalize(product.get('description'))
+        key = description.lower()
+
+        if key and key in seen_descriptions:
+            description = f"Same as [{seen_descriptions[key]}]"
+        else:
+            if key:
+                seen_descriptions[key] = i
+            sentences = []
+            for sentence in _SENTENCE_RE.split(description):
+                if sentence and sentence.lower() not in seen_sentences and sentence.lower() != name.lower():
+                    seen_sentences.add(sentence.lower())
+                    sentences.append(sentence)
+            description = truncate_tokens(" ".join(sentences), description_tokens)
+
+        compacted.append({**product, "name": name or "N/A", "description": description or "N/A"})
+    return compacted
+
+def compact_snippets(snippets: list[str], max_tokens: int) -> list[str]:
+    """Normalize, truncate and de-duplicate search snippets (order kept)"""
+    seen, result = set(), []
+    for snippet in snippets:
+        text = compact_text(snippet, max_tokens)
+        if text and text.lower() not in seen:
+            seen.add(text.lower())
+            result.append(text)
+    return result
@@ -0,0 +1,102 @@
+import re
+import numpy as np
+
+# Words that carry no product meaning in titles/snippets
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it",
+    "its", "of", "on", "or", "that", "the", "this", "to", "with", "your", "you",
+    "buy", "new", "best", "free", "shipping", "sale", "online", "shop", "store"
+}
+
+class LexicalRanker:
+    """
+    Local BM25 pre-ranker - no API calls.
+
+    Scores each scraped product (name + description) against the idea's extracted concepts
+    (core_function, key_features, search_keywords). IDF is computed over the candidate set
+    itself, so terms every scraper returned (e.g. "lamp") count less than distinctive ones.
+    Used to decide which candidates get the limited LLM budget.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+    def _tokenize(self, text: str) -> list[str]:
+        return [t for t in re.findall(r"[a-z0-9]+", (text or "").lower()) if len(t) > 1 and t not in STOPWORDS]
+
+    def _query_terms(self, concepts: dict) -> list[str]:
+        parts = []
+        for field in ("core_function", "key_features", "search_keywords"):
+            value = concepts.get(field)
+            if isinstance(value, list):
+                parts.extend(str(v) for v in value)
+            elif value:
+                parts.append(str(value))
+        return self._tokenize(" ".join(parts))
+
+    def score(self, concepts: dict, products: list[dict]) -> np.ndarray:
+        """BM25 score per product (same order as `products`)"""
+        query = self._query_terms(concepts)
+        if not products or not query:
+            return np.zeros(len(products))
+
+        vocab = {term: i for i, term in enumerate(dict.fromkeys(query))}
+        query_weights = np.zeros(len(vocab))
+        for term in query:
+            query_weights[vocab[term]] += 1
+
+        # Term-frequency matrix (docs x query terms) and document lengths
+        tf = np.zeros((len(products), len(vocab)))
+        doc_len = np.zeros(len(products))
+        for d, product in enumerate(products):
+            tokens = self._tokenize(f"{product.get('name', '')} {product.get('description', '')}")
+            doc_len[d] = len(tokens)
+            for token in tokens:
+                j = vocab.get(token)
+                if j is not None:
+                    tf[d, j] += 1
+
+        n_docs = len(products)
+        doc_freq = (tf > 0).sum(axis=0)
+        idf = np.log(1 + (n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+
+        avg_len = doc_len.mean() or 1.0
+        norm = self.k1 * (1 - self.b + self.b * doc_len / avg_len)
+        bm25 = tf * (self.k1 + 1) / (tf + norm[:, None])
+
+        return bm25 @ (idf * query_weights)
+
+    def rank(self, concepts: dict, products: list[dict]) -> list[dict]:
+        """
+        Return products sorted by descending BM25 score (ties keep scraper order).
+        Each product gets a 'rank_score' key so it can be logged next to the LLM score.
+        """
+        scores = self.score(concepts, products)
+        for product, score in zip(products, scores):
+            product['rank_score'] = round(float(score), 3)
+
+        order = np.argsort(-scores, kind="stable")
+        return [products[i] for i in order]
+
+    @staticmethod
+    def rank_correlation(rank_scores: list[float], llm_scores: list[float]):
+        """Spearman correlation between ranker and LLM scores (None if too few points to say)"""
+        if len(rank_scores) < 3:
+            return None
+        if np.std(rank_scores) == 0 or np.std(llm_scores) == 0:
+            return None
+        ranks_a = LexicalRanker._average_ranks(rank_scores)
+        ranks_b = LexicalRanker._average_ranks(llm_scores)
+        return float(np.corrcoef(ranks_a, ranks_b)[0, 1])
+
+    @staticmethod
+    def _average_ranks(values: list[float]) -> np.ndarray:
+        """Ranks (0-based) with tied values sharing their average rank, like scipy.stats.rankdata"""
+        values = np.asarray(values, dtype=float)
+        order = np.argsort(values, kind="stable")
+        ordinal = np.empty(len(values))
+        ordinal[order] = np.arange(len(values))
+        _, groups = np.unique(values, return_inverse=True)
+        # Mean ordinal rank within each group of equal values
+        return (np.bincount(groups, weights=ordinal) / np.bincount(groups))[groups]
@@ -0,0 +1,239 @@
+import asyncio
+import hashlib
+import itertools
+import threading
+import time
+from collections import deque
+from config.settings import settings
+
+# Priority classes, highest first. Interactive scans (a user waiting on /ideas/submit) always
+# go ahead of the weekly monitoring batch, which goes ahead of backfill work.
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_MONITORING = "monitoring"
+PRIORITY_BACKFILL = "backfill"
+PRIORITY_RANK = {PRIORITY_INTERACTIVE: 0, PRIORITY_MONITORING: 1, PRIORITY_BACKFILL: 2}
+
+class TokenBucketLimiter:
+    """
+    Rate limiter for one (model, API key) pair.
+
+    Enforces both at once:
+    - Token bucket on requests: refills at rpm/60 per second, holds up to `burst` requests
+    - Rolling 60s window: at most `rpm` requests and `tpm` tokens in any 60 second span
+      (the bucket alone would let a full burst through on top of a saturated minute)
+
+    Waiters queue by priority class, then fairly between tenants (users) within a class,
+    then FIFO. Fairness is start-time fair queuing: each tenant's next request is tagged one
+    round after its previous one, so a user with 20 queued calls can't starve a user with 1.
+    Classes listed in `class_caps` may use at most that share of `rpm` per window, leaving
+    headroom for interactive calls however large the monitoring backlog is.
+
+    The head of the queue waits on a Condition (releasing the lock) until capacity frees up;
+    when it gets through, the other waiters are woken immediately.
+    """
+
+    WINDOW_SECONDS = 60.0
+    ASYNC_POLL_SECONDS = 0.05  # How often a queued async waiter re-checks whether it reached the head
+
+    def __init__(self, name: str, rpm: int, tpm: int, burst: int = 1, class_caps: dict = None):
+        self.name = name
+        self.rpm = rpm
+        self.tpm = tpm
+        self.burst = max(1, burst)
+        self.class_caps = settings.LLM_PRIORITY_QUOTA_CAPS if class_caps is None else class_caps
+
+        self._cond = threading.Condition()
+        self._bucket = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._window = deque()  # (timestamp, tokens, priority) of granted requests
+        self._window_tokens = 0
+        self._tickets = itertools.count()
+        self._queue = []  # (rank, fair tag, ticket, priority) - smallest eligible entry goes next
+        self._virtual_time = {}  # priority -> fair tag of the last granted request
+        self._tenant_tags = {}  # (priority, tenant) -> last fair tag handed out
+
+    def _refill(self, now: float):
+        elapsed = now - self._last_refill
+        self._bucket = min(self.burst, self._bucket + elapsed * self.rpm / self.WINDOW_SECONDS)
+        self._last_refill = now
+
+        while self._window and now - self._window[0][0] >= self.WINDOW_SECONDS:
+            _, tokens, _ = self._window.popleft()
+            self._window_tokens -= tokens
+
+    def _try_reserve(self, tokens: int, now: float, priority: str = PRIORITY_INTERACTIVE) -> float:
+        """Consume capacity and return 0.0, or return seconds until capacity may be available"""
+        self._refill(now)
+        waits = []
+
+        if self._bucket < 1:
+            waits.append((1 - self._bucket) * self.WINDOW_SECONDS / self.rpm)
+
+        if len(self._window) >= self.rpm:
+            waits.append(self.WINDOW_SECONDS - (now - self._window[0][0]))
+
+        # A single request larger than the whole TPM budget is let through on an empty window
+        if self._window and self._window_tokens + tokens > self.tpm:
+            freed, release_at = self._window_tokens, None
+            for ts, t, _ in self._window:
+                freed -= t
+                if freed + tokens <= self.tpm:
+                    release_at = ts
+                    break
+            if release_at is None:
+                release_at = self._window[-1][0]
+            waits.append(self.WINDOW_SECONDS - (now - release_at))
+
+        if waits:
+            return max(0.01, max(waits))
+
+        self._bucket -= 1
+        self._window.append((now, tokens, priority))
+        self._window_tokens += tokens
+        return 0.0
+
+    def _class_wait(self, priority: str, now: float) -> float:
+        """Seconds until a capped class is back under its share of the window (0.0 if not capped)"""
+        share = self.class_caps.get(priority)
+        if share is None:
+            return 0.0
+        limit = max(1, int(self.rpm * share))
+        granted = [ts for ts, _, p in self._window if p == priority]
+        if len(granted) < limit:
+            return 0.0
+        return max(0.01, self.WINDOW_SECONDS - (now - granted[len(granted) - limit]))
+
+    def _enqueue(self, priority: str, tenant) -> tuple:
+        if priority not in PRIORITY_RANK:
+            raise ValueError(f"Unknown LLM priority class: {priority}")
+        virtual_time = self._virtual_time.get(priority, 0)
+        tag = max(virtual_time, self._tenant_tags.get((priority, tenant), -1) + 1)
+        self._tenant_tags[(priority, tenant)] = tag
+        entry = (PRIORITY_RANK[priority], tag, next(self._tickets), priority)
+        self._queue.append(entry)
+        return entry
+
+    def _head(self, now: float) -> tuple:
+        """(entry that may go next, None) or (None, seconds until a capped class frees up)"""
+        self._refill(now)
+        capped_wait = None
+        for entry in sorted(self._queue):
+            wait = self._class_wait(entry[3], now)
+            if wait == 0.0:
+                return entry, None
+            capped_wait = wait if capped_wait is None else min(capped_wait, wait)
+        return None, capped_wait
+
+    def _granted(self, entry: tuple):
+        _, tag, _, priority = entry
+        self._virtual_time[priority] = max(self._virtual_time.get(priority, 0), tag)
+        if len(self._tenant_tags) > 256:
+            # Tags behind the class clock no longer matter - a new request starts at the clock anyway
+            self._tenant_tags = {
+                key: t for key, t in self._tenant_tags.items() if t >= self._virtual_time.get(key[0], 0)
+            }
+
+    def acquire(self, tokens: int = 1, priority: str = PRIORITY_INTERACTIVE, tenant=None) -> float:
+        """
+        Block until a request of `tokens` estimated tokens may be sent.
+        priority: interactive / monitoring / backfill; tenant: e.g. user id, for fairness within the class
+        Returns the number of seconds spent waiting.
+        """
+        start = time.monotonic()
+        with self._cond:
+            entry = self._enqueue(priority, tenant)
+            try:
+                while True:
+                    now = time.monotonic()
+                    head, wait = self._head(now)
+                    if head == entry:
+                        wait = self._try_reserve(tokens, now, priority)
+                        if wait == 0.0:
+                            self._granted(entry)
+                            break
+                    elif head is not None:
+                        wait = None  # Not our turn - wait for the head to get through
+                    self._cond.wait(timeout=wait)
+            finally:
+                self._queue.remove(entry)
+                self._cond.notify_all()
+
+        return time.monotonic() - start
+
+    async def aacquire(self, tokens: int = 1, priority: str = PRIORITY_INTERACTIVE, tenant=None) -> float:
+        """
+        Async version of acquire() - shares the same queue, but waits with asyncio.sleep
+        so the event loop keeps running other scans meanwhile.
+        """
+        start = time.monotonic()
+        with self._cond:
+            entry = self._enqueue(priority, tenant)
+        try:
+            while True:
+                with self._cond:
+                    now = time.monotonic()
+                    head, wait = self._head(now)
+                    if head == entry:
+                        wait = self._try_reserve(tokens, now, priority)
+                        if wait == 0.0:
+                            self._granted(entry)
+                    elif head is not None:
+                        wait = self.ASYNC_POLL_SECONDS
+                if wait == 0.0:
+                    break
+                await asyncio.sleep(wait)
+        finally:
+            with self._cond:
+                self._queue.remove(entry)
+                self._cond.notify_all()
+
+        return time.monotonic() - start
+
+    def utilization(self) -> float:
+        """Share of the rolling window already used (max of requests and tokens), plus queued waiters"""
+        with self._cond:
+            self._refill(time.monotonic())
+            return max(len(self._window) / self.rpm, self._window_tokens / self.tpm) + len(self._queue) / self.rpm
+
+    def snapshot(self) -> dict:
+        """Current usage, for logs/debugging"""
+        with self._cond:
+            self._refill(time.monotonic())
+            return {
+                "name": self.name,
+                "requests_in_window": len(self._window),
+                "tokens_in_window": self._window_tokens,
+                "bucket": round(self._bucket, 2),
+                "queued": len(self._queue),
+                "queued_by_priority": {
+                    priority: sum(1 for entry in self._queue if entry[3] == priority) for priority in PRIORITY_RANK
+                },
+            }
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(model_name: str, api_key: str = None) -> TokenBucketLimiter:
+    """
+    Shared limiter per (model, API key). Each model has its own quota on the Gemini side,
+    so the lite model used for bulk matching doesn't queue behind extraction/verdict calls.
+    """
+    key_id = hashlib.sha256((api_key or "").encode('utf-8')).hexdigest()[:8]
+    with _limiters_lock:
+        limiter = _limiters.get((model_name, key_id))
+        if limiter is None:
+            limits = settings.GEMINI_RATE_LIMITS.get(model_name, settings.GEMINI_RATE_LIMITS["default"])
+            limiter = TokenBucketLimiter(
+                name=f"{model_name}/{key_id}",
+                rpm=limits["rpm"],
+                tpm=limits["tpm"],
+                burst=limits["burst"]
+            )
+            _limiters[(model_name, key_id)] = limiter
+        return limiter
+
+def rate_limiter_snapshots() -> list[dict]:
+    """Snapshot of every limiter created so far (for the metrics endpoint)"""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return [limiter.snapshot() for limiter in limiters]
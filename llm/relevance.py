@@ -0,0 +1,241 @@
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+from urllib.parse import urlsplit
+import numpy as np
+from config.settings import settings
+from llm.ranker import LexicalRanker
+from scrapers.canonical import product_key
+
+SOURCES = ("google", "aliexpress", "amazon", "kickstarter", "producthunt", "patents")
+# Listicles, reviews and articles that merely mention products
+_LISTICLE_RE = re.compile(r"(?:^|[^a-z])(best|top-?\d+|reviews?|vs|blog|news|article|guide|reddit|forum)(?:[^a-z]|$)")
+# Paths that point at a single product / project / listing
+_PRODUCT_PATH_RE = re.compile(r"/(dp|gp/product|item|itm|projects|products?|posts|listing|patent)/", re.IGNORECASE)
+
+class RelevanceFeatures:
+    """
+    Cheap features for "is this scraped candidate a real competitor of the idea": lexical
+    overlap between the idea's concepts and the product title/URL, the source, and URL shape.
+    Uses only what the competitors table keeps (name, URL, source), so training and scan-time
+    features are computed the same way.
+    """
+
+    names = (
+        ["query_coverage", "title_coverage", "jaccard", "keyword_phrase_hits", "title_length"]
+        + [f"source_{s}" for s in SOURCES] + ["source_other"]
+        + ["url_product_path", "url_listicle", "url_depth", "url_has_query"]
+    )
+
+    def __init__(self):
+        self._ranker = LexicalRanker()
+
+    def vector(self, concepts: dict, product: dict) -> list[float]:
+        name = product.get('name') or ''
+        parts = urlsplit(product.get('url') or '')
+        url_words = re.sub(r"[/\-_.]+", " ", parts.path)
+
+        query = set(self._ranker._query_terms(concepts))
+        title = set(self._ranker._tokenize(f"{name} {url_words}"))
+        overlap = len(query & title)
+
+        keywords = [k.lower() for k in concepts.get('search_keywords') or [] if k]
+        phrase_hits = sum(1 for k in keywords if k in name.lower()) / len(keywords) if keywords else 0.0
+
+        source = (product.get('source') or '').lower()
+        source_flags = [float(source == s) for s in SOURCES] + [float(source not in SOURCES)]
+
+        segments = [s for s in parts.path.split("/") if s]
+        return [
+            overlap / len(query) if query else 0.0,
+            overlap / len(title) if title else 0.0,
+            overlap / len(query | title) if query | title else 0.0,
+            phrase_hits,
+            float(np.log1p(len(title))),
+        ] + source_flags + [
+            float(bool(_PRODUCT_PATH_RE.search(parts.path))),
+            float(bool(_LISTICLE_RE.search(f"{parts.path.lower()} {name.lower()}"))),
+            min(len(segments), 6) / 6,
+            float(bool(parts.query)),
+        ]
+
+    def matrix(self, concepts_list: list[dict], products: list[dict]) -> np.ndarray:
+        return np.array([self.vector(c, p) for c, p in zip(concepts_list, products)], dtype=float).reshape(len(products), len(self.names))
+
+class RelevanceModel:
+    """
+    Logistic regression over RelevanceFeatures. `skip_below` is the probability under which a
+    candidate is skipped without an LLM call - chosen on held-out labels (see train()), 0 when
+    there weren't enough labels to trust it.
+    """
+
+    def __init__(self, weights, bias: float, mean, std, skip_below: float = 0.0, validation: dict = None):
+        self.weights = np.asarray(weights, dtype=float)
+        self.bias = float(bias)
+        self.mean = np.asarray(mean, dtype=float)
+        self.std = np.asarray(std, dtype=float)
+        self.skip_below = skip_below
+        self.validation = validation or {}
+        self.features = RelevanceFeatures()
+
+    def predict_matrix(self, X: np.ndarray) -> np.ndarray:
+        z = ((X - self.mean) / self.std) @ self.weights + self.bias
+        return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+    def predict(self, concepts: dict, products: list[dict]) -> np.ndarray:
+        """Probability that each product is a real competitor"""
+        if not products:
+            return np.zeros(0)
+        return self.predict_matrix(self.features.matrix([concepts] * len(products), products))
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "features": RelevanceFeatures.names,
+                "weights": self.weights.tolist(),
+                "bias": self.bias,
+                "mean": self.mean.tolist(),
+                "std": self.std.tolist(),
+                "skip_below": self.skip_below,
+                "validation": self.validation,
+                "trained_at": datetime.utcnow().isoformat(),
+            }, f, indent=2)
+
+    @classmethod
+    def load(cls, path: str):
+        """The saved model, or None if missing or trained on a different feature set"""
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("features") != RelevanceFeatures.names:
+            print(f"[RELEVANCE] {path} was trained on other features - retrain it; not skipping anything")
+            return None
+        return cls(data["weights"], data["bias"], data["mean"], data["std"], data.get("skip_below", 0.0), data.get("validation"))
+
+def fit_logistic(X: np.ndarray, y: np.ndarray, l2: float = 1.0, lr: float = 0.5, epochs: int = 800) -> RelevanceModel:
+    """Batch gradient descent on standardized features, classes weighted to balance"""
+    mean = X.mean(axis=0)
+    std = X.std(axis=0)
+    std[std == 0] = 1.0
+    Xs = (X - mean) / std
+
+    positives = max(y.sum(), 1)
+    negatives = max(len(y) - y.sum(), 1)
+    sample_weight = np.where(y == 1, len(y) / (2 * positives), len(y) / (2 * negatives))
+
+    w = np.zeros(X.shape[1])
+    b = 0.0
+    for _ in range(epochs):
+        p = 1.0 / (1.0 + np.exp(-np.clip(Xs @ w + b, -30, 30)))
+        error = (p - y) * sample_weight
+        w -= lr * (Xs.T @ error / len(y) + l2 * w / len(y))
+        b -= lr * error.mean()
+    return RelevanceModel(w, b, mean, std)
+
+def choose_skip_threshold(probabilities: np.ndarray, labels: np.ndarray, max_miss_rate: float, min_positives: int) -> tuple:
+    """
+    Highest probability cut-off that skips at most `max_miss_rate` of the held-out positives.
+    Returns (threshold, stats); threshold 0 (skip nothing) if there are fewer than
+    `min_positives` held-out positives to validate against.
+    """
+    positives = np.sort(probabilities[labels == 1])
+    stats = {"heldout_positives": int(len(positives)), "heldout_negatives": int((labels == 0).sum())}
+    if len(positives) < min_positives:
+        stats["reason"] = f"need >= {min_positives} held-out positives"
+        return 0.0, stats
+
+    # Skipping everything below positives[k] misses exactly k positives
+    allowed_misses = int(np.floor(max_miss_rate * len(positives)))
+    threshold = float(positives[allowed_misses])
+    skipped = probabilities < threshold
+    stats.update({
+        "miss_rate": round(float(skipped[labels == 1].mean()), 4),
+        "skip_rate": round(float(skipped.mean()), 4),
+        "negatives_skipped": round(float(skipped[labels == 0].mean()), 4) if stats["heldout_negatives"] else 0.0,
+    })
+    return threshold, stats
+
+def load_labeled_examples(db) -> list[tuple]:
+    """
+    (idea_id, concepts, product, label) from:
+    - similarity_cache: every memoized LLM decision (score >= SIMILARITY_THRESHOLD -> 1), including
+      the non-matches that never reach the competitors table
+    - competitors.is_relevant: user feedback, which overrides the LLM's call for the same product
+      (matched by canonical product key, so URL variants count as one)
+    scan_history only keeps URL hashes, so it has nothing to learn from.
+    """
+    from database.models import Competitor, Idea, SimilarityCache
+
+    ideas = db.query(Idea).filter(Idea.extracted_concepts != None).all()
+    by_hash = {hashlib.md5(idea.user_description.strip().encode('utf-8')).hexdigest(): idea for idea in ideas}
+    concepts = {idea.id: json.loads(idea.extracted_concepts) for idea in ideas}
+
+    examples = {}
+    for row in db.query(SimilarityCache).filter(SimilarityCache.product_name != None).all():
+        idea = by_hash.get(row.idea_hash)
+        if idea is None or row.score is None:
+            continue
+        product = {"name": row.product_name, "url": row.product_url, "source": row.source}
+        examples[(idea.id, product_key(row.product_url))] = (idea.id, concepts[idea.id], product, int(row.score >= settings.SIMILARITY_THRESHOLD))
+
+    for comp in db.query(Competitor).filter(Competitor.is_relevant != None).all():
+        if comp.idea_id not in concepts:
+            continue
+        product = {"name": comp.product_name, "url": comp.url, "source": comp.source}
+        examples[(comp.idea_id, product_key(comp.url))] = (comp.idea_id, concepts[comp.idea_id], product, int(comp.is_relevant))
+
+    return list(examples.values())
+
+def train(db, holdout_fraction: float = 0.2, max_miss_rate: float = None, min_positives: int = None) -> RelevanceModel:
+    """
+    Fit on most ideas, pick skip_below on the held-out ones. Split by idea (not by row), so
+    the threshold is validated on ideas the model never saw; with a single idea there is
+    nothing to validate on and skipping stays off. Raises ValueError without enough labels
+    of both classes.
+    """
+    max_miss_rate = settings.RELEVANCE_MAX_MISS_RATE if max_miss_rate is None else max_miss_rate
+    min_positives = settings.RELEVANCE_MIN_HOLDOUT_POSITIVES if min_positives is None else min_positives
+
+    examples = load_labeled_examples(db)
+    labels = np.array([label for *_, label in examples], dtype=float)
+    if len(examples) < 10 or labels.min() == labels.max():
+        raise ValueError(f"Not enough labels to train ({len(examples)} examples, {int(labels.sum()) if len(labels) else 0} positive)")
+
+    features = RelevanceFeatures()
+    X = features.matrix([c for _, c, _, _ in examples], [p for _, _, p, _ in examples])
+    # Stable per-idea split (same ideas held out on every retrain)
+    idea_ids = [idea_id for idea_id, *_ in examples]
+    buckets = {idea_id: int(hashlib.md5(str(idea_id).encode()).hexdigest(), 16) % 1000 for idea_id in idea_ids}
+    if len(buckets) < 2:
+        # Rows of the training idea held out would overstate how well the threshold generalizes
+        model = fit_logistic(X, labels)
+        model.validation = {"reason": "need >= 2 ideas to validate on unseen ones", "train_examples": len(examples), "max_miss_rate": max_miss_rate}
+        return model
+    heldout_ideas = {idea_id for idea_id, bucket in buckets.items() if bucket < holdout_fraction * 1000}
+    if not heldout_ideas or len(heldout_ideas) == len(buckets):
+        # Too few ideas for the hashed split - hold out the lowest-bucket idea, still whole
+        heldout_ideas = {min(buckets, key=buckets.get)}
+    heldout = np.array([idea_id in heldout_ideas for idea_id in idea_ids])
+
+    model = fit_logistic(X[~heldout], labels[~heldout])
+    model.skip_below, model.validation = choose_skip_threshold(
+        model.predict_matrix(X[heldout]), labels[heldout], max_miss_rate, min_positives
+    )
+    model.validation.update({"train_examples": int((~heldout).sum()), "max_miss_rate": max_miss_rate})
+    return model
+
+_loaded = {}  # path -> (mtime, model)
+
+def get_relevance_model():
+    """Model at settings.RELEVANCE_MODEL_PATH (reloaded after a retrain), or None if disabled/untrained"""
+    path = settings.RELEVANCE_MODEL_PATH
+    if not settings.RELEVANCE_MODEL_ENABLED or not os.path.exists(path):
+        return None
+    mtime = os.path.getmtime(path)
+    cached = _loaded.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = _loaded[path] = (mtime, RelevanceModel.load(path))
+    return cached[1]
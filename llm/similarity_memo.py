@@ -0,0 +1,74 @@
+import hashlib
+from database.models import SimilarityCache
+from scrapers.canonical import legacy_url_hash, url_hash
+
+class SimilarityMemo:
+    """
+    DB-backed memo of similarity scores, shared by the interactive scanner and the monitoring runner.
+
+    Usage:
+        memo = SimilarityMemo(db, idea.user_description)
+        results, missing = memo.lookup(products)
+        ...score products[i] for i in missing with the LLM...
+        memo.store(product, similarity)   # then db.commit()
+    """
+
+    def __init__(self, db, idea_text: str):
+        self.db = db
+        self.idea_hash = self._md5(idea_text.strip())
+
+    @staticmethod
+    def _md5(text: str) -> str:
+        return hashlib.md5(text.encode('utf-8')).hexdigest()
+
+    def _url_hash(self, product: dict) -> str:
+        """Hash of the canonical product key - tracking-parameter / mirror URLs share one entry"""
+        return url_hash(product.get('url'))
+
+    def _content_hash(self, product: dict) -> str:
+        return self._md5(f"{product.get('name') or ''}|{product.get('description') or ''}|{product.get('price') or ''}")
+
+    def lookup(self, products: list[dict]) -> tuple:
+        """
+        Returns (results, missing): results is aligned with `products` holding memoized
+        {score, reasoning, user_advantage} or None; missing lists the indices still needing the LLM.
+        A listing whose content changed since it was scored is treated as a miss.
+        """
+        url_hashes = [self._url_hash(p) for p in products]
+        # Entries written before canonical keys hold the raw URL's hash
+        legacy_hashes = [legacy_url_hash(p.get('url')) for p in products]
+        rows = self.db.query(SimilarityCache).filter(
+            SimilarityCache.idea_hash == self.idea_hash,
+            SimilarityCache.url_hash.in_(set(url_hashes) | set(legacy_hashes))
+        ).all() if products else []
+        by_key = {(row.url_hash, row.content_hash): row for row in rows}
+
+        results, missing = [], []
+        for i, product in enumerate(products):
+            content_hash = self._content_hash(product)
+            row = by_key.get((url_hashes[i], content_hash)) or by_key.get((legacy_hashes[i], content_hash))
+            if row:
+                results.append({"score": row.score, "reasoning": row.reasoning, "user_advantage": row.user_advantage, "memo": True})
+            else:
+                results.append(None)
+                missing.append(i)
+        return results, missing
+
+    def store(self, product: dict, similarity: dict):
+        """Record a fresh LLM score, replacing any stale entry for the same listing (caller commits)"""
+        canonical_hash = self._url_hash(product)
+        self.db.query(SimilarityCache).filter(
+            SimilarityCache.idea_hash == self.idea_hash,
+            SimilarityCache.url_hash.in_({canonical_hash, legacy_url_hash(product.get('url'))})
+        ).delete(synchronize_session=False)
+        self.db.add(SimilarityCache(
+            idea_hash=self.idea_hash,
+            url_hash=canonical_hash,
+            content_hash=self._content_hash(product),
+            score=similarity.get('score'),
+            reasoning=similarity.get('reasoning'),
+            user_advantage=similarity.get('user_advantage'),
+            product_name=(product.get('name') or '')[:500],
+            product_url=product.get('url'),
+            source=product.get('source')
+        ))
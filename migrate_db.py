@@ -1,5 +1,5 @@
 """
-One-time migration script to add monitoring columns to Idea table.
+One-time migration script to add monitoring and scan-deadline columns to Idea table.
 Run this ONCE on production after deploying the new schema.
 
 Usage:
@@ -17,7 +17,7 @@ def migrate():
         result = conn.execute(text("""
             SELECT column_name
             FROM information_schema.columns
-            WHERE table_name='ideas' AND column_name IN ('monitoring_enabled', 'monitoring_ends_at')
+            WHERE table_name='ideas' AND column_name IN ('monitoring_enabled', 'monitoring_ends_at', 'scan_partial', 'followup_scan_at')
         """))
         existing_columns = [row[0] for row in result]
 
@@ -37,6 +37,54 @@ def migrate():
         else:
             print("✓ monitoring_ends_at already exists")
 
+        if 'scan_partial' not in existing_columns:
+            print("Adding scan_partial column...")
+            conn.execute(text("ALTER TABLE ideas ADD COLUMN scan_partial BOOLEAN DEFAULT FALSE"))
+            conn.commit()
+            print("✓ Added scan_partial")
+        else:
+            print("✓ scan_partial already exists")
+
+        if 'followup_scan_at' not in existing_columns:
+            print("Adding followup_scan_at column...")
+            conn.execute(text("ALTER TABLE ideas ADD COLUMN followup_scan_at TIMESTAMP"))
+            conn.commit()
+            print("✓ Added followup_scan_at")
+        else:
+            print("✓ followup_scan_at already exists")
+
+        # Product fields on similarity_cache, used to train the relevance model
+        result = conn.execute(text("""
+            SELECT column_name
+            FROM information_schema.columns
+            WHERE table_name='similarity_cache'
+        """))
+        cache_columns = [row[0] for row in result]
+        if cache_columns:
+            for column, column_type in (("product_name", "VARCHAR(500)"), ("product_url", "TEXT"), ("source", "VARCHAR(100)")):
+                if column not in cache_columns:
+                    print(f"Adding similarity_cache.{column} column...")
+                    conn.execute(text(f"ALTER TABLE similarity_cache ADD COLUMN {column} {column_type}"))
+                    conn.commit()
+                    print(f"✓ Added similarity_cache.{column}")
+                else:
+                    print(f"✓ similarity_cache.{column} already exists")
+
+        # LRU order on concept_cache (rows from before it fall back to created_at)
+        result = conn.execute(text("""
+            SELECT column_name
+            FROM information_schema.columns
+            WHERE table_name='concept_cache'
+        """))
+        concept_columns = [row[0] for row in result]
+        if concept_columns and 'last_accessed' not in concept_columns:
+            print("Adding concept_cache.last_accessed column...")
+            conn.execute(text("ALTER TABLE concept_cache ADD COLUMN last_accessed TIMESTAMP"))
+            conn.commit()
+            print("✓ Added concept_cache.last_accessed")
+        elif concept_columns:
+            print("✓ concept_cache.last_accessed already exists")
+
         # Check if ScanHistory table exists
         result = conn.execute(text("""
             SELECT EXISTS (
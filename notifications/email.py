@@ -56,10 +56,11 @@ class EmailService:
         server.quit()
         logger.info(f"No-matches email sent to {to_email}")
 
-    def send_alert(self, to_email: str, idea_title: str, competitors: list, verdict: str = None, gap_analysis: str = None):
+    def send_alert(self, to_email: str, idea_title: str, competitors: list, verdict: str = None, gap_analysis: str = None, partial: bool = False):
         """
         Send alert with found competitors.
         competitors: List of Competitor SQLAlchemy objects
+        partial: the scan hit its time limit - say more results may follow
         """
         subject = f"🚨 New Competitors Found for: {idea_title}"
 
@@ -90,11 +91,19 @@ class EmailService:
             </div>
             """
 
+        partial_html = ""
+        if partial:
+            partial_html = """
+            <p style="color: #92400e; background-color: #fef3c7; padding: 10px; border-radius: 8px; font-size: 0.9em;">
+                ⏱️ These are the best matches found so far - the scan hit its time limit. We're checking the rest and will email you if we find more.
+            </p>
+            """
+
         body = f"""
         <div style="font-family: sans-serif; max-width: 600px; margin: 0 auto;">
             <h2>Idea Validator Report</h2>
             <p>We found new potential competitors for your idea: <strong>{idea_title}</strong></p>
-            
+            {partial_html}
             {verdict_html}
             {gap_html}
             
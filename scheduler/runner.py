@@ -1,31 +1,44 @@
 import schedule
 import time
-import hashlib
+import glob
 import json
+import os
 from datetime import datetime, timedelta
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from database.connection import SessionLocal
 from database.models import Idea, Competitor, ScanHistory
 from scrapers.registry import ScraperRegistry
+from scrapers.query_planner import QueryPlanner
+from scrapers.canonical import legacy_url_hash, product_key, url_hash
 from llm.matcher import ConceptMatcher
+from llm.similarity_memo import SimilarityMemo
+from llm.batch import STATUS_RUNNING, STATUS_SUCCEEDED, get_batch_backend, read_results, write_job
+from llm.rate_limiter import PRIORITY_MONITORING
 from notifications.email import EmailService
 from config.settings import settings
 
 class DailyRunner:
     def __init__(self):
-        self.matcher = ConceptMatcher()
+        # Weekly checks queue behind interactive scans and are capped to a share of the quota
+        self.matcher = ConceptMatcher(priority=PRIORITY_MONITORING)
         self.notifier = EmailService()
 
     def _get_url_hash(self, url: str) -> str:
-        """Generate a consistent 32-char hash for a URL"""
-        return hashlib.md5(url.encode('utf-8')).hexdigest()
+        """32-char hash of the URL's canonical product key - URL variants of a listing share it"""
+        return url_hash(url)
 
     def check_all_ideas(self):
         """Main job - runs daily, checks for ideas needing weekly updates"""
         print(f"[{datetime.now()}] Starting daily monitoring check...")
 
         db = SessionLocal()
-        
+
+        # Batch mode: reconcile jobs that finished since the last poll; ideas still in flight aren't resubmitted
+        in_flight = set()
+        if settings.MONITORING_BATCH_MODE:
+            self._poll_batch_jobs(db)
+            in_flight = self._ideas_in_flight()
+
         # Only fetch ideas that have monitoring enabled and are within the valid window
         now = datetime.utcnow()
         ideas = db.query(Idea).filter(
@@ -33,53 +46,67 @@ class DailyRunner:
             Idea.monitoring_ends_at > now
         ).all()
 
-        count = 0
+        # Enforce Weekly Frequency: Check if 7 days have passed since last check
+        due_ideas = []
         for idea in ideas:
-            # Enforce Weekly Frequency: Check if 7 days have passed since last check
             # Handle case where last_checked is None (shouldn't happen due to default, but safe)
             last_checked = idea.last_checked or datetime.min
             days_since_last = (now - last_checked).days
-            
+
             if days_since_last < 7:
                 print(f"Skipping Idea #{idea.id} (Checked {days_since_last} days ago)")
                 continue
+            if idea.id in in_flight:
+                print(f"Skipping Idea #{idea.id} (Waiting for its batch job)")
+                continue
+            due_ideas.append(idea)
 
-            print(f"Checking monitored Idea #{idea.id}...")
-            try:
-                new_competitors = self._scan_for_idea(idea, db)
-                if new_competitors:
-                    print(f"Found {len(new_competitors)} new matches for Idea #{idea.id}")
-                    if idea.user and idea.user.email and idea.user.is_active:
-                        self.notifier.send_alert(idea.user.email, idea.user_description, new_competitors)
-                    elif idea.user and not idea.user.is_active:
-                        print(f"Skipping Idea #{idea.id} - User has unsubscribed")
-                    else:
-                        print(f"WARNING: Idea #{idea.id} has no user email associated.")
-                else:
-                    print(f"No new matches for Idea #{idea.id}")
-                
-                idea.last_checked = datetime.utcnow()
-                db.commit()
-                count += 1
-            except Exception as e:
-                print(f"Error checking Idea #{idea.id}: {e}")
-                import traceback
-                traceback.print_exc()
+        # Scrape due ideas together up front - one Serper request covers several ideas' searches
+        scraped = self._scrape_ideas(due_ideas)
+
+        if settings.MONITORING_BATCH_MODE:
+            count = self._submit_ideas_batch(due_ideas, db, scraped)
+        else:
+            count = 0
+            for idea in due_ideas:
+                print(f"Checking monitored Idea #{idea.id}...")
+                try:
+                    new_competitors = self._scan_for_idea(idea, db, scraped.get(idea.id))
+                    self._notify(idea, new_competitors)
+
+                    idea.last_checked = datetime.utcnow()
+                    db.commit()
+                    count += 1
+                except Exception as e:
+                    print(f"Error checking Idea #{idea.id}: {e}")
+                    import traceback
+                    traceback.print_exc()
 
         db.close()
         print(f"✓ Daily check complete. Scanned {count} ideas.")
 
+    def _notify(self, idea: Idea, new_competitors: list):
+        """Email the idea's owner about new matches"""
+        if new_competitors:
+            print(f"Found {len(new_competitors)} new matches for Idea #{idea.id}")
+            if idea.user and idea.user.email and idea.user.is_active:
+                self.notifier.send_alert(idea.user.email, idea.user_description, new_competitors)
+            elif idea.user and not idea.user.is_active:
+                print(f"Skipping Idea #{idea.id} - User has unsubscribed")
+            else:
+                print(f"WARNING: Idea #{idea.id} has no user email associated.")
+        else:
+            print(f"No new matches for Idea #{idea.id}")
+
     def _is_already_seen(self, idea_id: int, url: str, db) -> bool:
         """
         Check scan history. 
         Returns True if we have EVER seen this URL for this Idea (relevant or not).
         """
-        url_hash = self._get_url_hash(url)
-        
-        # Check history (efficient index lookup)
-        exists = db.query(ScanHistory).filter_by(
-            idea_id=idea_id,
-            url_hash=url_hash
+        # Check history (efficient index lookup) - rows written before canonical keys hold the raw URL's hash
+        exists = db.query(ScanHistory).filter(
+            ScanHistory.idea_id == idea_id,
+            ScanHistory.url_hash.in_({self._get_url_hash(url), legacy_url_hash(url)})
         ).first()
         
         if exists:
@@ -114,67 +141,302 @@ class DailyRunner:
         db.add(comp)
         return comp
 
-    def _run_single_scraper(self, source_name: str, scraper, search_query: str) -> tuple:
-        """Run a single scraper and return results with source name"""
-        try:
-            results = scraper.search(search_query)
-            return (source_name, results)
-        except Exception as e:
-            print(f"Error scraping {source_name}: {e}")
-            return (source_name, [])
+    def _scrape(self, idea: Idea) -> list:
+        """Run the query plan over all scrapers. Returns fused products, each tagged with 'source'"""
+        concepts = json.loads(idea.extracted_concepts)
+        registry = ScraperRegistry()
+        fanout = QueryPlanner().search(list(registry.get_all_scrapers()), concepts.get("search_keywords", []))
+        for source_name, query, error in fanout.failed:
+            print(f"Error scraping {source_name} ('{query}'): {error}")
+        return fanout.products
+
+    def _scrape_ideas(self, ideas: list) -> dict:
+        """
+        idea.id -> _scrape(idea), scraping SERPER_BATCH_MAX_IDEAS ideas at a time so their
+        Serper queries go out together in batched requests. Ideas that failed are left out
+        (and scraped again on their own turn).
+        """
+        ideas = [idea for idea in ideas if idea.extracted_concepts]
+        if len(ideas) < 2 or settings.SERPER_BATCH_MAX_IDEAS < 2:
+            return {}
 
-    def _scan_for_idea(self, idea: Idea, db) -> list:
-        """Scan all sources for one idea"""
+        scraped = {}
+        with ThreadPoolExecutor(max_workers=settings.SERPER_BATCH_MAX_IDEAS) as executor:
+            futures = {executor.submit(self._scrape, idea): idea.id for idea in ideas}
+            for future in as_completed(futures):
+                try:
+                    scraped[futures[future]] = future.result()
+                except Exception as e:
+                    print(f"Error scraping Idea #{futures[future]}: {e}")
+        return scraped
+
+    def _collect_new_products(self, idea: Idea, db, scraped: list = None) -> list:
+        """
+        Products not seen before, as [(source_name, product)]. `scraped` is this idea's
+        _scrape() output if it was fetched ahead of time; otherwise scrapers run now.
+        """
+        if scraped is None:
+            scraped = self._scrape(idea)
+
+        new_products = []  # (source_name, product)
+        seen_keys = set()
+        for product in scraped:
+            # 1. Smart Diff: Check if seen before (Hash check)
+            key = product_key(product["url"])
+            if key in seen_keys or self._is_already_seen(idea.id, product["url"], db):
+                continue
+            seen_keys.add(key)
+            new_products.append((product["source"], product))
+        return new_products
+
+    def _skip_irrelevant(self, idea: Idea, new_products: list) -> list:
+        """Leave out products the local relevance model is sure about (they're re-checked next week, locally)"""
+        kept = self.matcher.skip_irrelevant(json.loads(idea.extracted_concepts), [product for _, product in new_products])
+        kept_ids = {id(product) for product in kept}
+        return [(source_name, product) for source_name, product in new_products if id(product) in kept_ids]
+
+    def _save_results(self, idea: Idea, new_products: list, similarities: list, db) -> list:
+        """Record scan history and save matches. Returns the new Competitor rows"""
+        new_competitors = []
+        for (source_name, product), similarity in zip(new_products, similarities):
+            if similarity is None:
+                # Not scored - leave out of history so next week's pass retries it
+                continue
+
+            is_match = similarity["score"] >= settings.SIMILARITY_THRESHOLD
+
+            # 3. Record History (Firewall for next time)
+            self._record_scan_result(idea.id, product["url"], is_match, db)
+
+            # 4. If Match: Save Competitor & Queue for Alert
+            if is_match:
+                comp = self._save_competitor(
+                    idea.id, product, source_name, similarity, db
+                )
+                new_competitors.append(comp)
+        return new_competitors
+
+    def _scan_for_idea(self, idea: Idea, db, scraped: list = None) -> list:
+        """Scan all sources for one idea (`scraped`: see _collect_new_products)"""
         if not idea.extracted_concepts:
             print(f"Idea #{idea.id} has no extracted concepts. Skipping.")
             return []
 
-        concepts = json.loads(idea.extracted_concepts)
-        search_query = " ".join(concepts.get("search_keywords", []))
+        self.matcher.reset_stats()
+        self.matcher.set_priority(PRIORITY_MONITORING, tenant=idea.user_id)
+        new_products = self._skip_irrelevant(idea, self._collect_new_products(idea, db, scraped))
 
-        new_competitors = []
-        registry = ScraperRegistry()
-        all_scrapers = list(registry.get_all_scrapers())
+        # 2. If New: Run LLM Matcher (batched - N products per call, optionally cascaded),
+        #    reusing memoized scores for listings that haven't changed
+        products = [product for _, product in new_products]
+        memo = SimilarityMemo(db, idea.user_description)
+        similarities, missing = memo.lookup(products)
 
-        # Run all scrapers in parallel
-        with ThreadPoolExecutor(max_workers=len(all_scrapers)) as executor:
-            futures = {
-                executor.submit(self._run_single_scraper, source_name, scraper, search_query): source_name
-                for source_name, scraper in all_scrapers
-            }
+        score_products = self.matcher.calculate_similarity_cascade if settings.SIMILARITY_CASCADE_ENABLED else self.matcher.calculate_similarity_batch
+        fresh = score_products(idea.user_description, [products[i] for i in missing]) if missing else []
+        for i, similarity in zip(missing, fresh):
+            similarities[i] = similarity
+            if similarity is not None:
+                memo.store(products[i], similarity)
 
-            for future in as_completed(futures):
-                source_name, results = future.result()
-
-                for product in results:
-                    # 1. Smart Diff: Check if seen before (Hash check)
-                    if self._is_already_seen(idea.id, product["url"], db):
-                        continue
-
-                    # 2. If New: Run LLM Matcher
-                    similarity = self.matcher.calculate_similarity(
-                        idea.user_description,
-                        product
-                    )
-                    
-                    is_match = similarity["score"] >= settings.SIMILARITY_THRESHOLD
-
-                    # 3. Record History (Firewall for next time)
-                    self._record_scan_result(idea.id, product["url"], is_match, db)
-
-                    # 4. If Match: Save Competitor & Queue for Alert
-                    if is_match:
-                        comp = self._save_competitor(
-                            idea.id, product, source_name, similarity, db
-                        )
-                        new_competitors.append(comp)
+        if len(missing) < len(products):
+            print(f"Idea #{idea.id}: reused {len(products) - len(missing)}/{len(products)} memoized scores")
+
+        new_competitors = self._save_results(idea, new_products, similarities, db)
 
         db.commit()
+        if self.matcher.stats:
+            print(f"Idea #{idea.id} scan report: {json.dumps(self.matcher.stats, sort_keys=True)}")
+        if self.matcher.call_metrics.records:
+            print(f"Idea #{idea.id} LLM summary: {json.dumps(self.matcher.call_metrics.summary(), sort_keys=True)}")
         return new_competitors
 
+    def _finish_idea(self, idea: Idea, new_products: list, similarities: list, db, mark_checked: bool = True) -> bool:
+        """Save an idea's scored products and send its alert. Returns False if saving failed"""
+        try:
+            new_competitors = self._save_results(idea, new_products, similarities, db)
+            if mark_checked:
+                idea.last_checked = datetime.utcnow()
+            db.commit()
+            self._notify(idea, new_competitors)
+            return True
+        except Exception as e:
+            db.rollback()
+            print(f"Error saving results for Idea #{idea.id}: {e}")
+            return False
+
+    def _submit_ideas_batch(self, ideas: list, db, scraped: dict = None) -> int:
+        """
+        Batch mode for the weekly pass:
+        1. Scrape every due idea and write all unscored similarity prompts as one JSONL job
+        2. Submit it to the batch backend and record it in a <job>.state.json next to the job file
+        3. _poll_batch_jobs() reconciles the scores on a later scheduler run - nothing waits here
+        Ideas with nothing left to score are finished right away.
+        Returns the number of ideas checked now (not the ones submitted).
+        """
+        pending = {}  # idea id -> new_products
+        requests = []  # (key, prompt)
+        manifest = {}  # key -> (idea id, product indices)
+        count = 0
+
+        for idea in ideas:
+            if not idea.extracted_concepts:
+                print(f"Idea #{idea.id} has no extracted concepts. Skipping.")
+                continue
+            try:
+                new_products = self._skip_irrelevant(idea, self._collect_new_products(idea, db, (scraped or {}).get(idea.id)))
+            except Exception as e:
+                print(f"Error scraping Idea #{idea.id}: {e}")
+                continue
+
+            products = [product for _, product in new_products]
+            memo = SimilarityMemo(db, idea.user_description)
+            similarities, missing = memo.lookup(products)
+            if not missing:
+                count += self._finish_idea(idea, new_products, similarities, db)
+                continue
+
+            pending[idea.id] = new_products
+            chunks = self.matcher.similarity_batch_prompts(idea.user_description, [products[i] for i in missing])
+            for chunk_no, (local_indices, prompt) in enumerate(chunks):
+                key = f"idea-{idea.id}-{chunk_no}"
+                requests.append((key, prompt))
+                manifest[key] = (idea.id, [missing[i] for i in local_indices])
+
+        if not requests:
+            return count
+
+        job_path = os.path.join(settings.MONITORING_BATCH_DIR, f"monitoring-{datetime.utcnow():%Y%m%d-%H%M%S}.jsonl")
+        write_job(job_path, requests)
+        try:
+            job_id = get_batch_backend().submit(job_path)
+        except Exception as e:
+            # Nothing submitted - the ideas stay due and tomorrow's run tries again
+            print(f"[BATCH] Couldn't submit {len(requests)} similarity prompts: {e}")
+            os.remove(job_path)
+            return count
+
+        state = {
+            "job_id": job_id,
+            "submitted_at": datetime.utcnow().isoformat(),
+            "ideas": {str(idea_id): new_products for idea_id, new_products in pending.items()},
+            "manifest": manifest,
+        }
+        state_path = job_path[:-len(".jsonl")] + ".state.json"
+        with open(state_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(state, f, default=str)
+        os.replace(state_path + ".tmp", state_path)
+        print(f"[BATCH] {len(requests)} similarity prompts for {len(pending)} ideas -> {job_id}")
+        return count
+
+    def _batch_states(self) -> list:
+        """[(state file path, state)] for every submitted, not yet reconciled batch job"""
+        states = []
+        for path in sorted(glob.glob(os.path.join(settings.MONITORING_BATCH_DIR, "*.state.json"))):
+            with open(path, encoding="utf-8") as f:
+                states.append((path, json.load(f)))
+        return states
+
+    def _ideas_in_flight(self) -> set:
+        return {int(idea_id) for _, state in self._batch_states() for idea_id in state["ideas"]}
+
+    def _poll_batch_jobs(self, db) -> int:
+        """
+        Check each submitted batch job once (no waiting). Finished jobs are reconciled, failed
+        ones and ones running longer than MONITORING_BATCH_TIMEOUT are dropped - their ideas
+        stay due and are resubmitted by the next daily run. Returns the number of ideas checked.
+        """
+        count = 0
+        backend = None
+        for state_path, state in self._batch_states():
+            backend = backend or get_batch_backend()
+            job_id = state["job_id"]
+            try:
+                status = backend.status(job_id)
+            except Exception as e:
+                print(f"[BATCH] Couldn't poll {job_id}: {e}")
+                continue
+
+            if status == STATUS_RUNNING:
+                age = (datetime.utcnow() - datetime.fromisoformat(state["submitted_at"])).total_seconds()
+                if age < settings.MONITORING_BATCH_TIMEOUT:
+                    continue
+                print(f"[BATCH] {job_id} still running after {age:.0f}s - giving up, its ideas stay due")
+            elif status == STATUS_SUCCEEDED:
+                count += self._reconcile_batch(state, read_results(backend.results_path(job_id)), db)
+            else:
+                print(f"[BATCH] {job_id} ended as {status} - unscored products will be retried")
+            self._remove_batch_files(backend, state_path, job_id)
+        return count
+
+    def _remove_batch_files(self, backend, state_path: str, job_id: str):
+        """Drop a handled job: the backend's results, then the job file and state file (state last, so a crash retries the cleanup)"""
+        backend.cleanup(job_id)
+        job_path = state_path[:-len(".state.json")] + ".jsonl"
+        if os.path.exists(job_path):
+            os.remove(job_path)
+        os.remove(state_path)
+
+    def _reconcile_batch(self, state: dict, results: dict, db) -> int:
+        """Record a finished job's scores into ScanHistory / Competitor and send alerts. Returns the number of ideas checked"""
+        answered = set()
+        scores = {}  # idea id -> {product index: similarity}
+        for key, (idea_id, indices) in state["manifest"].items():
+            response = results.get(key)
+            if response is None:
+                continue
+            answered.add(idea_id)
+            scores.setdefault(idea_id, {}).update(self.matcher.parse_similarity_batch(response, indices))
+
+        count = 0
+        for idea_id, new_products in state["ideas"].items():
+            idea = db.get(Idea, int(idea_id))
+            if idea is None:
+                continue
+            new_products = [(source_name, product) for source_name, product in new_products]
+            products = [product for _, product in new_products]
+            memo = SimilarityMemo(db, idea.user_description)
+            similarities, _ = memo.lookup(products)
+            for i, similarity in scores.get(idea.id, {}).items():
+                similarities[i] = similarity
+                memo.store(products[i], similarity)
+
+            # Ideas whose prompts got no answer at all stay due, so the next run retries them
+            count += self._finish_idea(idea, new_products, similarities, db, mark_checked=idea.id in answered)
+        return count
+
+    def poll_batch_jobs(self):
+        """Reconcile monitoring batch jobs that finished since the last poll"""
+        db = SessionLocal()
+        try:
+            count = self._poll_batch_jobs(db)
+            if count:
+                print(f"✓ Reconciled batch results for {count} ideas")
+        except Exception as e:
+            print(f"Error polling batch jobs: {e}")
+        finally:
+            db.close()
+
+    def run_followups(self):
+        """Finish interactive scans that hit their deadline (see api.services.scanner)"""
+        from api.services.scanner import run_followup_scans
+
+        db = SessionLocal()
+        try:
+            count = run_followup_scans(db)
+            if count:
+                print(f"✓ Ran {count} follow-up scans")
+        except Exception as e:
+            print(f"Error running follow-up scans: {e}")
+        finally:
+            db.close()
+
     def start(self):
         """Run scheduler in background"""
         schedule.every().day.at("09:00").do(self.check_all_ideas)
+        schedule.every(settings.SCAN_FOLLOWUP_POLL_MINUTES).minutes.do(self.run_followups)
+        if settings.MONITORING_BATCH_MODE:
+            schedule.every(settings.MONITORING_BATCH_POLL_MINUTES).minutes.do(self.poll_batch_jobs)
 
         print("📅 Monitoring Service Started - Checking daily at 09:00 UTC")
         while True:
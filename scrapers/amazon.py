@@ -1,6 +1,6 @@
-import requests
 import re
 from scrapers.base_scraper import BaseScraper
+from scrapers.serper_batch import get_serper_batcher
 from config.settings import settings
 
 class AmazonScraper(BaseScraper):
@@ -22,21 +22,11 @@ class AmazonScraper(BaseScraper):
         # Use Google site search to find Amazon products
         search_query = f"site:amazon.com {keywords}"
 
-        url = "https://google.serper.dev/search"
         payload = {"q": search_query, "num": 15}
-        headers = {
-            "X-API-KEY": settings.SERPER_API_KEY,
-            "Content-Type": "application/json"
-        }
 
         try:
-            response = requests.post(url, json=payload, headers=headers, timeout=settings.REQUEST_TIMEOUT)
-
-            if response.status_code != 200:
-                print(f"Amazon: Serper returned status {response.status_code}")
-                return []
-
-            data = response.json()
+            # Batched with the other Serper searches running now (one round trip)
+            data = get_serper_batcher().search(payload)
             results = []
 
             for item in data.get("organic", []):
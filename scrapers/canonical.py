@@ -0,0 +1,89 @@
+import hashlib
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+# Host prefixes that serve the same listing (mobile, regional, affiliate front-ends)
+_HOST_PREFIXES = ("www.", "m.", "smile.")
+
+_AMAZON_ASIN_RE = re.compile(r"/(?:dp|gp/product|gp/aw/d|exec/obidos/asin|o/asin)/([A-Z0-9]{10})(?:[/?]|$)", re.IGNORECASE)
+_ALIEXPRESS_ITEM_RE = re.compile(r"/item/(?:[^/]+/)?(\d{6,})(?:\.html)?", re.IGNORECASE)
+_KICKSTARTER_RE = re.compile(r"/projects/([^/]+)/([^/]+)", re.IGNORECASE)
+_PRODUCTHUNT_RE = re.compile(r"/(?:products|posts)/([^/]+)", re.IGNORECASE)
+_PATENT_RE = re.compile(r"/patent/([A-Z]{2}\d+[A-Z]\d?|[A-Z]{2}\d+)", re.IGNORECASE)
+
+# Query parameters that only track the visit (campaign, click id, referrer) - anything else may pick the product
+_TRACKING_PARAMS = {"gclid", "gbraid", "wbraid", "dclid", "fbclid", "msclkid", "yclid", "igshid", "srsltid", "ref", "ref_", "spm", "_ga"}
+_TRACKING_PREFIXES = ("utm_", "mc_", "pk_")
+
+def normalize_host(host: str) -> str:
+    host = (host or "").lower().split(":")[0].rstrip(".")
+    for prefix in _HOST_PREFIXES:
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    return host
+
+def _is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name in _TRACKING_PARAMS or name.startswith(_TRACKING_PREFIXES)
+
+def canonical_url(url: str) -> str:
+    """
+    URL without scheme differences, www/m. host prefixes, fragment, trailing slash or tracking
+    parameters. Other query parameters are kept, sorted (product.php?id=5 and ?id=6 are different products).
+    """
+    parts = urlsplit((url or "").strip())
+    params = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _is_tracking_param(k))
+    query = f"?{urlencode(params)}" if params else ""
+    return f"{normalize_host(parts.netloc)}{parts.path.rstrip('/')}{query}"
+
+def product_key(url: str) -> str:
+    """
+    One key per product, whichever scraper or URL variant found it:
+    - Amazon (any marketplace, /dp/ or /gp/product/): "amazon:<ASIN>"
+    - AliExpress (any regional host): "aliexpress:<item id>"
+    - Kickstarter: "kickstarter:<creator>/<project>"
+    - ProductHunt: "producthunt:<slug>"
+    - Google Patents: "patent:<number>"
+    - anything else: canonical_url()
+    """
+    parts = urlsplit((url or "").strip())
+    host, path = normalize_host(parts.netloc), parts.path
+
+    if "amazon." in host or host in ("amzn.com", "amzn.to"):
+        match = _AMAZON_ASIN_RE.search(path)
+        if match:
+            return f"amazon:{match.group(1).upper()}"
+    elif "aliexpress." in host:
+        match = _ALIEXPRESS_ITEM_RE.search(path)
+        if match:
+            return f"aliexpress:{match.group(1)}"
+    elif host == "kickstarter.com":
+        match = _KICKSTARTER_RE.search(path)
+        if match:
+            return f"kickstarter:{match.group(1).lower()}/{match.group(2).lower()}"
+    elif host == "producthunt.com":
+        match = _PRODUCTHUNT_RE.search(path)
+        if match:
+            return f"producthunt:{match.group(1).lower()}"
+    elif host == "patents.google.com":
+        match = _PATENT_RE.search(path)
+        if match:
+            return f"patent:{match.group(1).upper()}"
+    return canonical_url(url)
+
+def url_hash(url: str) -> str:
+    """MD5 of product_key() - what ScanHistory / SimilarityCache / ComplaintCache store"""
+    return hashlib.md5(product_key(url).encode('utf-8')).hexdigest()
+
+def legacy_url_hash(url: str) -> str:
+    """MD5 of the raw URL, as stored before canonical keys - still matched so old history isn't re-scored"""
+    return hashlib.md5((url or "").encode('utf-8')).hexdigest()
+
+def merge_duplicate(first: dict, duplicate: dict):
+    """Fill price/description missing on `first` from a duplicate; note the duplicate's source under 'also_on'"""
+    for field in ("price", "description"):
+        if not first.get(field) and duplicate.get(field):
+            first[field] = duplicate[field]
+    source = duplicate.get('source')
+    if source and source != first.get('source') and source not in first.setdefault('also_on', []):
+        first['also_on'].append(source)
@@ -0,0 +1,87 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from database.models import ComplaintCache
+from scrapers.serper import SerperScraper
+from scrapers.canonical import url_hash
+from config.settings import settings
+
+class ComplaintFinder:
+    """
+    Gap Hunter "hate search": public complaint snippets for competitor products.
+
+    Snippets are cached per product in the complaint_cache table and reused across ideas.
+    Only the searches run in worker threads; DB reads/writes stay on the caller's session.
+
+    Usage:
+        finder = ComplaintFinder(db)
+        cached, missing = finder.lookup(competitors)
+        fresh = finder.search_all(missing)      # safe to run concurrently with other work
+        finder.store(missing, fresh)            # then db.commit()
+    """
+
+    def __init__(self, db, serper: SerperScraper = None):
+        self.db = db
+        self.serper = serper or SerperScraper()
+
+    @staticmethod
+    def product_key(url: str) -> str:
+        """Same product, same key - canonical product key (scrapers/canonical.py), hashed"""
+        return url_hash(url)
+
+    @staticmethod
+    def hate_query(product_name: str) -> str:
+        return f"{product_name} review problem OR broken OR bad OR disappointed OR hate"
+
+    def lookup(self, competitors: list) -> tuple:
+        """
+        Returns (cached, missing): cached maps product name -> snippets for competitors with a
+        fresh cache entry; missing lists the competitors that still need a search.
+        """
+        keys = [self.product_key(c.url) for c in competitors]
+        cutoff = datetime.utcnow() - timedelta(days=settings.COMPLAINT_CACHE_TTL_DAYS)
+        rows = self.db.query(ComplaintCache).filter(
+            ComplaintCache.product_key.in_(set(keys)),
+            ComplaintCache.created_at >= cutoff
+        ).all() if competitors else []
+        by_key = {row.product_key: row for row in rows}
+
+        cached, missing = {}, []
+        for competitor, key in zip(competitors, keys):
+            row = by_key.get(key)
+            if row is None:
+                missing.append(competitor)
+            else:
+                cached[competitor.product_name] = json.loads(row.snippets)
+        return cached, missing
+
+    def search(self, product_name: str) -> list[str]:
+        """Complaint snippets for one product (empty if nothing negative was found, None if the search failed)"""
+        results = self.serper.search_snippets(self.hate_query(product_name))
+        if results is None:
+            return None
+        snippets = [r.get('description', '') or r.get('name', '') for r in results]
+        return [s for s in snippets if s]
+
+    def search_all(self, competitors: list) -> list:
+        """Run the searches in parallel. Returns snippet lists (None for failed searches) aligned with `competitors`"""
+        if not competitors:
+            return []
+        with ThreadPoolExecutor(max_workers=len(competitors)) as executor:
+            return list(executor.map(self.search, [c.product_name for c in competitors]))
+
+    def store(self, competitors: list, snippet_lists: list):
+        """
+        Cache search results (caller commits). Empty results are cached too - no point re-searching
+        daily - but failed searches (None) aren't, so an outage or missing key doesn't stick for the TTL.
+        """
+        for competitor, snippets in zip(competitors, snippet_lists):
+            if snippets is None:
+                continue
+            key = self.product_key(competitor.url)
+            self.db.query(ComplaintCache).filter(ComplaintCache.product_key == key).delete()
+            self.db.add(ComplaintCache(
+                product_key=key,
+                product_name=competitor.product_name,
+                snippets=json.dumps(snippets)
+            ))
@@ -0,0 +1,134 @@
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config.settings import settings
+from llm.metrics import Histogram, SECONDS_BUCKETS
+
+class HTTPTiming:
+    """What one request through HTTPClient cost - passed to every timing hook"""
+
+    def __init__(self, method: str, url: str):
+        self.method = method
+        self.host = urlsplit(url).netloc.lower()
+        self.status = None
+        self.elapsed = 0.0     # Seconds, including urllib3 retries and their backoff
+        self.retries = 0
+        self.error = None      # Exception class name if the request ultimately failed
+
+class HTTPClient:
+    """
+    One pooled requests.Session for all scrapers, so repeated searches against
+    google.serper.dev / serpapi.com reuse keep-alive connections instead of paying
+    a TCP + TLS handshake per call.
+
+    - Pools per host (pool_connections hosts, pool_maxsize sockets each)
+    - (connect, read) timeouts
+    - Retries with backoff on connection errors and 5xx; after the last retry the 5xx
+      response is returned, so callers keep their own status_code checks
+    - Timing hooks: fn(HTTPTiming) called after every request, success or not
+
+    Usage:
+        response = get_http_client().post(url, json=payload, headers=headers)
+    """
+
+    RETRY_STATUSES = (500, 502, 503, 504)
+
+    def __init__(self, pool_connections: int = None, pool_maxsize: int = None, connect_timeout: float = None,
+                 read_timeout: float = None, retries: int = None, backoff: float = None):
+        self.timeout = (
+            settings.HTTP_CONNECT_TIMEOUT if connect_timeout is None else connect_timeout,
+            settings.HTTP_READ_TIMEOUT if read_timeout is None else read_timeout,
+        )
+        retry = Retry(
+            total=settings.HTTP_RETRIES if retries is None else retries,
+            backoff_factor=settings.HTTP_RETRY_BACKOFF if backoff is None else backoff,
+            status_forcelist=self.RETRY_STATUSES,
+            allowed_methods=frozenset(["GET", "POST"]),  # Search APIs are read-only, POST included
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections or settings.HTTP_POOL_CONNECTIONS,
+            pool_maxsize=pool_maxsize or settings.HTTP_POOL_MAXSIZE,
+            max_retries=retry,
+        )
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = settings.USER_AGENT
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._hooks = []
+        self._lock = threading.Lock()
+        self._hosts = {}  # host -> {"requests", "errors", "retries", "latency": Histogram}
+        self.add_hook(self._record)
+
+    def add_hook(self, hook):
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook):
+        if hook in self._hooks:
+            self._hooks.remove(hook)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        timing = HTTPTiming(method, url)
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+            timing.status = response.status_code
+            retries = getattr(response.raw, "retries", None)
+            timing.retries = len(retries.history) if retries is not None else 0
+            return response
+        except Exception as e:
+            timing.error = type(e).__name__
+            raise
+        finally:
+            timing.elapsed = time.perf_counter() - started
+            for hook in list(self._hooks):
+                try:
+                    hook(timing)
+                except Exception as e:
+                    print(f"[HTTP] Timing hook failed: {e}")
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def _record(self, timing: HTTPTiming):
+        with self._lock:
+            entry = self._hosts.get(timing.host)
+            if entry is None:
+                entry = self._hosts[timing.host] = {"requests": 0, "errors": 0, "retries": 0, "latency": Histogram(SECONDS_BUCKETS)}
+            entry["requests"] += 1
+            entry["retries"] += timing.retries
+            entry["errors"] += int(timing.error is not None or (timing.status or 0) >= 500)
+            entry["latency"].observe(timing.elapsed)
+
+    def snapshot(self) -> list[dict]:
+        """Per-host request counts and latency"""
+        with self._lock:
+            return [
+                {"host": host, "requests": e["requests"], "errors": e["errors"], "retries": e["retries"], "latency_s": e["latency"].to_dict()}
+                for host, e in sorted(self._hosts.items())
+            ]
+
+    def close(self):
+        self.session.close()
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_http_client() -> HTTPClient:
+    """Process-wide client shared by every scraper"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HTTPClient()
+        return _client
+
+def http_snapshots() -> list[dict]:
+    return get_http_client().snapshot() if _client is not None else []
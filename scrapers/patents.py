@@ -1,5 +1,5 @@
-import requests
 from scrapers.base_scraper import BaseScraper
+from scrapers.http_client import get_http_client
 from config.settings import settings
 
 class PatentSearchScraper(BaseScraper):
@@ -23,10 +23,9 @@ class PatentSearchScraper(BaseScraper):
                 "num": 10
             }
 
-            response = requests.get(
+            response = get_http_client().get(
                 self.BASE_URL,
-                params=params,
-                timeout=settings.REQUEST_TIMEOUT
+                params=params
             )
 
             if response.status_code != 200:
@@ -0,0 +1,118 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+from itertools import combinations
+from scrapers.canonical import merge_duplicate, product_key
+from scrapers.result_cache import normalize_query
+from config.settings import settings
+
+def reciprocal_rank_fusion(ranked_lists: list, k: int = 60) -> list:
+    """
+    Merge ranked product lists: score = sum over lists of 1 / (k + rank). Products are
+    deduplicated by canonical product key (same ASIN / item id / URL variant, any source);
+    the first-seen dict is kept, with an 'rrf_score' key added.
+    Sorted by descending score (ties keep first-seen order).
+    """
+    fused = {}  # product key -> [score, product]
+    for products in ranked_lists:
+        seen = set()
+        for rank, product in enumerate(products, start=1):
+            key = product_key(product.get('url')) or product.get('name')
+            entry = fused.get(key)
+            if entry is None:
+                entry = fused[key] = [0.0, product]
+            elif entry[1] is not product:
+                merge_duplicate(entry[1], product)
+            if key in seen:
+                continue
+            seen.add(key)
+            entry[0] += 1.0 / (k + rank)
+
+    merged = sorted(fused.values(), key=lambda entry: -entry[0])
+    for score, product in merged:
+        product['rrf_score'] = round(score, 5)
+    return [product for _, product in merged]
+
+class FanOutResult:
+    """What QueryPlanner.search() found and what it left behind"""
+
+    def __init__(self):
+        self.products = []    # Fused + deduplicated, each tagged with 'source'
+        self.queries = []     # (source, query) issued
+        self.found = {}       # source -> raw results (before dedup)
+        self.abandoned = []   # (source, query) still running when the timeout hit
+        self.failed = []      # (source, query, error)
+
+class QueryPlanner:
+    """
+    Instead of one long joined query per source, several focused ones - the broad query,
+    then one per keyword, then keyword pairs - run in parallel, merged with reciprocal rank
+    fusion and collapsed by canonical product key (scrapers/canonical.py), before noise
+    filtering and the LLM. Capped at `per_source` queries per source and `budget` queries
+    per scan, handed out round-robin so every source gets its best queries first. A budget
+    of 0 plans one broad query per source - no more paid searches than a single joined query.
+
+    The searches go through the registry's cache / single-flight wrappers and the Serper
+    batcher, so the extra queries mostly share round trips rather than add them.
+
+    Usage:
+        result = QueryPlanner().search(registry.get_all_scrapers(), concepts["search_keywords"])
+        result.products
+    """
+
+    def __init__(self, budget: int = None, per_source: int = None, rrf_k: int = None):
+        self.budget = budget or settings.QUERY_PLANNER_BUDGET
+        self.per_source = per_source or settings.QUERY_PLANNER_MAX_PER_SOURCE
+        self.rrf_k = rrf_k or settings.QUERY_PLANNER_RRF_K
+
+    def candidate_queries(self, keywords: list) -> list:
+        """Queries in priority order, without duplicates (same normalized query)"""
+        keywords = [k.strip() for k in keywords if k and k.strip()]
+        candidates = [" ".join(keywords[:3])] + keywords + [f"{a} {b}" for a, b in combinations(keywords, 2)]
+
+        queries, seen = [], set()
+        for query in candidates:
+            key = normalize_query(query)
+            if key and key not in seen:
+                seen.add(key)
+                queries.append(query)
+        return queries[:self.per_source]
+
+    def plan(self, keywords: list, sources: list) -> list:
+        """[(source, query)] within the budget: every source's 1st query, then every source's 2nd, ..."""
+        queries = self.candidate_queries(keywords)
+        planned = [(source, query) for query in queries for source in sources]
+        return planned[:self.budget or len(sources)]
+
+    def search(self, scrapers: list, keywords: list, timeout: float = None) -> FanOutResult:
+        """
+        Run the plan against [(source, scraper)] in parallel. Searches still running after
+        `timeout` seconds are abandoned (listed in result.abandoned), like slow scrapers were.
+        """
+        result = FanOutResult()
+        by_name = dict(scrapers)
+        result.queries = self.plan(keywords, [name for name, _ in scrapers])
+        if not result.queries:
+            return result
+
+        ranked = {}  # (source, query) -> results
+        executor = ThreadPoolExecutor(max_workers=len(result.queries))
+        futures = {executor.submit(by_name[source].search, query): (source, query) for source, query in result.queries}
+        try:
+            for future in as_completed(futures, timeout=timeout):
+                source, query = futures[future]
+                try:
+                    products = future.result() or []
+                except Exception as e:
+                    result.failed.append((source, query, str(e)))
+                    continue
+                for product in products:
+                    product['source'] = source
+                ranked[(source, query)] = products
+                result.found.setdefault(source, []).extend(products)
+        except FuturesTimeout:
+            result.abandoned = [futures[future] for future in futures if not future.done()]
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        # Fuse in plan order so ties favour each source's broad query
+        result.products = reciprocal_rank_fusion([ranked[key] for key in result.queries if key in ranked], self.rrf_k)
+        return result
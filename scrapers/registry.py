@@ -4,13 +4,15 @@ from scrapers.serper import SerperScraper
 from scrapers.patents import PatentSearchScraper
 from scrapers.producthunt import ProductHuntScraper
 from scrapers.amazon import AmazonScraper
+from scrapers.result_cache import CachedScraper, get_scraper_cache
+from scrapers.single_flight import CoalescedScraper, get_single_flight
 
 class ScraperRegistry:
     """Factory pattern - no tight coupling"""
 
     @staticmethod
     def get_all_scrapers():
-        return [
+        scrapers = [
             ("aliexpress", AliExpressScraper()),
             ("kickstarter", KickstarterScraper()),
             ("amazon", AmazonScraper()),
@@ -18,3 +20,11 @@ class ScraperRegistry:
             ("google", SerperScraper()),
             ("patents", PatentSearchScraper())
         ]
+        # Cache misses (and background refreshes) go through single-flight
+        flight = get_single_flight()
+        if flight is not None:
+            scrapers = [(name, CoalescedScraper(name, scraper, flight)) for name, scraper in scrapers]
+        cache = get_scraper_cache()
+        if cache is not None:
+            scrapers = [(name, CachedScraper(name, scraper, cache)) for name, scraper in scrapers]
+        return scrapers
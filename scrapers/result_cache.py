@@ -0,0 +1,183 @@
+import copy
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from scrapers.base_scraper import BaseScraper
+from config.settings import settings
+
+FRESH, STALE, MISS = "fresh", "stale", "miss"
+
+def normalize_query(query: str) -> str:
+    """Same search, same key: case, whitespace and keyword order don't matter"""
+    return " ".join(sorted(set(re.findall(r"\S+", (query or "").lower()))))
+
+class ScraperResultCache:
+    """
+    Scraper results keyed by (source, normalized query), so repeat scans of an idea and
+    monitored ideas with overlapping keywords don't pay for the same Serper/SerpAPI search.
+
+    - In-memory LRU (SCRAPER_CACHE_MEMORY_ENTRIES) in front of a standalone SQLite file
+      (SCRAPER_CACHE_PATH), like the LLM response cache
+    - TTL per source (SCRAPER_CACHE_TTLS, seconds) - patents change far less than AliExpress
+    - Stale-while-revalidate: up to SCRAPER_CACHE_STALE_FACTOR x TTL old, the stale results
+      are returned at once and CachedScraper refreshes them in the background
+    """
+
+    def __init__(self, path: str = None, ttls: dict = None, memory_entries: int = None,
+                 max_entries: int = None, stale_factor: float = None):
+        self.path = path or settings.SCRAPER_CACHE_PATH
+        self.ttls = ttls or settings.SCRAPER_CACHE_TTLS
+        self.memory_entries = memory_entries or settings.SCRAPER_CACHE_MEMORY_ENTRIES
+        self.max_entries = max_entries or settings.SCRAPER_CACHE_MAX_ENTRIES
+        self.stale_factor = settings.SCRAPER_CACHE_STALE_FACTOR if stale_factor is None else stale_factor
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> (created_at, results)
+        self._counts = {}  # source -> {"fresh", "stale", "miss"}
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS scraper_cache (
+                cache_key TEXT PRIMARY KEY,
+                source TEXT,
+                query TEXT,
+                results TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_scraper_cache_created_at ON scraper_cache (created_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(source: str, query: str) -> str:
+        return hashlib.sha256(f"{source}|{normalize_query(query)}".encode('utf-8')).hexdigest()
+
+    def ttl_for(self, source: str) -> float:
+        return self.ttls.get(source, self.ttls.get("default", 43200))
+
+    def get(self, source: str, query: str) -> tuple:
+        """(FRESH | STALE | MISS, results or None). Results are copies - safe to mutate"""
+        key = self.make_key(source, query)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                row = self._conn.execute(
+                    "SELECT created_at, results FROM scraper_cache WHERE cache_key = ?", (key,)
+                ).fetchone()
+                if row:
+                    entry = (row[0], json.loads(row[1]))
+                    self._remember(key, entry)
+            else:
+                self._memory.move_to_end(key)
+
+            ttl = self.ttl_for(source)
+            age = now - entry[0] if entry else None
+            if entry is None or age > ttl * self.stale_factor:
+                state = MISS
+            else:
+                state = FRESH if age <= ttl else STALE
+
+            counts = self._counts.setdefault(source, {FRESH: 0, STALE: 0, MISS: 0})
+            counts[state] += 1
+        return state, copy.deepcopy(entry[1]) if state != MISS else None
+
+    def set(self, source: str, query: str, results: list):
+        key = self.make_key(source, query)
+        now = time.time()
+        with self._lock:
+            self._remember(key, (now, copy.deepcopy(results)))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO scraper_cache (cache_key, source, query, results, created_at) VALUES (?, ?, ?, ?, ?)",
+                (key, source, normalize_query(query), json.dumps(results), now)
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM scraper_cache").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM scraper_cache WHERE cache_key IN (SELECT cache_key FROM scraper_cache ORDER BY created_at ASC LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+            self._conn.commit()
+
+    def _remember(self, key: str, entry: tuple):
+        """Put in the memory tier, evicting least recently used (caller holds the lock)"""
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        """fresh / stale / miss counts per source plus entry counts per tier"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM scraper_cache").fetchone()[0]
+            return {
+                "entries": entries,
+                "memory_entries": len(self._memory),
+                "by_source": {source: dict(counts) for source, counts in sorted(self._counts.items())},
+            }
+
+class CachedScraper(BaseScraper):
+    """
+    Wraps a registry scraper with the result cache. Empty results aren't cached: scrapers
+    also return [] on API errors, and a failed search shouldn't stick for a whole TTL.
+    """
+
+    _refreshing = set()  # Cache keys being revalidated in the background (process-wide)
+    _refreshing_lock = threading.Lock()
+
+    def __init__(self, source: str, scraper: BaseScraper, cache: ScraperResultCache):
+        self.source = source
+        self.scraper = scraper
+        self.cache = cache
+
+    def search(self, keywords: str) -> list:
+        state, results = self.cache.get(self.source, keywords)
+        if state == FRESH:
+            return results
+        if state == STALE:
+            self._revalidate(keywords)
+            return results
+        return self._fetch(keywords)
+
+    def _fetch(self, keywords: str) -> list:
+        results = self.scraper.search(keywords)
+        if results:
+            self.cache.set(self.source, keywords, results)
+        return results
+
+    def _revalidate(self, keywords: str):
+        key = self.cache.make_key(self.source, keywords)
+        with self._refreshing_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._fetch(keywords)
+            except Exception as e:
+                print(f"[SCRAPER CACHE] Refreshing {self.source} failed: {e}")
+            finally:
+                with self._refreshing_lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_scraper_cache():
+    """Process-wide cache instance, or None when disabled via SCRAPER_CACHE_ENABLED"""
+    global _cache
+    if not settings.SCRAPER_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ScraperResultCache()
+        return _cache
+
+def scraper_cache_stats() -> dict:
+    return _cache.stats() if _cache is not None else {}
@@ -1,5 +1,5 @@
-import requests
 from scrapers.base_scraper import BaseScraper
+from scrapers.serper_batch import get_serper_batcher
 from config.settings import settings
 
 class SerperScraper(BaseScraper):
@@ -40,16 +40,10 @@ class SerperScraper(BaseScraper):
         if not settings.SERPER_API_KEY:
             return []
 
-        url = "https://google.serper.dev/search"
         payload = {"q": keywords + " buy product"}
-        headers = {
-            "X-API-KEY": settings.SERPER_API_KEY,
-            "Content-Type": "application/json"
-        }
 
         try:
-            response = requests.post(url, json=payload, headers=headers, timeout=settings.REQUEST_TIMEOUT)
-            data = response.json()
+            data = get_serper_batcher().search(payload)
 
             results = []
             for item in data.get("organic", [])[:20]:  # Fetch more to account for filtering
@@ -75,3 +69,22 @@ class SerperScraper(BaseScraper):
         except Exception as e:
             print(f"Serper scrape error: {e}")
             return []
+
+    def search_snippets(self, query: str, limit: int = 10) -> list:
+        """
+        Plain web search - no product-page filter, so reviews/forums (where complaints live) are kept.
+        Returns [{name, url, description}], or None if the search couldn't run (no API key, API
+        error) - unlike [] for "nothing found", that must not be cached.
+        """
+        if not settings.SERPER_API_KEY:
+            return None
+
+        try:
+            data = get_serper_batcher().search({"q": query})
+            return [
+                {"name": item.get("title"), "url": item.get("link"), "description": item.get("snippet")}
+                for item in data.get("organic", [])[:limit]
+            ]
+        except Exception as e:
+            print(f"Serper snippet search error: {e}")
+            return None
@@ -0,0 +1,121 @@
+import threading
+from concurrent.futures import Future
+from config.settings import settings
+from scrapers.http_client import get_http_client
+
+SERPER_SEARCH_URL = "https://google.serper.dev/search"
+
+class SerperError(Exception):
+    """The batched request failed (non-200, bad payload) - raised to every query in it"""
+
+class SerperBatcher:
+    """
+    Collects Serper queries issued within a short window (SERPER_BATCH_WINDOW_MS) and sends
+    them as ONE request using Serper's array payload: [{"q": ...}, {"q": ...}] -> [result, ...].
+    Each caller blocks until its own result set comes back, so scrapers keep their parsers
+    and a scan's five site: searches cost one round trip.
+
+    Works across threads: the parallel scrapers of one scan, or many monitored ideas
+    scraped together (see DailyRunner._scrape_ideas).
+
+    Usage:
+        data = get_serper_batcher().search({"q": "site:amazon.com surf lamp", "num": 15})
+        data["organic"]
+    """
+
+    def __init__(self, window: float = None, max_queries: int = None, client=None):
+        self.window = settings.SERPER_BATCH_WINDOW_MS / 1000 if window is None else window
+        self.max_queries = max_queries or settings.SERPER_BATCH_MAX_QUERIES
+        self.client = client
+        self._lock = threading.Lock()
+        self._pending = []  # (payload, Future)
+        self._timer = None
+        self.requests = 0
+        self.queries = 0
+
+    def search(self, payload: dict) -> dict:
+        """Serper result object for one query; raises SerperError if its batch failed"""
+        if self.window <= 0 or self.max_queries <= 1:
+            return self._send([(payload, None)])[0]
+
+        future = Future()
+        batch = None
+        with self._lock:
+            self._pending.append((payload, future))
+            if len(self._pending) >= self.max_queries:
+                batch = self._take()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.window, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if batch:
+            self._dispatch(batch)
+        return future.result()
+
+    def _take(self) -> list:
+        """Pending queries, emptied (caller holds the lock)"""
+        batch, self._pending = self._pending, []
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _flush(self):
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: list):
+        try:
+            results = self._send(batch)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _send(self, batch: list) -> list:
+        headers = {
+            "X-API-KEY": settings.SERPER_API_KEY,
+            "Content-Type": "application/json"
+        }
+        client = self.client or get_http_client()
+        response = client.post(SERPER_SEARCH_URL, json=[payload for payload, _ in batch], headers=headers)
+        with self._lock:
+            self.requests += 1
+            self.queries += len(batch)
+        if len(batch) > 1:
+            print(f"[SERPER] {len(batch)} queries in 1 request")
+
+        if response.status_code != 200:
+            raise SerperError(f"Serper returned status {response.status_code}")
+        data = response.json()
+        if isinstance(data, dict):
+            data = [data]
+        if not isinstance(data, list) or len(data) != len(batch):
+            raise SerperError(f"Serper returned {len(data) if isinstance(data, list) else 'no'} result sets for {len(batch)} queries")
+        return data
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "queries": self.queries,
+                "queries_per_request": round(self.queries / self.requests, 2) if self.requests else 0.0,
+            }
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+def get_serper_batcher() -> SerperBatcher:
+    """Process-wide batcher shared by every Serper-backed scraper"""
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = SerperBatcher()
+        return _batcher
+
+def serper_batch_snapshot() -> dict:
+    return get_serper_batcher().snapshot() if _batcher is not None else {}
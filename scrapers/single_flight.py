@@ -0,0 +1,76 @@
+import copy
+import threading
+from concurrent.futures import Future
+from scrapers.base_scraper import BaseScraper
+from scrapers.result_cache import normalize_query
+from config.settings import settings
+
+class SingleFlight:
+    """
+    Concurrent calls with the same key share one in-flight call: the first caller runs it,
+    the rest wait for its result (or exception). Each caller gets its own copy of the result.
+
+    Counters per source: "upstream" calls actually made, "coalesced" calls that piggy-backed
+    on one already in flight (= upstream calls saved).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {}  # key -> Future
+        self._counts = {}     # source -> {"upstream", "coalesced"}
+
+    def do(self, source: str, key: str, fn, *args, **kwargs):
+        with self._lock:
+            counts = self._counts.setdefault(source, {"upstream": 0, "coalesced": 0})
+            future = self._in_flight.get((source, key))
+            leader = future is None
+            if leader:
+                future = self._in_flight[(source, key)] = Future()
+                counts["upstream"] += 1
+            else:
+                counts["coalesced"] += 1
+
+        if leader:
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._in_flight.pop((source, key), None)
+        return copy.deepcopy(future.result())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "upstream": sum(c["upstream"] for c in self._counts.values()),
+                "saved": sum(c["coalesced"] for c in self._counts.values()),
+                "by_source": {source: dict(counts) for source, counts in sorted(self._counts.items())},
+            }
+
+class CoalescedScraper(BaseScraper):
+    """Registry scraper whose identical concurrent searches (same source, normalized query) share one request"""
+
+    def __init__(self, source: str, scraper: BaseScraper, flight: SingleFlight):
+        self.source = source
+        self.scraper = scraper
+        self.flight = flight
+
+    def search(self, keywords: str) -> list:
+        return self.flight.do(self.source, normalize_query(keywords), self.scraper.search, keywords)
+
+_flight = None
+_flight_lock = threading.Lock()
+
+def get_single_flight():
+    """Process-wide group, or None when disabled via SCRAPER_SINGLE_FLIGHT_ENABLED"""
+    global _flight
+    if not settings.SCRAPER_SINGLE_FLIGHT_ENABLED:
+        return None
+    with _flight_lock:
+        if _flight is None:
+            _flight = SingleFlight()
+        return _flight
+
+def single_flight_stats() -> dict:
+    return _flight.stats() if _flight is not None else {}
@@ -0,0 +1,15 @@
+"""
+Shared test helpers. Import after the repo root is on sys.path:
+
+    from tests.helpers import memory_session
+"""
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database.connection import Base
+from database import models  # noqa: F401 - registers tables on Base
+
+def memory_session():
+    """Session on a fresh in-memory SQLite database with every table created"""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Test GeminiClient.agenerate across separate event loops (one asyncio.run() per scan stage)
+against a real SDK model and gRPC channel, served by a local fake GenerativeService.
+"""
+import sys
+import os
+import asyncio
+from concurrent import futures
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import grpc
+import google.ai.generativelanguage as glm
+from unittest.mock import AsyncMock, MagicMock, patch
+from llm.client import GeminiClient
+from llm.key_pool import KeyPool, KeyRoute
+
+def _fake_service():
+    def generate_content(request, context):
+        text = request.contents[0].parts[0].text.upper()
+        return glm.GenerateContentResponse(candidates=[glm.Candidate(content=glm.Content(parts=[glm.Part(text=text)]))])
+
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=2))
+    server.add_generic_rpc_handlers((grpc.method_handlers_generic_handler(
+        "google.ai.generativelanguage.v1beta.GenerativeService",
+        {"GenerateContent": grpc.unary_unary_rpc_method_handler(
+            generate_content,
+            request_deserializer=glm.GenerateContentRequest.deserialize,
+            response_serializer=glm.GenerateContentResponse.serialize,
+        )},
+    ),))
+    port = server.add_insecure_port("localhost:0")
+    server.start()
+    return server, f"localhost:{port}"
+
+def test_agenerate_across_event_loops():
+    server, endpoint = _fake_service()
+    insecure_channel = grpc.aio.insecure_channel
+    try:
+        # Real SDK clients, pointed at the local server over plaintext
+        with patch.object(glm.GenerativeServiceClient, "DEFAULT_ENDPOINT", endpoint), \
+             patch("grpc.aio.secure_channel", lambda target, credentials, **kwargs: insecure_channel(target, **kwargs)), \
+             patch("llm.client.get_llm_cache", return_value=None):
+            client = GeminiClient(model_name="loop-test-model")
+            route = KeyRoute("loop-test-model", "test-key")
+            route.limiter = MagicMock(aacquire=AsyncMock(return_value=0.0))
+            client.key_pool = KeyPool([[route]])
+
+            first = asyncio.run(client.agenerate("first scan"))
+            second = asyncio.run(client.agenerate("second scan"))
+    finally:
+        server.stop(0)
+
+    assert (first, second) == ("FIRST SCAN", "SECOND SCAN")
+    print("✓ agenerate works from a second event loop")
+
+if __name__ == "__main__":
+    test_agenerate_across_event_loops()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test URL canonicalization: marketplace product keys, cross-source duplicate collapsing,
+and canonical hashes in scan history / similarity memo (in-memory SQLite, no API calls).
+"""
+import sys
+import os
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.helpers import memory_session
+from database.models import User, Idea, ScanHistory
+from scrapers.canonical import product_key, canonical_url, legacy_url_hash
+from scrapers.query_planner import reciprocal_rank_fusion
+from llm.similarity_memo import SimilarityMemo
+from scheduler.runner import DailyRunner
+
+def test_marketplace_keys():
+    asin = "amazon:B08XYZ1234"
+    assert product_key("https://www.amazon.com/Surf-Lamp-Wave/dp/B08XYZ1234/ref=sr_1_3?keywords=surf+lamp") == asin
+    assert product_key("https://amazon.com/gp/product/b08xyz1234?th=1") == asin
+    assert product_key("https://smile.amazon.co.uk/dp/B08XYZ1234") == asin
+
+    item = "aliexpress:1005004123456789"
+    assert product_key("https://www.aliexpress.com/item/1005004123456789.html?spm=a2g0o.productlist&algo_pvid=x") == item
+    assert product_key("https://he.aliexpress.com/item/1005004123456789.html") == item
+    assert product_key("https://aliexpress.us/item/1005004123456789.html#nav") == item
+
+    assert product_key("https://www.kickstarter.com/projects/SurfCo/wave-lamp/description?ref=discovery") == "kickstarter:surfco/wave-lamp"
+    assert product_key("https://www.producthunt.com/products/wavelamp/reviews") == "producthunt:wavelamp"
+    assert product_key("https://patents.google.com/patent/US10123456B2/en") == "patent:US10123456B2"
+    print("✓ ASIN / item id / project / slug / patent number keys")
+
+def test_generic_urls():
+    assert canonical_url("HTTPS://WWW.Shop.com/lamp/?utm_source=x#top") == "shop.com/lamp"
+    assert product_key("http://m.shop.com/lamp") == product_key("https://shop.com/lamp/")
+    assert product_key("https://shop.com/lamp-1") != product_key("https://shop.com/lamp-2")
+    print("✓ Host, scheme, tracking parameters and trailing slash normalized")
+
+def test_query_parameters_that_pick_the_product_kept():
+    first = "https://shop.example.com/product.php?id=5&utm_source=serper"
+    second = "https://shop.example.com/product.php?id=6"
+    assert product_key(first) != product_key(second)
+    assert product_key(first) == product_key("http://shop.example.com/product.php?gclid=abc&id=5")
+    assert canonical_url("https://shop.com/p?b=2&a=1&fbclid=x&mc_cid=y") == "shop.com/p?a=1&b=2"
+
+    # Two listings differing only by ?id= are both kept by fusion and history
+    products = reciprocal_rank_fusion([[{"name": "Lamp 5", "url": first}, {"name": "Lamp 6", "url": second}]])
+    assert [p["name"] for p in products] == ["Lamp 5", "Lamp 6"]
+    print("✓ Non-tracking query parameters are part of the key")
+
+def test_cross_source_duplicates_collapse():
+    amazon = [{"name": "Wave Lamp", "url": "https://www.amazon.com/dp/B08XYZ1234", "price": None, "source": "amazon"}]
+    google = [
+        {"name": "Wave Lamp - Amazon.com", "url": "https://amazon.com/Wave-Lamp/dp/B08XYZ1234?tag=aff", "price": 39.0, "source": "google"},
+        {"name": "Other", "url": "https://shop.com/other", "source": "google"},
+    ]
+    fused = reciprocal_rank_fusion([amazon, google])
+
+    assert len(fused) == 2
+    assert fused[0]["source"] == "amazon" and fused[0]["price"] == 39.0 and fused[0]["also_on"] == ["google"]
+    print("✓ Same ASIN from Amazon and Google -> one candidate, one LLM call")
+
+def _session():
+    db = memory_session()
+    user = User(email="canonical@example.com", is_active=1)
+    db.add(user)
+    db.commit()
+    idea = Idea(user_id=user.id, user_description="A surf lamp", extracted_concepts=json.dumps({"search_keywords": ["surf lamp"]}))
+    db.add(idea)
+    db.commit()
+    return db, idea
+
+def test_history_matches_url_variants():
+    db, idea = _session()
+    runner = DailyRunner()
+    runner._record_scan_result(idea.id, "https://www.aliexpress.com/item/1005004123456789.html?spm=abc", False, db)
+    # Written before canonical keys: raw URL hash
+    db.add(ScanHistory(idea_id=idea.id, url_hash=legacy_url_hash("https://shop.com/old?ref=1"), is_relevant=False))
+    db.commit()
+
+    assert runner._is_already_seen(idea.id, "https://m.aliexpress.com/item/1005004123456789.html?spm=other", db)
+    assert runner._is_already_seen(idea.id, "https://shop.com/old?ref=1", db)
+    assert not runner._is_already_seen(idea.id, "https://www.aliexpress.com/item/1005009999999999.html", db)
+    print("✓ Monitoring treats URL variants (and pre-canonical history) as already seen")
+
+def test_memo_shared_by_url_variants():
+    db, idea = _session()
+    memo = SimilarityMemo(db, idea.user_description)
+    product = {"name": "Wave Lamp", "url": "https://www.amazon.com/dp/B08XYZ1234?ref=a", "description": "d", "price": 30.0}
+    memo.store(product, {"score": 80, "reasoning": "r"})
+    db.commit()
+
+    variant = dict(product, url="https://amazon.com/Wave-Lamp/dp/B08XYZ1234/ref=b")
+    results, missing = memo.lookup([variant])
+    assert missing == [] and results[0]["score"] == 80
+    print("✓ Memoized score reused for a tracking-parameter variant")
+
+if __name__ == "__main__":
+    test_marketplace_keys()
+    test_generic_urls()
+    test_query_parameters_that_pick_the_product_kept()
+    test_cross_source_duplicates_collapse()
+    test_history_matches_url_variants()
+    test_memo_shared_by_url_variants()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test the concept-extraction cache (exact + near-duplicate) against an in-memory SQLite DB.
+"""
+import sys
+import os
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.helpers import memory_session
+from unittest.mock import patch
+from database.models import ConceptCache as ConceptCacheEntry
+from config.settings import settings
+from llm.concept_cache import ConceptCache
+from llm.image_prep import PreparedImage
+
+IDEA = "A smart bedside lamp that changes color based on live ocean surf conditions at your favorite beach, so surfers know when to paddle out."
+CONCEPTS = {"core_function": "Surf conditions lamp", "search_keywords": ["surf lamp"], "negative_keywords": ["wax"]}
+
+def _cache():
+    db = memory_session()
+    return ConceptCache(db), db
+
+def test_exact_hit_ignores_case_and_punctuation():
+    cache, db = _cache()
+    cache.store(IDEA, CONCEPTS)
+    db.commit()
+
+    concepts, hit_type = cache.lookup("  " + IDEA.upper().replace(",", " ,") + "!!")
+    assert concepts == CONCEPTS and hit_type == "exact"
+    print("✓ Normalized resubmission is an exact hit")
+
+def test_near_duplicate_hit():
+    cache, db = _cache()
+    cache.store(IDEA, CONCEPTS)
+    db.commit()
+
+    near = IDEA.replace("so surfers know when to paddle out.", "so surfers know when to paddle out today.")
+    concepts, hit_type = cache.lookup(near)
+    assert concepts == CONCEPTS and hit_type == "near"
+
+    unrelated = "A collapsible silicone water bottle for hikers with a built-in carabiner clip."
+    assert cache.lookup(unrelated) == (None, None)
+    print("✓ Near-duplicate reused, unrelated idea missed")
+
+def test_image_is_part_of_the_key():
+    cache, db = _cache()
+    image = PreparedImage(data=b"jpeg-bytes", mime_type="image/jpeg", source_hash="upload-hash")
+    cache.store(IDEA, CONCEPTS, image=image)
+    db.commit()
+
+    assert cache.lookup(IDEA)[0] is None
+    assert cache.lookup(IDEA, image=image)[1] == "exact"
+    print("✓ Same text with/without image cached separately")
+
+def test_expired_entries_miss_and_are_replaced():
+    cache, db = _cache()
+    cache.store(IDEA, CONCEPTS)
+    db.commit()
+    db.query(ConceptCacheEntry).update({ConceptCacheEntry.created_at: datetime.utcnow() - timedelta(days=settings.CONCEPT_CACHE_TTL_DAYS + 1)})
+    db.commit()
+
+    assert cache.lookup(IDEA) == (None, None)  # Neither exact nor near-duplicate
+    fresh = {**CONCEPTS, "core_function": "Surf lamp v2"}
+    cache.store(IDEA, fresh)
+    db.commit()
+    assert db.query(ConceptCacheEntry).count() == 1
+    assert cache.lookup(IDEA) == (fresh, "exact")
+    print("✓ Expired entries ignored and replaced")
+
+def test_size_cap_evicts_least_recently_used():
+    cache, db = _cache()
+    ideas = [f"Idea number {i}: a gadget for {word} lovers" for i, word in enumerate(["surf", "coffee", "garden"])]
+    with patch.object(settings, "CONCEPT_CACHE_MAX_ENTRIES", 2):
+        cache.store(ideas[0], CONCEPTS)
+        cache.store(ideas[1], CONCEPTS)
+        db.commit()
+        db.query(ConceptCacheEntry).update({ConceptCacheEntry.last_accessed: datetime.utcnow() - timedelta(hours=1)})
+        cache.lookup(ideas[0])  # Touch the first - the second becomes least recently used
+        db.commit()
+        cache.store(ideas[2], CONCEPTS)
+        db.commit()
+
+    assert db.query(ConceptCacheEntry).count() == 2
+    assert cache.lookup(ideas[0])[1] == "exact"
+    assert cache.lookup(ideas[1]) == (None, None)
+    print("✓ LRU entry evicted beyond the size cap")
+
+if __name__ == "__main__":
+    test_exact_hit_ignores_case_and_punctuation()
+    test_near_duplicate_hit()
+    test_image_is_part_of_the_key()
+    test_expired_entries_miss_and_are_replaced()
+    test_size_cap_evicts_least_recently_used()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test early termination of similarity matching over rank-ordered candidates (no API calls).
+"""
+import sys
+import os
+import re
+import json
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import patch
+from llm.early_stop import EarlyStopPolicy
+from google.api_core.exceptions import ResourceExhausted
+from llm.matcher import ConceptMatcher, PartialScoringError
+from config.settings import settings
+
+# Rank-ordered, as LexicalRanker returns them
+PRODUCTS = [
+    {"name": f"Product {i}", "description": "Lamp", "price": 20.0, "rank_score": round(10.0 - i * 0.3, 2)}
+    for i in range(32)
+]
+
+def _fake_agenerate(score_for):
+    calls = []
+
+    async def fake_agenerate(prompt, **kwargs):
+        names = re.findall(r"Name: Product (\d+)", prompt)
+        calls.append(names)
+        return json.dumps([{"index": i, "score": score_for(int(n)), "reasoning": "r"} for i, n in enumerate(names)])
+
+    return fake_agenerate, calls
+
+def _run(score_for, policy, known_scores=None, products=PRODUCTS):
+    fake_agenerate, calls = _fake_agenerate(score_for)
+    matcher = ConceptMatcher()
+    with patch('llm.client.GeminiClient.agenerate', side_effect=fake_agenerate), \
+         patch.object(settings, 'SIMILARITY_BATCH_SIZE', 4), \
+         patch.object(settings, 'SIMILARITY_MAX_WORKERS', 2), \
+         patch.object(settings, 'SIMILARITY_CASCADE_ENABLED', False):
+        results, scored = asyncio.run(matcher.acalculate_similarity_ranked("A surf lamp", products, policy, known_scores))
+    return matcher, results, scored, calls
+
+def test_policy_rules():
+    policy = EarlyStopPolicy(min_matches=2, match_score=90, min_expected_gain=0.5, threshold=60)
+    assert policy.check([95, 91], [], [5.0]) is not None
+    assert policy.check([95, 40], [(8.0, 95), (7.0, 40)], [6.0, 6.0]) is None
+    assert policy.check([95, 91], [], []) is None  # Nothing left to skip
+
+    # Last wave found nothing; remaining candidates rank far lower -> little left to gain
+    cold_wave = [(4.0, 10)] * 8
+    assert policy.expected_gain(cold_wave, [1.0, 1.0]) < policy.expected_gain(cold_wave, [4.0, 4.0])
+    assert "expected" in policy.check([10] * 8, cold_wave, [0.5] * 4)
+    assert EarlyStopPolicy(min_matches=0, min_expected_gain=0).check([99] * 10, cold_wave, [1.0]) is None
+    print("✓ Stop rules: K strong matches, expected gain")
+
+def test_saturated_idea_stops_after_first_wave():
+    matcher, results, scored, calls = _run(lambda n: 95, EarlyStopPolicy(min_matches=4, match_score=90, min_expected_gain=0))
+
+    assert scored == 4 and len(calls) == 1  # One wave: a single batch of 4
+    assert all(r is not None for r in results[:4])
+    assert results[4:] == [None] * 28
+    assert matcher.stats == {"early_stop_skipped": 28}
+    print(f"✓ Saturated idea: scored {scored}/{len(PRODUCTS)} products in {len(calls)} calls")
+
+def test_memoized_scores_count_towards_stop():
+    matcher, results, scored, calls = _run(lambda n: 95 if n < 2 else 30, EarlyStopPolicy(min_matches=4, match_score=90, min_expected_gain=0), known_scores=[93, 97])
+    assert scored == 4 and len(calls) == 1
+    print("✓ Memoized matches count towards K")
+
+def test_stops_within_scanner_cut_at_default_settings():
+    # The scanner hands over at most 15 products - the policy must get a say before they run out
+    fake_agenerate, calls = _fake_agenerate(lambda n: 97)
+    matcher = ConceptMatcher()
+    with patch('llm.client.GeminiClient.agenerate', side_effect=fake_agenerate):
+        results, scored = asyncio.run(matcher.acalculate_similarity_ranked("A surf lamp", PRODUCTS[:15], EarlyStopPolicy()))
+
+    assert scored == settings.SIMILARITY_BATCH_SIZE < 15 and len(calls) == 1
+    assert matcher.stats == {"early_stop_skipped": 15 - scored}
+    print(f"✓ Default settings: scored {scored}/15 products in {len(calls)} call")
+
+def test_error_in_later_wave_keeps_earlier_waves():
+    def score_for(n):
+        if n >= 4:
+            raise ResourceExhausted("429 Resource exhausted")
+        return 30
+
+    fake_agenerate, calls = _fake_agenerate(score_for)
+    with patch('llm.client.GeminiClient.agenerate', side_effect=fake_agenerate), \
+         patch.object(settings, 'SIMILARITY_BATCH_SIZE', 4), \
+         patch.object(settings, 'SIMILARITY_CASCADE_ENABLED', False):
+        try:
+            asyncio.run(ConceptMatcher().acalculate_similarity_ranked("A surf lamp", PRODUCTS, EarlyStopPolicy(min_matches=4, match_score=90, min_expected_gain=0)))
+        except PartialScoringError as e:
+            results, scored = e.results, e.scored
+        else:
+            raise AssertionError("Expected PartialScoringError")
+
+    assert scored == 8 and len(results) == len(PRODUCTS)
+    assert all(r is not None for r in results[:4]) and results[4:] == [None] * 28
+    print("✓ Wave 1 scores survive a 429 in wave 2")
+
+def test_no_policy_scores_everything():
+    matcher, results, scored, calls = _run(lambda n: 95, None)
+    assert scored == 32 and all(r is not None for r in results)
+    assert "early_stop_skipped" not in matcher.stats
+    print("✓ Without a policy every product is scored")
+
+if __name__ == "__main__":
+    test_policy_rules()
+    test_saturated_idea_stops_after_first_wave()
+    test_memoized_scores_count_towards_stop()
+    test_stops_within_scanner_cut_at_default_settings()
+    test_error_in_later_wave_keeps_earlier_waves()
+    test_no_policy_scores_everything()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test Gap Hunter: cached complaint searches and verdict/gap analysis running concurrently
+(in-memory SQLite, no API calls).
+"""
+import sys
+import os
+import asyncio
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import MagicMock
+from tests.helpers import memory_session
+from database.models import ComplaintCache
+from scrapers.complaints import ComplaintFinder
+from api.services.scanner import _verdict_and_gaps
+
+COMPETITORS = [
+    SimpleNamespace(product_name=f"Lamp {i}", url=f"https://www.example.com/lamp-{i}?ref=ad", similarity_score=90 - i)
+    for i in range(3)
+]
+
+def _slow_serper(delay=0.0):
+    serper = MagicMock()
+
+    def search_snippets(query):
+        time.sleep(delay)
+        return [{"name": "Review", "description": f"{query.split(' review')[0]} broke after a week"}]
+
+    serper.search_snippets.side_effect = search_snippets
+    return serper
+
+def test_product_key_ignores_tracking_noise():
+    key = ComplaintFinder.product_key("https://www.Example.com/lamp-1/?ref=ad#reviews")
+    assert key == ComplaintFinder.product_key("http://example.com/lamp-1")
+    assert key != ComplaintFinder.product_key("https://example.com/lamp-2")
+    print("✓ Same listing gets the same cache key")
+
+def test_cache_reused_across_ideas():
+    db = memory_session()
+    serper = _slow_serper()
+    finder = ComplaintFinder(db, serper=serper)
+
+    cached, missing = finder.lookup(COMPETITORS)
+    assert cached == {} and len(missing) == 3
+    finder.store(missing, finder.search_all(missing))
+    db.commit()
+
+    # Another idea, same top competitors: no searches needed
+    cached, missing = ComplaintFinder(db, serper=serper).lookup(COMPETITORS)
+    assert missing == []
+    assert cached["Lamp 0"] == ["Lamp 0 broke after a week"]
+    assert serper.search_snippets.call_count == 3
+
+    # Expired entries are searched again
+    db.query(ComplaintCache).update({ComplaintCache.created_at: datetime.utcnow() - timedelta(days=30)})
+    db.commit()
+    assert len(finder.lookup(COMPETITORS)[1]) == 3
+    print("✓ Complaint snippets cached per product with TTL")
+
+def test_failed_searches_not_cached():
+    db = memory_session()
+    serper = MagicMock()
+    serper.search_snippets.side_effect = lambda query: None if "Lamp 0" in query else []
+    finder = ComplaintFinder(db, serper=serper)
+
+    searched = finder.search_all(COMPETITORS)
+    assert searched == [None, [], []]
+    finder.store(COMPETITORS, searched)
+    db.commit()
+
+    # Empty results stick for the TTL; the failed search is retried next time
+    cached, missing = finder.lookup(COMPETITORS)
+    assert [c.product_name for c in missing] == ["Lamp 0"]
+    assert cached == {"Lamp 1": [], "Lamp 2": []}
+    print("✓ Failed complaint searches aren't cached")
+
+def test_verdict_and_gaps_overlap():
+    db = memory_session()
+    finder = ComplaintFinder(db, serper=_slow_serper(delay=0.2))
+    matcher = MagicMock()
+
+    async def slow_verdict(*args):
+        await asyncio.sleep(0.2)
+        return "Verdict: PROCEED CAUTIOUSLY"
+
+    async def gaps(user_idea, complaints):
+        return f"gaps across {len(complaints)}"
+
+    matcher.agenerate_verdict.side_effect = slow_verdict
+    matcher.aanalyze_gaps_across.side_effect = gaps
+    idea = SimpleNamespace(user_description="A surf lamp")
+
+    start = time.monotonic()
+    verdict, gap_analysis, searched = asyncio.run(_verdict_and_gaps(
+        matcher, finder, idea, {}, COMPETITORS, COMPETITORS, {}, COMPETITORS
+    ))
+    elapsed = time.monotonic() - start
+
+    assert verdict == "Verdict: PROCEED CAUTIOUSLY"
+    assert gap_analysis == "gaps across 3"  # One combined call for all three competitors
+    assert len(searched) == 3
+    assert elapsed < 0.35, elapsed  # Verdict (0.2s) and 3 searches (0.2s each) all overlapped
+    print(f"✓ Verdict + 3 complaint searches finished in {elapsed:.2f}s")
+
+if __name__ == "__main__":
+    test_product_key_ignores_tracking_noise()
+    test_cache_reused_across_ideas()
+    test_failed_searches_not_cached()
+    test_verdict_and_gaps_overlap()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Test the shared scraper HTTP client against a local HTTP server: keep-alive reuse,
+retry on 5xx, timing hooks (no API calls).
+"""
+import sys
+import os
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import patch
+from scrapers.http_client import HTTPClient
+from scrapers.serper import SerperScraper
+from scrapers.serper_batch import SerperBatcher
+from config.settings import settings
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive
+    failures_left = 0
+    client_ports = set()
+    requests_seen = 0
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        cls = type(self)
+        cls.client_ports.add(self.client_address[1])
+        cls.requests_seen += 1
+        if cls.failures_left:
+            cls.failures_left -= 1
+            self._reply(503, {})
+            return
+        queries = json.loads(body)
+        results = [
+            {"organic": [{"title": f"{q['q']} product", "link": f"https://shop.example.com/products/{cls.requests_seen}", "snippet": "s"}]}
+            for q in (queries if isinstance(queries, list) else [queries])
+        ]
+        self._reply(200, results if isinstance(queries, list) else results[0])
+
+    def _reply(self, status, data):
+        payload = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+def _server():
+    _Handler.failures_left = 0
+    _Handler.client_ports = set()
+    _Handler.requests_seen = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/search"
+
+def test_connection_reused():
+    server, url = _server()
+    client = HTTPClient(retries=0)
+    try:
+        for i in range(5):
+            assert client.post(url, json={"q": f"lamp {i}"}).status_code == 200
+    finally:
+        client.close()
+        server.shutdown()
+
+    assert _Handler.requests_seen == 5
+    assert len(_Handler.client_ports) == 1, _Handler.client_ports
+    print("✓ 5 requests over 1 keep-alive connection")
+
+def test_retry_on_5xx_and_timing_hook():
+    server, url = _server()
+    _Handler.failures_left = 2
+    client = HTTPClient(retries=2, backoff=0)
+    timings = []
+    client.add_hook(timings.append)
+    try:
+        response = client.post(url, json={"q": "lamp"})
+    finally:
+        client.close()
+        server.shutdown()
+
+    assert response.status_code == 200
+    assert _Handler.requests_seen == 3
+    assert len(timings) == 1 and timings[0].retries == 2 and timings[0].status == 200
+    assert timings[0].host.startswith("127.0.0.1") and timings[0].elapsed > 0
+    assert client.snapshot()[0]["retries"] == 2
+    print("✓ Two 503s retried; hook saw one request with 2 retries")
+
+def test_gives_up_with_last_5xx():
+    server, url = _server()
+    _Handler.failures_left = 5
+    client = HTTPClient(retries=1, backoff=0)
+    try:
+        response = client.post(url, json={"q": "lamp"})
+    finally:
+        client.close()
+        server.shutdown()
+
+    assert response.status_code == 503  # Callers' status_code checks still apply
+    assert client.snapshot()[0]["errors"] == 1
+    print("✓ Out of retries: 503 returned to the scraper")
+
+def test_scraper_uses_shared_client():
+    server, url = _server()
+    client = HTTPClient(retries=0)
+    scraper = SerperScraper()
+    try:
+        with patch('scrapers.serper.get_serper_batcher', return_value=SerperBatcher(window=0, client=client)), \
+             patch.object(settings, 'SERPER_API_KEY', 'test-key'):
+            # Point the scraper's hard-coded endpoint at the local server
+            original = client.request
+            client.request = lambda method, _url, **kw: original(method, url, **kw)
+            first = scraper.search("surf lamp")
+            second = scraper.search_snippets("surf lamp complaints")
+    finally:
+        client.close()
+        server.shutdown()
+
+    assert first[0]["name"] == "surf lamp buy product product"
+    assert second[0]["name"] == "surf lamp complaints product"
+    assert len(_Handler.client_ports) == 1
+    print("✓ Serper scraper searches share one connection")
+
+if __name__ == "__main__":
+    test_connection_reused()
+    test_retry_on_5xx_and_timing_hook()
+    test_gives_up_with_last_5xx()
+    test_scraper_uses_shared_client()
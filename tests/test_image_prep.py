@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test image preprocessing before Gemini calls: MIME detection, downscale, metadata strip, cache.
+"""
+import sys
+import os
+import base64
+import io
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+from fastapi import BackgroundTasks, HTTPException
+from tests.helpers import memory_session
+from config.settings import settings
+from database.models import User, Idea
+from llm.image_prep import PreparedImage, detect_mime_type, prepare_image
+from api.routers.ideas import IdeaSubmission, submit_idea
+
+def _png_bytes(size=(3000, 2000), color=(200, 30, 30, 255)) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGBA", size, color).save(out, format="PNG")
+    return out.getvalue()
+
+def _jpeg_with_exif(size=(400, 300)) -> bytes:
+    exif = Image.Exif()
+    exif[0x010F] = "PhoneMaker"   # Make
+    exif[0x0112] = 6              # Orientation: rotate 90 CW
+    out = io.BytesIO()
+    Image.new("RGB", size, (10, 120, 200)).save(out, format="JPEG", exif=exif.tobytes())
+    return out.getvalue()
+
+def test_detect_mime_type():
+    assert detect_mime_type(_png_bytes((4, 4))) == "image/png"
+    assert detect_mime_type(_jpeg_with_exif()) == "image/jpeg"
+    assert detect_mime_type(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == "image/webp"
+    assert detect_mime_type(b"GIF89a....") == "image/gif"
+    assert detect_mime_type(b"not an image") is None
+    print("✓ MIME type detected from magic bytes")
+
+def test_downscale_and_reencode():
+    raw = _png_bytes()
+    prepared = prepare_image("data:image/png;base64," + base64.b64encode(raw).decode())
+
+    assert prepared.mime_type == "image/jpeg"
+    with Image.open(io.BytesIO(prepared.data)) as img:
+        assert max(img.size) == settings.IMAGE_MAX_EDGE
+        assert img.mode == "RGB"
+    assert prepared.original_size == len(raw)
+    assert prepared.bytes_saved > 0
+    print(f"✓ 3000x2000 PNG -> JPEG, saved {prepared.bytes_saved / 1024:.0f}KB")
+
+def test_exif_applied_then_stripped():
+    prepared = prepare_image(_jpeg_with_exif())
+
+    with Image.open(io.BytesIO(prepared.data)) as img:
+        assert img.size == (300, 400)  # Orientation applied before metadata was dropped
+        assert not img.getexif()
+    print("✓ EXIF orientation applied and metadata stripped")
+
+def test_same_upload_prepared_once():
+    raw = _png_bytes((800, 600), (0, 0, 255, 255))
+    first = prepare_image(base64.b64encode(raw).decode())
+    again = prepare_image(raw)
+
+    assert again is first
+    print("✓ Repeat upload served from cache")
+
+def test_rejects_garbage():
+    for bad in ("%%%not-base64%%%", base64.b64encode(b"plain text").decode()):
+        try:
+            prepare_image(bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"Expected ValueError for {bad!r}")
+    print("✓ Invalid images raise ValueError")
+
+def _session():
+    db = memory_session()
+    db.add(User(email="upload@example.com", is_active=1))
+    db.commit()
+    return db
+
+def test_submit_passes_prepared_image_to_scan():
+    db = _session()
+    tasks = BackgroundTasks()
+    upload = base64.b64encode(_png_bytes((1600, 1200))).decode()
+    submit_idea(IdeaSubmission(email="upload@example.com", description="Lamp", image_base64=upload), tasks, db)
+
+    (task,) = tasks.tasks
+    image = task.args[1]
+    assert isinstance(image, PreparedImage)
+    assert upload not in task.args and upload not in task.kwargs.values()
+
+    try:
+        submit_idea(IdeaSubmission(email="upload@example.com", description="Lamp", image_base64="%%%bad%%%"), BackgroundTasks(), db)
+    except HTTPException as e:
+        assert e.status_code == 422
+    else:
+        raise AssertionError("Expected 422 for an unusable image")
+    assert db.query(Idea).count() == 1  # Rejected before the idea was saved
+    print("✓ Upload decoded in the request; only the prepared image reaches the scan")
+
+if __name__ == "__main__":
+    test_detect_mime_type()
+    test_downscale_and_reencode()
+    test_exif_applied_then_stripped()
+    test_same_upload_prepared_once()
+    test_rejects_garbage()
+    test_submit_passes_prepared_image_to_scan()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Test API key pool routing and failover (no API calls).
+"""
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import patch, MagicMock
+from google.api_core.exceptions import ResourceExhausted
+from llm.client import GeminiClient
+from config.settings import settings
+from llm.key_pool import KeyPool, KeyRoute, _bind_transport, get_key_pool, next_quota_reset
+
+DAILY_429 = "Quota exceeded for metric: GenerateRequestsPerDayPerProjectPerModel-FreeTier"
+MINUTE_429 = "Quota exceeded for metric: GenerateRequestsPerMinutePerProjectPerModel-FreeTier. Please retry in 3s"
+
+def _route(model_name, api_key, utilization=0.0, responses=None):
+    route = KeyRoute(model_name, api_key, model=MagicMock())
+    route.limiter = MagicMock()
+    route.limiter.acquire.return_value = 0.0
+    route.limiter.utilization.return_value = utilization
+    if responses is not None:
+        route.model.generate_content.side_effect = responses
+    return route
+
+def _ok(text):
+    response = MagicMock(spec=["text"])
+    response.text = text
+    return response
+
+def _client(pool):
+    client = GeminiClient(model_name="pool-primary")
+    client.key_pool = pool
+    return client
+
+def test_least_loaded_key_wins():
+    busy = _route("pool-primary", "key-a", utilization=0.9)
+    idle = _route("pool-primary", "key-b", utilization=0.1)
+    pool = KeyPool([[busy, idle]])
+
+    route = pool.acquire()
+    assert route is idle
+    assert idle.in_flight == 1
+    pool.release(route)
+    assert idle.in_flight == 0
+    print("✓ Call routed to the least-loaded key")
+
+def test_daily_quota_fails_over_to_next_key():
+    exhausted = _route("pool-primary", "key-a", responses=ResourceExhausted(DAILY_429))
+    healthy = _route("pool-primary", "key-b", utilization=0.5, responses=[_ok("from key b")])
+    pool = KeyPool([[exhausted, healthy]])
+
+    with patch('llm.client.get_llm_cache', return_value=None), patch('llm.client.time.sleep') as mock_sleep:
+        assert _client(pool).generate("prompt") == "from key b"
+
+    assert not exhausted.is_healthy(time.time())
+    assert exhausted.exhausted_until == next_quota_reset()
+    mock_sleep.assert_not_called()
+
+    # Exhausted key stays out of rotation even though it now looks idle
+    assert pool.acquire() is healthy
+    print("✓ Out-of-quota key skipped until reset, call moved without backoff")
+
+def test_fallback_model_after_all_keys_exhausted():
+    primary = _route("pool-primary", "key-a", responses=ResourceExhausted(DAILY_429))
+    fallback = _route("pool-lite", "key-a", responses=[_ok("from lite")])
+    pool = KeyPool([[primary], [fallback]])
+
+    with patch('llm.client.get_llm_cache', return_value=None):
+        assert _client(pool).generate("prompt") == "from lite"
+
+    primary.exhausted_until = 0.0  # Quota reset - primary model preferred again
+    assert pool.acquire() is primary
+    print("✓ Fallback model used only while the primary is out of quota")
+
+def test_per_minute_429_backs_off_on_same_key():
+    route = _route("pool-primary", "key-a", responses=[ResourceExhausted(MINUTE_429), _ok("ok")])
+    pool = KeyPool([[route]])
+
+    with patch('llm.client.get_llm_cache', return_value=None), patch('llm.client.time.sleep') as mock_sleep:
+        assert _client(pool).generate("prompt") == "ok"
+
+    mock_sleep.assert_called_once_with(3.0)
+    assert route.is_healthy(time.time())
+    print("✓ Per-minute 429 retried after backoff, key stays in rotation")
+
+def test_all_exhausted_raises():
+    route = _route("pool-primary", "key-a")
+    pool = KeyPool([[route]])
+    pool.mark_exhausted(route)
+
+    try:
+        pool.acquire()
+    except ResourceExhausted as e:
+        assert GeminiClient._classify_429(e) == "quota"
+    else:
+        raise AssertionError("Expected ResourceExhausted")
+    print("✓ No healthy key raises a quota error")
+
+def test_every_model_has_fallback_tier():
+    with patch.object(settings, "GEMINI_FALLBACK_MODELS", {"fb-primary": ["fb-lite"], "fb-lite": ["fb-primary"]}), \
+         patch.object(KeyRoute, "_build_model", return_value=MagicMock()):
+        for model_name, fallback in (("fb-primary", "fb-lite"), ("fb-lite", "fb-primary")):
+            tiers = get_key_pool(model_name).tiers
+            assert [tier[0].model_name for tier in tiers] == [model_name, fallback]
+    print("✓ Fallback tiers configured per model, lite model included")
+
+def test_transport_slots_checked():
+    class NoSlots:
+        pass
+
+    try:
+        _bind_transport(NoSlots(), client=MagicMock())
+    except RuntimeError as e:
+        assert "_client" in str(e)
+    else:
+        raise AssertionError("Expected RuntimeError for an SDK without client slots")
+    print("✓ Missing SDK client slots fail loudly")
+
+if __name__ == "__main__":
+    test_least_loaded_key_wins()
+    test_daily_quota_fails_over_to_next_key()
+    test_fallback_model_after_all_keys_exhausted()
+    test_per_minute_429_backs_off_on_same_key()
+    test_all_exhausted_raises()
+    test_every_model_has_fallback_tier()
+    test_transport_slots_checked()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test the content-addressed LLM response cache (no API calls).
+Covers: TTL expiry, LRU eviction, hit/miss counters, and that a hit skips the rate limiter.
+"""
+import sys
+import os
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import patch, MagicMock
+from llm.cache import LLMResponseCache
+from llm.client import GeminiClient
+from llm.key_pool import KeyPool, KeyRoute
+
+def _temp_cache(**kwargs):
+    path = os.path.join(tempfile.mkdtemp(), "llm_cache_test.db")
+    return LLMResponseCache(path=path, **kwargs)
+
+def test_key_is_content_addressed():
+    key = LLMResponseCache.make_key("model-a", "prompt")
+    assert key == LLMResponseCache.make_key("model-a", "prompt")
+    assert key != LLMResponseCache.make_key("model-b", "prompt")
+    assert key != LLMResponseCache.make_key("model-a", "prompt", b"image")
+    print("✓ Key depends on model, prompt and image")
+
+def test_ttl_and_counters():
+    cache = _temp_cache(ttls={"verdict": 0.2, "default": 60})
+    cache.set("k1", "cached verdict", "verdict")
+
+    assert cache.get("k1", "verdict") == "cached verdict"
+    time.sleep(0.3)
+    assert cache.get("k1", "verdict") is None
+
+    stats = cache.stats()
+    assert stats["by_call_type"]["verdict"] == {"hits": 1, "misses": 1}
+    assert stats["entries"] == 0
+    print("✓ Per-call-type TTL expiry and counters")
+
+def test_lru_eviction():
+    cache = _temp_cache(max_entries=2)
+    cache.set("a", "1")
+    time.sleep(0.01)
+    cache.set("b", "2")
+    time.sleep(0.01)
+    cache.get("a")  # 'a' is now most recently used
+    time.sleep(0.01)
+    cache.set("c", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+    print("✓ Least recently used entry evicted")
+
+def test_hit_skips_rate_limit():
+    cache = _temp_cache()
+    with patch('llm.client.get_llm_cache', return_value=cache):
+        client = GeminiClient(model_name="test-model")
+        model = MagicMock()
+        model.generate_content.return_value = MagicMock(text='{"ok": true}')
+        client.key_pool = KeyPool([[KeyRoute("test-model", "key", model=model)]])
+
+        with patch.object(GeminiClient, '_enforce_rate_limit', return_value=0.0) as mock_limit:
+            first = client.generate("same prompt", call_type="similarity")
+            second = client.generate("same prompt", call_type="similarity")
+
+    assert first == second == '{"ok": true}'
+    assert model.generate_content.call_count == 1
+    assert mock_limit.call_count == 1
+    print("✓ Cache hit returned without API call or rate-limit wait")
+
+if __name__ == "__main__":
+    test_key_is_content_addressed()
+    test_ttl_and_counters()
+    test_lru_eviction()
+    test_hit_skips_rate_limit()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test LLM call instrumentation (no API calls): per-call records, 429 classification,
+process-wide histograms and the per-scan summary.
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import patch, MagicMock
+from google.api_core.exceptions import ResourceExhausted
+from llm.client import GeminiClient
+from llm.key_pool import KeyPool, KeyRoute
+from llm.metrics import LLMCallRecord, LLMMetrics, ScanMetrics, get_llm_metrics
+
+def _client(side_effect):
+    client = GeminiClient(model_name="metrics-test-model")
+    route = KeyRoute("metrics-test-model", "key", model=MagicMock())
+    route.model.generate_content.side_effect = side_effect
+    route.limiter = MagicMock()
+    route.limiter.acquire.return_value = 0.5
+    route.limiter.utilization.return_value = 0.0
+    client.key_pool = KeyPool([[route]])
+    client.scan_metrics = ScanMetrics()
+    return client
+
+def test_call_record_with_rate_retry():
+    response = MagicMock(spec=["text"])
+    response.text = '{"score": 80}'
+    client = _client([ResourceExhausted("Resource exhausted, retry in 2s"), response])
+    get_llm_metrics().reset()
+
+    with patch('llm.client.get_llm_cache', return_value=None), patch('llm.client.time.sleep'):
+        assert client.generate("x" * 400, call_type="similarity") == '{"score": 80}'
+
+    [record] = client.scan_metrics.records
+    assert record.retries == 1
+    assert record.rate_limited == ["rate"]
+    assert record.retry_wait == 2.0
+    assert record.queue_wait == 1.0  # Limiter waited 0.5s before each attempt
+    assert record.prompt_tokens == 100
+    assert record.error is None
+
+    snapshot = get_llm_metrics().snapshot()["metrics-test-model/similarity"]
+    assert snapshot["llm_calls_total"] == 1
+    assert snapshot["llm_429_rate_total"] == 1
+    assert snapshot["llm_queue_wait_seconds"]["sum"] == 1.0
+    print("✓ Retry, 429 reason, queue wait and tokens recorded")
+
+def test_quota_error_recorded_on_failure():
+    client = _client(ResourceExhausted("Quota exceeded for daily requests"))
+
+    with patch('llm.client.get_llm_cache', return_value=None), patch('llm.client.time.sleep'):
+        try:
+            client.generate("prompt", call_type="verdict")
+        except ResourceExhausted:
+            pass
+        else:
+            raise AssertionError("Expected ResourceExhausted")
+
+    [record] = client.scan_metrics.records
+    assert record.rate_limited == ["quota"]  # Only key is out of quota - no point retrying
+    assert record.retry_wait == 0.0
+    assert record.error == "ResourceExhausted"
+    print("✓ Quota 429s and final failure recorded")
+
+def test_prometheus_histogram_buckets():
+    metrics = LLMMetrics()
+    for latency in (0.2, 0.8, 3.0):
+        record = LLMCallRecord("m", "extract")
+        record.latency = latency
+        metrics.record(record)
+
+    text = metrics.render_prometheus()
+    assert 'llm_calls_total{model="m",call_type="extract"} 3' in text
+    assert 'llm_latency_seconds_bucket{model="m",call_type="extract",le="1"} 2' in text
+    assert 'llm_latency_seconds_bucket{model="m",call_type="extract",le="+Inf"} 3' in text
+    assert 'llm_latency_seconds_count{model="m",call_type="extract"} 3' in text
+    print("✓ Prometheus text output has cumulative buckets")
+
+def test_scan_summary_names_bottleneck():
+    scan = ScanMetrics()
+    slow_queue = LLMCallRecord("lite", "similarity")
+    slow_queue.queue_wait, slow_queue.latency = 12.0, 1.0
+    cached = LLMCallRecord("full", "extract")
+    cached.cache_hit = True
+    scan.add(slow_queue)
+    scan.add(cached)
+
+    summary = scan.summary()
+    assert summary["bottleneck"] == "rate_limiter"
+    assert summary["by_call"]["full/extract"]["cache_hits"] == 1
+    assert summary["time_s"] == {"rate_limiter": 12.0, "model": 1.0, "retries": 0.0}
+    print("✓ Scan summary points at the rate limiter")
+
+if __name__ == "__main__":
+    test_call_record_with_rate_retry()
+    test_quota_error_recorded_on_failure()
+    test_prometheus_histogram_buckets()
+    test_scan_summary_names_bottleneck()
@@ -11,7 +11,9 @@ from unittest.mock import patch, MagicMock
 from database.connection import SessionLocal, init_db
 from database.models import User, Idea, Competitor, ScanHistory
 from api.services.scanner import run_scan_for_idea
+from config.settings import settings
 import json
+import re
 
 def setup_test_user():
     """Create test user in database"""
@@ -64,6 +66,19 @@ def mock_gemini_response(prompt: str, **kwargs):
             "category": "Smart Home & Sports"
         })
 
+    # Batched similarity calculation - one entry per "[n]" product block
+    elif "Compare this invention idea to each" in prompt:
+        product_count = len(re.findall(r'^\[\d+\]$', prompt, re.MULTILINE))
+        return json.dumps([
+            {
+                "index": i,
+                "score": 65,
+                "reasoning": "Both are lamps with monitoring features, but competitor focuses on general home automation while user's idea is surf-specific",
+                "user_advantage": "Specialized for surfers with ocean condition monitoring"
+            }
+            for i in range(product_count)
+        ])
+
     # Similarity calculation
     elif "Compare this invention" in prompt:
         # Simulate finding a moderate match
@@ -83,6 +98,10 @@ def mock_gemini_response(prompt: str, **kwargs):
 
     return "{}"
 
+async def mock_gemini_response_async(prompt: str, **kwargs):
+    """Async twin of mock_gemini_response for GeminiClient.agenerate"""
+    return mock_gemini_response(prompt, **kwargs)
+
 def test_with_mocked_llm():
     """Test full flow with mocked LLM (no quota usage)"""
     print("\n=== Testing with MOCKED LLM (no quota) ===\n")
@@ -91,8 +110,10 @@ def test_with_mocked_llm():
     user_id, db = setup_test_user()
     idea_id = create_test_idea(user_id, db)
 
-    # Mock the Gemini client
-    with patch('llm.client.GeminiClient.generate', side_effect=mock_gemini_response):
+    # Mock the Gemini client; scraper cache off so nothing is written to scraper_cache.db in the repo root
+    with patch.object(settings, 'SCRAPER_CACHE_ENABLED', False), \
+         patch('llm.client.GeminiClient.generate', side_effect=mock_gemini_response), \
+         patch('llm.client.GeminiClient.agenerate', side_effect=mock_gemini_response_async):
         with patch('notifications.email.EmailService.send_alert') as mock_email:
             with patch('notifications.email.EmailService.send_no_matches_email') as mock_no_match:
 
@@ -147,7 +168,9 @@ def test_real_llm_single_product():
             'description': 'LED display showing ocean conditions'
         }]
 
-    with patch('scrapers.serper.SerperScraper.search', side_effect=mock_search):
+    # Scraper cache off: a cached result would bypass the 1-product mock
+    with patch.object(settings, 'SCRAPER_CACHE_ENABLED', False), \
+         patch('scrapers.serper.SerperScraper.search', side_effect=mock_search):
         with patch('scrapers.aliexpress.AliExpressScraper.search', return_value=[]):
             with patch('scrapers.kickstarter.KickstarterScraper.search', return_value=[]):
                 with patch('notifications.email.EmailService.send_alert') as mock_email:
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Test offline batch mode for weekly monitoring: JSONL job round trip through the local
+file backend, Gemini Batch API response handling, and reconciliation into ScanHistory /
+Competitor across scheduler runs (in-memory SQLite, no API calls).
+"""
+import sys
+import os
+import json
+import re
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import patch
+from tests.helpers import memory_session
+from database.models import User, Idea, Competitor, ScanHistory, SimilarityCache
+from llm.batch import GeminiBatchBackend, LocalFileBatchBackend, STATUS_FAILED, STATUS_RUNNING, STATUS_SUCCEEDED, read_results, write_job
+from scheduler.runner import DailyRunner
+from config.settings import settings
+
+PRODUCTS = [
+    ("google", {"name": f"Surf Lamp {i}", "url": f"https://example.com/lamp-{i}", "description": "Lamp", "price": 30.0})
+    for i in range(5)
+]
+
+def _score_first_high(prompt: str) -> str:
+    """Fake model: product [0] of every batch is a match, the rest aren't"""
+    count = len(re.findall(r'^\[\d+\]$', prompt, re.MULTILINE))
+    return json.dumps([
+        {"index": i, "score": 85 if i == 0 else 20, "reasoning": "r", "user_advantage": "u"}
+        for i in range(count)
+    ])
+
+def _wait(backend, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while backend.status(job_id) == STATUS_RUNNING and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return backend.status(job_id)
+
+def _session():
+    db = memory_session()
+    user = User(email="monitor@example.com", is_active=1)
+    db.add(user)
+    db.commit()
+    idea = Idea(
+        user_id=user.id,
+        user_description="A smart lamp that shows surf conditions",
+        extracted_concepts=json.dumps({"search_keywords": ["surf lamp"]}),
+        monitoring_enabled=True,
+        monitoring_ends_at=datetime.utcnow() + timedelta(days=30),
+        last_checked=datetime.utcnow() - timedelta(days=8)
+    )
+    db.add(idea)
+    db.commit()
+    return db, idea
+
+def test_local_backend_round_trip():
+    work_dir = tempfile.mkdtemp()
+
+    def responder(prompt):
+        if prompt == "boom":
+            raise RuntimeError("model error")
+        return prompt.upper()
+
+    backend = LocalFileBatchBackend(work_dir, responder=responder)
+    job_path = os.path.join(work_dir, "job.jsonl")
+    write_job(job_path, [("a", "hello"), ("b", "boom")])
+
+    job_id = backend.submit(job_path)
+    assert _wait(backend, job_id) == STATUS_SUCCEEDED
+    assert read_results(backend.results_path(job_id)) == {"a": "HELLO", "b": None}
+    print("✓ JSONL job processed; failed request reported per key")
+
+def _submit(runner, idea, db, backend, **overrides):
+    with patch.object(settings, "MONITORING_BATCH_DIR", backend.work_dir), \
+         patch.object(settings, "SIMILARITY_BATCH_SIZE", 3), \
+         patch('scheduler.runner.get_batch_backend', return_value=backend), \
+         patch.object(DailyRunner, '_collect_new_products', return_value=list(PRODUCTS)):
+        return runner._submit_ideas_batch([idea], db)
+
+def _poll(runner, db, backend, timeout=3600):
+    with patch.object(settings, "MONITORING_BATCH_DIR", backend.work_dir), \
+         patch.object(settings, "MONITORING_BATCH_TIMEOUT", timeout), \
+         patch('scheduler.runner.get_batch_backend', return_value=backend):
+        return runner._poll_batch_jobs(db)
+
+def test_batch_pass_reconciles_results():
+    db, idea = _session()
+    last_checked = idea.last_checked
+    backend = LocalFileBatchBackend(tempfile.mkdtemp(), responder=_score_first_high)
+    runner = DailyRunner()
+
+    with patch.object(runner.notifier, 'send_alert') as mock_alert:
+        assert _submit(runner, idea, db, backend) == 0  # Submitted, not waited for
+        assert idea.last_checked == last_checked
+        with patch.object(settings, "MONITORING_BATCH_DIR", backend.work_dir):
+            assert runner._ideas_in_flight() == {idea.id}
+
+        with patch.object(settings, "MONITORING_BATCH_DIR", backend.work_dir):
+            job_id = runner._batch_states()[0][1]["job_id"]
+        assert _wait(backend, job_id) == STATUS_SUCCEEDED
+        assert _poll(runner, db, backend) == 1
+
+    # Batches of 3 -> products 0 and 3 are each their batch's [0]
+    names = sorted(c.product_name for c in db.query(Competitor).all())
+    assert names == ["Surf Lamp 0", "Surf Lamp 3"]
+    assert db.query(ScanHistory).count() == 5
+    assert db.query(SimilarityCache).count() == 5
+    assert idea.last_checked > datetime.utcnow() - timedelta(minutes=1)
+    assert len(mock_alert.call_args[0][2]) == 2
+    with patch.object(settings, "MONITORING_BATCH_DIR", backend.work_dir):
+        assert runner._batch_states() == []
+    assert os.listdir(backend.work_dir) == []  # Job, results and state files removed
+    print("✓ Batch results saved as history, matches and memo entries on a later poll")
+
+def test_running_job_is_polled_not_awaited():
+    db, idea = _session()
+    last_checked = idea.last_checked
+    release = []
+
+    def slow(prompt):
+        while not release:
+            time.sleep(0.01)
+        return _score_first_high(prompt)
+
+    backend = LocalFileBatchBackend(tempfile.mkdtemp(), responder=slow)
+    runner = DailyRunner()
+    _submit(runner, idea, db, backend)
+
+    assert _poll(runner, db, backend) == 0  # Still running - kept for the next poll
+    with patch.object(settings, "MONITORING_BATCH_DIR", backend.work_dir):
+        assert runner._ideas_in_flight() == {idea.id}
+
+    assert _poll(runner, db, backend, timeout=0) == 0  # Past the timeout - dropped, idea stays due
+    release.append(True)
+    with patch.object(settings, "MONITORING_BATCH_DIR", backend.work_dir):
+        assert runner._ideas_in_flight() == set()
+    assert idea.last_checked == last_checked
+    print("✓ Running job left for the next poll; abandoned after the timeout")
+
+def test_failed_job_leaves_idea_due():
+    db, idea = _session()
+    last_checked = idea.last_checked
+
+    def always_fails(prompt):
+        raise RuntimeError("quota")
+
+    backend = LocalFileBatchBackend(tempfile.mkdtemp(), responder=always_fails)
+    runner = DailyRunner()
+    _submit(runner, idea, db, backend)
+    with patch.object(settings, "MONITORING_BATCH_DIR", backend.work_dir):
+        job_id = runner._batch_states()[0][1]["job_id"]
+    _wait(backend, job_id)
+
+    with patch.object(runner.notifier, 'send_alert'):
+        _poll(runner, db, backend)
+
+    assert db.query(ScanHistory).count() == 0  # Nothing recorded - products retried next pass
+    assert idea.last_checked == last_checked
+    print("✓ Unanswered idea stays due for the next run")
+
+def test_gemini_backend_job_states():
+    backend = GeminiBatchBackend(tempfile.mkdtemp(), model_name="gemini-lite", api_key="test")
+    job_path = os.path.join(backend.work_dir, "job.jsonl")
+    write_job(job_path, [("a", "hello"), ("b", "boom")])
+
+    class FakeResponse:
+        def __init__(self, payload):
+            self.payload = payload
+
+        def json(self):
+            return self.payload
+
+    with patch.object(backend, '_request', return_value=FakeResponse({"name": "batches/abc"})) as mock_request:
+        assert backend.submit(job_path) == "batches/abc"
+    body = mock_request.call_args[1]["json"]
+    sent = body["batch"]["input_config"]["requests"]["requests"]
+    assert [r["metadata"]["key"] for r in sent] == ["a", "b"]
+    assert "models/gemini-lite:batchGenerateContent" in mock_request.call_args[0][1]
+    assert mock_request.call_args[1]["client"].session.get_adapter(backend.BASE_URL).max_retries.total == 0  # No POST retries
+
+    with patch.object(backend, '_request', return_value=FakeResponse({"metadata": {"state": "BATCH_STATE_RUNNING"}})):
+        assert backend.status("batches/abc") == STATUS_RUNNING
+    with patch.object(backend, '_request', return_value=FakeResponse({"metadata": {"state": "BATCH_STATE_EXPIRED"}})):
+        assert backend.status("batches/abc") == STATUS_FAILED
+
+    done = {
+        "metadata": {"state": "BATCH_STATE_SUCCEEDED"},
+        "response": {"inlinedResponses": {"inlinedResponses": [
+            {"metadata": {"key": "a"}, "response": {"candidates": [{"content": {"parts": [{"text": "HELLO"}]}}]}},
+            {"metadata": {"key": "b"}, "error": {"code": 500}},
+        ]}},
+    }
+    with patch.object(backend, '_request', return_value=FakeResponse(done)):
+        assert backend.status("batches/abc") == STATUS_SUCCEEDED
+    assert read_results(backend.results_path("batches/abc")) == {"a": "HELLO", "b": None}
+
+    with patch.object(backend, '_request') as mock_request:
+        backend.cleanup("batches/abc")
+    assert mock_request.call_args[0] == ("DELETE", f"{backend.BASE_URL}/batches/abc")
+    assert not os.path.exists(backend.results_path("batches/abc"))
+    print("✓ Gemini batch job submitted inline without retries; states and inline responses mapped; job deleted")
+
+if __name__ == "__main__":
+    test_local_backend_round_trip()
+    test_batch_pass_reconciles_results()
+    test_running_job_is_polled_not_awaited()
+    test_failed_job_leaves_idea_due()
+    test_gemini_backend_job_states()
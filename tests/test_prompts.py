@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test prompt compaction: marketplace boilerplate stripping, truncation, batch de-duplication
+and before/after token accounting (no API calls).
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import patch
+from llm.prompts import compact_products, compact_snippets, normalize, strip_marketplace_boilerplate, truncate_tokens
+from llm.matcher import ConceptMatcher
+from config.settings import settings
+
+LONG_DESCRIPTION = (
+    "Free shipping on orders over $25. Bedside lamp that changes colour with the surf forecast. "
+    + "Perfect gift for surfers and ocean lovers. " * 20
+)
+
+def test_strips_marketplace_boilerplate():
+    assert strip_marketplace_boilerplate("Surf Lamp | Amazon.com") == "Surf Lamp"
+    assert strip_marketplace_boilerplate("Surf Lamp - AliExpress 13") == "Surf Lamp"
+    assert strip_marketplace_boilerplate("Amazon.com: Surf Lamp : Home & Kitchen") == "Surf Lamp"
+    assert strip_marketplace_boilerplate("Wave &amp; Tide  Lamp") == "Wave & Tide Lamp"
+    assert strip_marketplace_boilerplate("Amazon.com") == "Amazon.com"  # Never strip to nothing
+    print("✓ Marketplace suffixes/prefixes removed")
+
+def test_truncation_and_snippets():
+    text = truncate_tokens("word " * 100, 10)
+    assert len(text) <= 41 and text.endswith("…")
+    assert normalize("...  broke   after a week ...") == "broke after a week"
+    assert compact_snippets(["...broke after a week...", "broke after a week", "  "], 60) == ["broke after a week"]
+    print("✓ Text truncated on word boundary, snippets de-duplicated")
+
+def test_batch_dedupes_repeated_descriptions():
+    products = [
+        {"name": "Surf Lamp | Amazon.com", "description": LONG_DESCRIPTION},
+        {"name": "Surf Lamp Pro | Amazon.com", "description": LONG_DESCRIPTION},
+        {"name": "Tide Clock", "description": "Free shipping on orders over $25. Shows the tide."},
+    ]
+    compacted = compact_products(products, name_tokens=30, description_tokens=80)
+
+    assert compacted[0]["name"] == "Surf Lamp"
+    assert compacted[0]["description"].count("Perfect gift") == 1
+    assert compacted[1]["description"] == "Same as [0]"
+    assert compacted[2]["description"] == "Shows the tide."  # Shared boilerplate sentence dropped
+    assert products[0]["name"] == "Surf Lamp | Amazon.com"  # Input untouched
+    print("✓ Repeated descriptions collapsed within a batch")
+
+def test_matcher_records_token_savings():
+    products = [{"name": f"Surf Lamp {i} | Amazon.com", "description": LONG_DESCRIPTION} for i in range(3)]
+    matcher = ConceptMatcher()
+    prompt = matcher._build_batch_similarity_prompt("A smart lamp that shows surf conditions", products)
+
+    assert "Compare this invention idea to each" in prompt
+    assert "[2]" in prompt and "Same as [0]" in prompt
+    compaction = matcher.call_metrics.summary()["prompt_compaction"]
+    assert compaction["tokens_after"] < compaction["tokens_before"] / 2, compaction
+
+    with patch.object(settings, "PROMPT_COMPACTION_ENABLED", False):
+        raw = ConceptMatcher()._build_batch_similarity_prompt("A smart lamp that shows surf conditions", products)
+    assert "Surf Lamp 0 | Amazon.com" in raw
+    print(f"✓ Batch prompt compacted: {compaction}")
+
+if __name__ == "__main__":
+    test_strips_marketplace_boilerplate()
+    test_truncation_and_snippets()
+    test_batch_dedupes_repeated_descriptions()
+    test_matcher_records_token_savings()
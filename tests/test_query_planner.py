@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test the query planner: focused queries per source within a budget, reciprocal rank
+fusion with URL dedup, parallel fan-out with a timeout (fake scrapers, no API calls).
+"""
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapers.base_scraper import BaseScraper
+from scrapers.query_planner import QueryPlanner, reciprocal_rank_fusion
+
+class FakeScraper(BaseScraper):
+    def __init__(self, catalog, delay=0.0):
+        self.catalog = catalog  # query -> [url suffixes], best first
+        self.delay = delay
+        self.queries = []
+
+    def search(self, keywords):
+        self.queries.append(keywords)
+        time.sleep(self.delay)
+        return [{"name": f"Product {s}", "url": f"https://www.shop.com/p/{s}/"} for s in self.catalog.get(keywords, [])]
+
+def test_plan_within_budget():
+    planner = QueryPlanner(budget=5, per_source=3)
+    keywords = ["surf lamp", "wave light", "Surf Lamp"]  # Last one duplicates the first
+
+    assert planner.candidate_queries(keywords) == ["surf lamp wave light Surf Lamp", "surf lamp", "wave light"]
+    assert planner.plan(keywords, ["amazon", "google"]) == [
+        ("amazon", "surf lamp wave light Surf Lamp"), ("google", "surf lamp wave light Surf Lamp"),
+        ("amazon", "surf lamp"), ("google", "surf lamp"),
+        ("amazon", "wave light"),
+    ]
+    print("✓ Broad query first, then per keyword; budget shared round-robin")
+
+def test_default_budget_matches_one_query_per_source():
+    planner = QueryPlanner(per_source=3)
+    assert planner.plan(["surf lamp", "wave light"], ["amazon", "google", "patents"]) == [
+        ("amazon", "surf lamp wave light"), ("google", "surf lamp wave light"), ("patents", "surf lamp wave light"),
+    ]
+    print("✓ Default budget: one broad query per source, no extra paid searches")
+
+def test_rrf_dedups_and_rewards_agreement():
+    a = [{"url": "https://shop.com/p/1", "name": "one"}, {"url": "https://shop.com/p/2", "name": "two"}]
+    b = [{"url": "https://www.shop.com/p/2/", "name": "two again"}, {"url": "https://shop.com/p/3", "name": "three"}]
+    fused = reciprocal_rank_fusion([a, b], k=60)
+
+    assert [p["name"] for p in fused] == ["two", "one", "three"]  # In both lists -> first
+    assert fused[0]["rrf_score"] == round(1 / 62 + 1 / 61, 5)
+    print("✓ Same URL in two lists counted once, ranked above single-list hits")
+
+def test_fanout_finds_what_one_query_misses():
+    catalog = {
+        "surf lamp wave light": ["a"],
+        "surf lamp": ["a", "b"],
+        "wave light": ["c"],
+    }
+    amazon, google = FakeScraper(catalog), FakeScraper(catalog)
+    result = QueryPlanner(budget=10, per_source=3).search([("amazon", amazon), ("google", google)], ["surf lamp", "wave light"])
+
+    assert sorted(amazon.queries) == ["surf lamp", "surf lamp wave light", "wave light"]
+    assert sorted(p["url"] for p in result.products) == ["https://www.shop.com/p/a/", "https://www.shop.com/p/b/", "https://www.shop.com/p/c/"]
+    assert result.products[0]["url"].endswith("/a/") and result.products[0]["source"] == "amazon"
+    assert len(result.found["google"]) == 4 and not result.abandoned
+    print("✓ Focused queries surface b and c; duplicates across queries and sources merged")
+
+def test_slow_searches_abandoned():
+    fast = FakeScraper({"surf lamp": ["a"]})
+    slow = FakeScraper({"surf lamp": ["z"]}, delay=2)
+
+    started = time.monotonic()
+    result = QueryPlanner().search([("fast", fast), ("slow", slow)], ["surf lamp"], timeout=0.3)
+
+    assert time.monotonic() - started < 1
+    assert [p["name"] for p in result.products] == ["Product a"]
+    assert result.abandoned == [("slow", "surf lamp")]
+    print("✓ Searches past the timeout abandoned, finished ones kept")
+
+if __name__ == "__main__":
+    test_plan_within_budget()
+    test_default_budget_matches_one_query_per_source()
+    test_rrf_dedups_and_rewards_agreement()
+    test_fanout_finds_what_one_query_misses()
+    test_slow_searches_abandoned()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Test the local BM25 pre-ranker (no API calls).
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm.ranker import LexicalRanker
+
+CONCEPTS = {
+    "core_function": "Smart lamp that monitors ocean surf conditions",
+    "key_features": ["LED color indicators", "surf alerts"],
+    "search_keywords": ["surf lamp", "ocean monitor", "wave alert"]
+}
+
+def test_rank_orders_by_relevance():
+    products = [
+        {"name": "Garden Hose 50ft", "description": "Flexible water hose"},
+        {"name": "Desk Lamp LED", "description": "Adjustable LED lamp for office"},
+        {"name": "Surf Forecast Lamp", "description": "LED lamp that changes color with ocean surf conditions"},
+    ]
+
+    ranked = LexicalRanker().rank(CONCEPTS, products)
+
+    assert [p["name"] for p in ranked] == ["Surf Forecast Lamp", "Desk Lamp LED", "Garden Hose 50ft"]
+    assert ranked[0]["rank_score"] > ranked[1]["rank_score"] > ranked[2]["rank_score"] == 0
+    print("✓ Most relevant product ranked first")
+
+def test_ties_keep_scraper_order():
+    products = [{"name": f"Unrelated {i}", "description": ""} for i in range(3)]
+    ranked = LexicalRanker().rank(CONCEPTS, products)
+    assert [p["name"] for p in ranked] == ["Unrelated 0", "Unrelated 1", "Unrelated 2"]
+    print("✓ Ties keep original order")
+
+def test_rank_correlation():
+    assert LexicalRanker.rank_correlation([1, 2], [10, 20]) is None
+    assert LexicalRanker.rank_correlation([1, 2, 3], [10, 20, 30]) == 1.0
+    assert LexicalRanker.rank_correlation([1, 2, 3], [30, 20, 10]) == -1.0
+
+    # Tied scores share their average rank, so the result doesn't depend on input order
+    assert list(LexicalRanker._average_ranks([3, 1, 1, 2])) == [3.0, 0.5, 0.5, 2.0]
+    tied = LexicalRanker.rank_correlation([1, 1, 2, 3], [5, 6, 7, 8])
+    assert tied == LexicalRanker.rank_correlation([1, 1, 2, 3], [6, 5, 7, 8])
+    assert abs(tied - 0.9487) < 1e-4
+    print("✓ Spearman correlation")
+
+if __name__ == "__main__":
+    test_rank_orders_by_relevance()
+    test_ties_keep_scraper_order()
+    test_rank_correlation()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test the per-model token-bucket rate limiter (no API calls).
+Uses a 1-second window so the test runs fast.
+"""
+import sys
+import os
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm.rate_limiter import TokenBucketLimiter, get_rate_limiter, PRIORITY_INTERACTIVE, PRIORITY_MONITORING
+
+class FastLimiter(TokenBucketLimiter):
+    WINDOW_SECONDS = 1.0
+
+class TinyWindowLimiter(TokenBucketLimiter):
+    WINDOW_SECONDS = 0.2
+
+def _queue_in_order(limiter, callers):
+    """Start (name, priority, tenant) callers one after another while the limiter is saturated; return grant order"""
+    order = []
+
+    def worker(name, priority, tenant):
+        limiter.acquire(priority=priority, tenant=tenant)
+        order.append(name)
+
+    threads = []
+    for name, priority, tenant in callers:
+        thread = threading.Thread(target=worker, args=(name, priority, tenant))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.02)  # Deterministic enqueue order
+    for thread in threads:
+        thread.join(timeout=5)
+    return order
+
+def test_burst_then_wait():
+    limiter = FastLimiter("test", rpm=2, tpm=10000, burst=2)
+
+    assert limiter.acquire() < 0.05
+    assert limiter.acquire() < 0.05
+    waited = limiter.acquire()  # Window full - must wait for the first request to roll off
+    assert 0.8 < waited < 1.5, waited
+    print(f"✓ Burst of 2 passed instantly, 3rd waited {waited:.2f}s")
+
+def test_tpm_limit():
+    limiter = FastLimiter("test", rpm=100, tpm=1000, burst=100)
+
+    assert limiter.acquire(tokens=800) < 0.05
+    waited = limiter.acquire(tokens=300)
+    assert 0.8 < waited < 1.5, waited
+    print(f"✓ Token budget enforced (waited {waited:.2f}s)")
+
+def test_queued_waiters_all_get_through():
+    limiter = FastLimiter("test", rpm=4, tpm=10000, burst=4)
+    done = []
+
+    def worker():
+        limiter.acquire()
+        done.append(time.monotonic())
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=5)
+
+    assert len(done) == 6
+    assert max(done) - start < 2.0
+    print(f"✓ 6 queued callers served in {max(done) - start:.2f}s")
+
+def test_interactive_jumps_monitoring_backlog():
+    limiter = TinyWindowLimiter("test", rpm=1, tpm=10000, burst=1, class_caps={})
+    limiter.acquire()  # Saturate so everything below has to queue
+
+    order = _queue_in_order(limiter, [
+        ("monitor-1", PRIORITY_MONITORING, 1),
+        ("monitor-2", PRIORITY_MONITORING, 2),
+        ("user", PRIORITY_INTERACTIVE, 3),
+    ])
+    assert order == ["user", "monitor-1", "monitor-2"], order
+    print("✓ Interactive call served before the queued monitoring backlog")
+
+def test_fair_between_tenants():
+    limiter = TinyWindowLimiter("test", rpm=1, tpm=10000, burst=1, class_caps={})
+    limiter.acquire()
+
+    order = _queue_in_order(limiter, [
+        ("a1", PRIORITY_INTERACTIVE, "a"),
+        ("a2", PRIORITY_INTERACTIVE, "a"),
+        ("a3", PRIORITY_INTERACTIVE, "a"),
+        ("b1", PRIORITY_INTERACTIVE, "b"),
+    ])
+    assert order == ["a1", "b1", "a2", "a3"], order
+    print("✓ Tenant with one call isn't stuck behind another tenant's backlog")
+
+def test_monitoring_quota_cap():
+    limiter = FastLimiter("test", rpm=4, tpm=10000, burst=4, class_caps={PRIORITY_MONITORING: 0.5})
+
+    assert limiter.acquire(priority=PRIORITY_MONITORING) < 0.05
+    assert limiter.acquire(priority=PRIORITY_MONITORING) < 0.05
+    assert limiter.acquire(priority=PRIORITY_INTERACTIVE) < 0.05  # Headroom kept for users
+    waited = limiter.acquire(priority=PRIORITY_MONITORING)
+    assert 0.8 < waited < 1.5, waited
+    print(f"✓ Monitoring capped at half the window (3rd call waited {waited:.2f}s)")
+
+def test_limiters_are_per_model():
+    a = get_rate_limiter("model-a", "key-1")
+    assert a is get_rate_limiter("model-a", "key-1")
+    assert a is not get_rate_limiter("model-b", "key-1")
+    assert a is not get_rate_limiter("model-a", "key-2")
+    print("✓ Separate limiter per (model, key)")
+
+if __name__ == "__main__":
+    test_burst_then_wait()
+    test_tpm_limit()
+    test_queued_waiters_all_get_through()
+    test_interactive_jumps_monitoring_backlog()
+    test_fair_between_tenants()
+    test_monitoring_quota_cap()
+    test_limiters_are_per_model()
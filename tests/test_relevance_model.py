@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test the local relevance model: training from memoized LLM decisions + feedback labels,
+held-out skip threshold, and skipping candidates before the LLM (in-memory SQLite, no API calls).
+"""
+import sys
+import os
+import json
+import random
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import patch
+from tests.helpers import memory_session
+from database.models import User, Idea, Competitor, SimilarityCache
+from llm.relevance import RelevanceModel, choose_skip_threshold, load_labeled_examples, train
+from llm.similarity_memo import SimilarityMemo
+from llm.matcher import ConceptMatcher
+from config.settings import settings
+import numpy as np
+
+TOPICS = ["surf lamp", "cat collar", "plant sensor", "bike light", "dog bowl", "desk fan",
+          "coffee scale", "yoga mat", "rain gauge", "book light", "pill box", "tent heater"]
+
+def _seed(db, ideas_per_topic=3, topics=TOPICS):
+    rng = random.Random(7)
+    user = User(email="relevance@example.com", is_active=1)
+    db.add(user)
+    db.commit()
+
+    for t, topic in enumerate(topics * ideas_per_topic):
+        description = f"A smart {topic} idea number {t}"
+        idea = Idea(user_id=user.id, user_description=description,
+                    extracted_concepts=json.dumps({"core_function": f"smart {topic}", "search_keywords": [topic, f"smart {topic}"]}))
+        db.add(idea)
+        db.commit()
+        memo = SimilarityMemo(db, description)
+        for i in range(4):
+            # On-topic product listings -> LLM said match
+            memo.store({"name": f"Smart {topic.title()} Model {rng.randint(1, 99)}", "url": f"https://amazon.com/dp/{t}{i}",
+                        "source": "amazon", "description": ""}, {"score": 85})
+        for i in range(6):
+            # Listicles / unrelated products -> LLM said no
+            other = TOPICS[(TOPICS.index(topic) + 1 + i) % len(TOPICS)]
+            memo.store({"name": f"Top 10 best {other} reviews {i}", "url": f"https://blog.example.com/best-{other.replace(' ', '-')}-{t}{i}",
+                        "source": "google", "description": ""}, {"score": 10})
+        db.commit()
+    return user
+
+def test_feedback_overrides_llm_label():
+    db = memory_session()
+    user = _seed(db, ideas_per_topic=1)
+    idea = db.query(Idea).first()
+    row = db.query(SimilarityCache).filter(SimilarityCache.score == 85).first()
+    assert row.product_name and row.source == "amazon"  # Memo keeps product fields now
+    db.add(Competitor(idea_id=idea.id, product_name=row.product_name, url=row.product_url, source="amazon",
+                      similarity_score=85, is_relevant=0))
+    db.commit()
+
+    labels = {(idea_id, p["url"]): label for idea_id, _, p, label in load_labeled_examples(db)}
+    assert labels[(idea.id, row.product_url)] == 0
+    print("✓ User feedback overrides the LLM's decision")
+
+def test_threshold_respects_miss_rate():
+    probabilities = np.array([0.05, 0.1, 0.2, 0.3, 0.6, 0.7, 0.8, 0.9, 0.95, 0.99])
+    labels = np.array([0, 0, 0, 1, 0, 1, 1, 1, 1, 1])
+    threshold, stats = choose_skip_threshold(probabilities, labels, max_miss_rate=0.0, min_positives=5)
+    assert threshold == 0.3 and stats["miss_rate"] == 0.0 and stats["skip_rate"] == 0.3
+    assert choose_skip_threshold(probabilities, labels, 0.0, min_positives=50)[0] == 0.0  # Too few labels to trust
+    print("✓ Skip threshold chosen on held-out positives")
+
+def test_train_and_skip():
+    db = memory_session()
+    _seed(db)
+    model = train(db, max_miss_rate=0.0, min_positives=5)
+    assert model.skip_below > 0, model.validation
+    assert model.validation["miss_rate"] == 0.0
+    assert model.validation["skip_rate"] > 0.3
+
+    path = os.path.join(tempfile.mkdtemp(), "relevance_model.json")
+    model.save(path)
+    assert RelevanceModel.load(path).skip_below == model.skip_below
+
+    concepts = {"core_function": "smart surf lamp", "search_keywords": ["surf lamp", "smart surf lamp"]}
+    products = [
+        {"name": "Smart Surf Lamp Model 5", "url": "https://amazon.com/dp/B0SURF", "source": "amazon"},
+        {"name": "Top 10 best yoga mat reviews", "url": "https://blog.example.com/best-yoga-mat", "source": "google"},
+    ]
+    matcher = ConceptMatcher()
+    with patch.object(settings, "RELEVANCE_MODEL_PATH", path):
+        kept = matcher.skip_irrelevant(concepts, products)
+
+    assert [p["name"] for p in kept] == ["Smart Surf Lamp Model 5"]
+    assert matcher.stats == {"relevance_skipped": 1}
+    print(f"✓ Trained model skips the listicle: {json.dumps(model.validation, sort_keys=True)}")
+
+def test_few_ideas_never_split_rows():
+    db = memory_session()
+    _seed(db, ideas_per_topic=1, topics=TOPICS[:1])
+    model = train(db, max_miss_rate=0.0, min_positives=1)
+    assert model.skip_below == 0.0 and "2 ideas" in model.validation["reason"]
+
+    db = memory_session()
+    _seed(db, ideas_per_topic=1, topics=TOPICS[:2])
+    model = train(db, max_miss_rate=0.0, min_positives=1)
+    # One whole idea (4 matches, 6 non-matches) held out, the other trained on
+    assert (model.validation["heldout_positives"], model.validation["heldout_negatives"]) == (4, 6)
+    assert model.validation["train_examples"] == 10
+    print("✓ One idea: no threshold; two ideas: a whole idea held out")
+
+def test_no_model_no_skips():
+    matcher = ConceptMatcher()
+    products = [{"name": "Anything", "url": "https://example.com/x"}]
+    with patch.object(settings, "RELEVANCE_MODEL_PATH", "/nonexistent/relevance_model.json"):
+        assert matcher.skip_irrelevant({}, products) == products
+    assert matcher.stats == {}
+    print("✓ Untrained: every candidate goes to the LLM")
+
+if __name__ == "__main__":
+    test_feedback_overrides_llm_label()
+    test_threshold_respects_miss_rate()
+    test_train_and_skip()
+    test_few_ideas_never_split_rows()
+    test_no_model_no_skips()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Test deadline-aware scans: stage budgets, abandoned batches / scrapers / verdict, and the
+partial result + follow-up queue (in-memory SQLite, no API calls).
+"""
+import sys
+import os
+import re
+import json
+import time
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import patch, MagicMock
+from tests.helpers import memory_session
+from database.models import User, Idea, Competitor
+from api.services.deadline import ScanDeadline
+from api.services.scanner import _verdict_and_gaps, run_scan_for_idea
+from llm.matcher import ConceptMatcher
+from config.settings import settings
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def _products(prefix, count):
+    return [
+        {"name": f"{prefix} Surf Lamp {i}", "url": f"https://example.com/{prefix}-{i}", "description": "Surf lamp", "price": 30.0}
+        for i in range(count)
+    ]
+
+async def _score_all_high(prompt, **kwargs):
+    count = len(re.findall(r'^\[\d+\]$', prompt, re.MULTILINE))
+    return json.dumps([{"index": i, "score": 85, "reasoning": "r"} for i in range(count)])
+
+def test_stage_budgets():
+    clock = FakeClock()
+    deadline = ScanDeadline(total=100, stage_budgets={"extract": 30, "match": 80}, clock=clock)
+    assert deadline.stage_timeout("extract") == 30
+    clock.now = 50
+    assert deadline.stage_timeout("match") == 50  # Capped by what's left of the total
+    assert not deadline.stage_expired("match")
+    clock.now = 100
+    assert deadline.stage_expired("match") and deadline.remaining() == 0
+    assert ScanDeadline(total=0).stage_timeout("match") is None
+    print("✓ Stage gets min(own budget, remaining total)")
+
+def test_outstanding_batches_abandoned():
+    products = _products("p", 4)
+
+    async def fake_agenerate(prompt, **kwargs):
+        if "p Surf Lamp 2" in prompt:
+            await asyncio.sleep(2)  # Second batch hangs
+        return await _score_all_high(prompt)
+
+    matcher = ConceptMatcher()
+    with patch('llm.client.GeminiClient.agenerate', side_effect=fake_agenerate):
+        started = time.monotonic()
+        results = asyncio.run(matcher.acalculate_similarity_batch("A surf lamp", products, batch_size=2, deadline=time.monotonic() + 0.2))
+
+    assert time.monotonic() - started < 1
+    assert [r is not None for r in results] == [True, True, False, False]
+    assert matcher.stats == {"deadline_abandoned": 2}
+    print("✓ Finished batch kept, hung batch abandoned at the deadline")
+
+def test_slow_verdict_abandoned():
+    matcher = MagicMock()
+
+    async def slow_verdict(*args):
+        await asyncio.sleep(2)
+        return "Verdict: GO FOR IT"
+
+    matcher.agenerate_verdict.side_effect = slow_verdict
+    deadline = ScanDeadline(total=60, stage_budgets={"verdict": 0.2})
+    top = [SimpleNamespace(product_name="Lamp", similarity_score=80)]
+
+    with patch.object(settings, 'ENABLE_VERDICT', True):
+        verdict, gap_analysis, _ = asyncio.run(_verdict_and_gaps(
+            matcher, MagicMock(), SimpleNamespace(user_description="A surf lamp"), {}, top, [], {}, [], deadline
+        ))
+
+    assert verdict is None and gap_analysis is None
+    assert deadline.partial_stages == [("verdict", "abandoned verdict")]
+    print("✓ Verdict abandoned at its budget")
+
+def test_partial_scan_saved_emailed_and_queued():
+    db = memory_session()
+    user = User(email="deadline@example.com", is_active=1)
+    db.add(user)
+    db.commit()
+    idea = Idea(user_id=user.id, user_description="A smart lamp that shows surf conditions",
+                extracted_concepts=json.dumps({"search_keywords": ["surf lamp"], "negative_keywords": []}))
+    db.add(idea)
+    db.commit()
+
+    fast, slow = MagicMock(), MagicMock()
+    fast.search.return_value = _products("fast", 3)
+    slow.search.side_effect = lambda query: time.sleep(2) or _products("slow", 3)
+    registry = MagicMock()
+    registry.get_all_scrapers.return_value = [("fast", fast), ("slow", slow)]
+
+    with patch('api.services.scanner.ScraperRegistry', return_value=registry), \
+         patch('api.services.scanner.EmailService') as email_service, \
+         patch('llm.client.GeminiClient.agenerate', side_effect=_score_all_high), \
+         patch.object(settings, 'SCAN_STAGE_BUDGETS', {"extract": 5, "scrape": 0.3, "match": 5, "verdict": 5}), \
+         patch.object(settings, 'ENABLE_VERDICT', False), \
+         patch.object(settings, 'ENABLE_GAP_HUNT', False):
+        started = time.monotonic()
+        run_scan_for_idea(idea.id, db)
+        elapsed = time.monotonic() - started
+
+    db.refresh(idea)
+    assert elapsed < 1.5, elapsed
+    assert db.query(Competitor).count() == 3  # Fast scraper's products were scored and saved
+    assert idea.scan_partial is True
+    assert idea.followup_scan_at > datetime.utcnow()
+    assert email_service.return_value.send_alert.call_args.kwargs["partial"] is True
+    print(f"✓ Slow scraper abandoned; partial result emailed after {elapsed:.1f}s, follow-up queued")
+
+def test_rate_limited_scan_keeps_scored_matches():
+    db = memory_session()
+    user = User(email="ratelimit@example.com", is_active=1)
+    db.add(user)
+    db.commit()
+    idea = Idea(user_id=user.id, user_description="A smart lamp that shows surf conditions",
+                extracted_concepts=json.dumps({"search_keywords": ["surf lamp"], "negative_keywords": []}))
+    db.add(idea)
+    db.commit()
+
+    scraper = MagicMock()
+    scraper.search.return_value = _products("p", 4)
+    registry = MagicMock()
+    registry.get_all_scrapers.return_value = [("shop", scraper)]
+
+    async def fake_agenerate(prompt, **kwargs):
+        if "p Surf Lamp 2" in prompt or "p Surf Lamp 3" in prompt:
+            await asyncio.sleep(0.05)
+            raise RuntimeError("429 Resource exhausted")
+        return await _score_all_high(prompt)
+
+    with patch('api.services.scanner.ScraperRegistry', return_value=registry), \
+         patch('api.services.scanner.EmailService') as email_service, \
+         patch('llm.client.GeminiClient.agenerate', side_effect=fake_agenerate), \
+         patch.object(settings, 'SIMILARITY_BATCH_SIZE', 2), \
+         patch.object(settings, 'EARLY_STOP_ENABLED', False), \
+         patch.object(settings, 'ENABLE_VERDICT', False), \
+         patch.object(settings, 'ENABLE_GAP_HUNT', False):
+        run_scan_for_idea(idea.id, db)
+
+    assert db.query(Competitor).count() == 2  # The batch scored before the 429 is saved
+    assert email_service.return_value.send_alert.called
+    print("✓ Matches scored before a rate limit are saved and emailed")
+
+if __name__ == "__main__":
+    test_stage_budgets()
+    test_outstanding_batches_abandoned()
+    test_slow_verdict_abandoned()
+    test_partial_scan_saved_emailed_and_queued()
+    test_rate_limited_scan_keeps_scored_matches()
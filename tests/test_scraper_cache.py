@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test the scraper result cache: normalized query keys, per-source TTL, memory + SQLite
+tiers, stale-while-revalidate (temp cache file, no API calls).
+"""
+import sys
+import os
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import MagicMock, patch
+from scrapers.result_cache import ScraperResultCache, CachedScraper, normalize_query, FRESH, STALE, MISS
+
+def _cache(**kwargs):
+    path = os.path.join(tempfile.mkdtemp(), "scraper_cache.db")
+    kwargs.setdefault("ttls", {"patents": 1000, "aliexpress": 10, "default": 10})
+    return ScraperResultCache(path=path, stale_factor=3, **kwargs)
+
+def _scraper(results):
+    scraper = MagicMock()
+    scraper.search.side_effect = lambda keywords: [dict(r) for r in results]
+    return scraper
+
+def test_normalized_keys():
+    assert normalize_query("Surf  Lamp smart") == normalize_query("smart surf LAMP")
+    cache = _cache()
+    cache.set("amazon", "Surf Lamp", [{"name": "Lamp"}])
+    assert cache.get("amazon", "lamp   surf")[0] == FRESH
+    assert cache.get("aliexpress", "surf lamp")[0] == MISS  # Source is part of the key
+    print("✓ Case / whitespace / keyword order share one entry")
+
+def test_ttl_per_source_and_stale_window():
+    cache = _cache()
+    cache.set("patents", "surf lamp", [{"name": "Patent"}])
+    cache.set("aliexpress", "surf lamp", [{"name": "Listing"}])
+
+    with patch('scrapers.result_cache.time.time', return_value=time.time() + 20):
+        assert cache.get("patents", "surf lamp")[0] == FRESH     # TTL 1000s
+        assert cache.get("aliexpress", "surf lamp")[0] == STALE  # 10s TTL, within 3x
+    with patch('scrapers.result_cache.time.time', return_value=time.time() + 40):
+        assert cache.get("aliexpress", "surf lamp")[0] == MISS
+    print("✓ Patents fresh for longer; AliExpress stale, then expired")
+
+def test_disk_tier_survives_restart():
+    cache = _cache(memory_entries=1)
+    cache.set("amazon", "a", [{"name": "A"}])
+    cache.set("amazon", "b", [{"name": "B"}])  # Pushes "a" out of memory
+    assert cache.stats()["memory_entries"] == 1
+    assert cache.get("amazon", "a") == (FRESH, [{"name": "A"}])
+
+    reopened = ScraperResultCache(path=cache.path)
+    assert reopened.get("amazon", "b") == (FRESH, [{"name": "B"}])
+    print("✓ Memory LRU backed by the SQLite tier")
+
+def test_cached_scraper_hits_and_revalidates():
+    cache = _cache()
+    inner = _scraper([{"name": "Lamp", "url": "https://x/1"}])
+    scraper = CachedScraper("aliexpress", inner, cache)
+
+    first = scraper.search("surf lamp")
+    first[0]["source"] = "aliexpress"  # Callers tag results - must not leak into the cache
+    assert scraper.search("Surf Lamp") == [{"name": "Lamp", "url": "https://x/1"}]
+    assert inner.search.call_count == 1
+
+    with patch('scrapers.result_cache.time.time', return_value=time.time() + 20):
+        stale = scraper.search("surf lamp")
+    assert stale == [{"name": "Lamp", "url": "https://x/1"}]  # Served at once
+    for _ in range(50):
+        if inner.search.call_count == 2:
+            break
+        time.sleep(0.01)
+    assert inner.search.call_count == 2  # Refreshed in the background
+    print("✓ Repeat query served from cache; stale entry refreshed behind the caller")
+
+def test_empty_results_not_cached():
+    cache = _cache()
+    inner = _scraper([])
+    scraper = CachedScraper("amazon", inner, cache)
+    scraper.search("surf lamp")
+    scraper.search("surf lamp")
+    assert inner.search.call_count == 2
+    print("✓ Empty / failed searches are retried, not cached")
+
+if __name__ == "__main__":
+    test_normalized_keys()
+    test_ttl_per_source_and_stale_window()
+    test_disk_tier_survives_restart()
+    test_cached_scraper_hits_and_revalidates()
+    test_empty_results_not_cached()
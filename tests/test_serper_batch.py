@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test Serper multi-query batching: concurrent site: searches share one array-payload
+request and each scraper gets its own result set back (fake HTTP client, no API calls).
+"""
+import sys
+import os
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import patch
+from scrapers.serper_batch import SerperBatcher
+from scrapers.registry import ScraperRegistry
+from scheduler.runner import DailyRunner
+from config.settings import settings
+
+# URL shapes each scraper's parser keeps
+LINKS = {
+    "site:aliexpress.com": "https://www.aliexpress.com/item/1.html",
+    "site:amazon.com": "https://www.amazon.com/dp/B01",
+    "site:kickstarter.com": "https://www.kickstarter.com/projects/a/b",
+    "site:producthunt.com": "https://www.producthunt.com/products/x",
+}
+
+class FakeClient:
+    def __init__(self, status=200):
+        self.status = status
+        self.posts = []
+        self._lock = threading.Lock()
+
+    def post(self, url, json=None, headers=None):
+        with self._lock:
+            self.posts.append(json)
+        results = []
+        for query in json:
+            prefix = query["q"].split(" ")[0]
+            link = LINKS.get(prefix, f"https://shop.example.com/products/{len(results)}")
+            results.append({"organic": [{"title": query["q"], "link": link, "snippet": "$20"}]})
+        return SimpleNamespace(status_code=self.status, json=lambda: results)
+
+def _serper_scrapers():
+    with patch('scrapers.registry.get_scraper_cache', return_value=None):  # Every search hits the batcher
+        return [(name, scraper) for name, scraper in ScraperRegistry.get_all_scrapers() if name != "patents"]
+
+def test_scan_fanout_is_one_request():
+    client = FakeClient()
+    batcher = SerperBatcher(window=0.2, client=client)
+    scrapers = _serper_scrapers()
+
+    with patch.multiple('scrapers.aliexpress', get_serper_batcher=lambda: batcher), \
+         patch.multiple('scrapers.amazon', get_serper_batcher=lambda: batcher), \
+         patch.multiple('scrapers.kickstarter', get_serper_batcher=lambda: batcher), \
+         patch.multiple('scrapers.producthunt', get_serper_batcher=lambda: batcher), \
+         patch.multiple('scrapers.serper', get_serper_batcher=lambda: batcher), \
+         patch.object(settings, 'SERPER_API_KEY', 'test-key'), \
+         ThreadPoolExecutor(max_workers=len(scrapers)) as executor:
+        results = dict(zip([name for name, _ in scrapers], executor.map(lambda s: s[1].search("surf lamp"), scrapers)))
+
+    assert len(client.posts) == 1 and len(client.posts[0]) == 5
+    # Routed back to the right parser: each kept its own site's result
+    assert results["amazon"][0]["name"] == "site:amazon.com surf lamp"
+    assert results["kickstarter"][0]["name"] == "site:kickstarter.com surf lamp"
+    assert results["google"][0]["name"] == "surf lamp buy product"
+    assert batcher.snapshot() == {"requests": 1, "queries": 5, "queries_per_request": 5.0}
+    print(f"✓ 5 scrapers, 1 Serper request: {json.dumps(batcher.snapshot())}")
+
+def test_failed_batch_fails_every_query():
+    batcher = SerperBatcher(window=0.1, client=FakeClient(status=500))
+    scrapers = _serper_scrapers()[:3]
+
+    with patch.multiple('scrapers.aliexpress', get_serper_batcher=lambda: batcher), \
+         patch.multiple('scrapers.kickstarter', get_serper_batcher=lambda: batcher), \
+         patch.multiple('scrapers.amazon', get_serper_batcher=lambda: batcher), \
+         patch.object(settings, 'SERPER_API_KEY', 'test-key'), \
+         ThreadPoolExecutor(max_workers=3) as executor:
+        results = list(executor.map(lambda s: s[1].search("surf lamp"), scrapers))
+
+    assert results == [[], [], []]  # Each scraper reports its own error, none hang
+    print("✓ 500 on the batch -> every scraper returns []")
+
+def test_monitoring_ideas_share_requests():
+    client = FakeClient()
+    batcher = SerperBatcher(window=0.3, client=client)
+    ideas = [
+        SimpleNamespace(id=i, extracted_concepts=json.dumps({"search_keywords": [f"gadget {i}"]}))
+        for i in range(3)
+    ]
+    only_amazon = [("amazon", dict(_serper_scrapers())["amazon"])]
+
+    with patch.multiple('scrapers.amazon', get_serper_batcher=lambda: batcher), \
+         patch.object(ScraperRegistry, 'get_all_scrapers', return_value=only_amazon), \
+         patch.object(settings, 'SERPER_API_KEY', 'test-key'):
+        scraped = DailyRunner()._scrape_ideas(ideas)
+
+    assert sorted(scraped) == [0, 1, 2]
+    assert len(client.posts) == 1 and len(client.posts[0]) == 3
+    assert scraped[2][0]["name"] == "site:amazon.com gadget 2"
+    print("✓ 3 monitored ideas scraped with 1 Serper request")
+
+if __name__ == "__main__":
+    test_scan_fanout_is_one_request()
+    test_failed_batch_fails_every_query()
+    test_monitoring_ideas_share_requests()
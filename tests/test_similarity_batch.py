@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Test batched similarity scoring with a mocked LLM (no quota usage).
+Covers: one call per batch, index alignment, and resending only missing products.
+"""
+import sys
+import os
+import json
+import re
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import patch
+from google.api_core.exceptions import ResourceExhausted
+from llm.matcher import ConceptMatcher, PartialScoringError
+from llm.client import GeminiClient
+from config.settings import settings
+
+PRODUCTS = [
+    {"name": f"Product {i}", "url": f"https://example.com/{i}", "description": f"Desc {i}", "price": None}
+    for i in range(5)
+]
+
+def test_batch_single_call():
+    """All products answered in one response -> one LLM call"""
+    calls = []
+
+    def fake_generate(prompt, **kwargs):
+        calls.append(prompt)
+        return "```json\n" + json.dumps([
+            {"index": i, "score": 10 * i, "reasoning": f"r{i}", "user_advantage": ""}
+            for i in range(5)
+        ]) + "\n```"
+
+    with patch('llm.client.GeminiClient.generate', side_effect=fake_generate):
+        results = ConceptMatcher().calculate_similarity_batch("A surf lamp", PRODUCTS, batch_size=5)
+
+    assert len(calls) == 1
+    assert [r["score"] for r in results] == [0, 10, 20, 30, 40]
+    print("✓ 5 products scored in 1 call")
+
+def test_batch_resends_missing_only():
+    """A partial answer triggers a resend containing only the skipped products"""
+    calls = []
+
+    def fake_generate(prompt, **kwargs):
+        calls.append(prompt)
+        if len(calls) == 1:
+            # Skip products 1 and 3, plus one junk entry
+            return json.dumps([
+                {"index": 0, "score": 70, "reasoning": "a"},
+                {"index": 2, "score": 20, "reasoning": "b"},
+                {"index": 4, "score": 90, "reasoning": "c"},
+                {"index": 9, "score": 50, "reasoning": "out of range"},
+            ])
+        # Resend is re-indexed from 0: [0] = Product 1, [1] = Product 3
+        assert "Product 1" in prompt and "Product 3" in prompt
+        assert "Product 0" not in prompt
+        return json.dumps([
+            {"index": 0, "score": 61, "reasoning": "d"},
+            {"index": 1, "score": 33, "reasoning": "e"},
+        ])
+
+    with patch('llm.client.GeminiClient.generate', side_effect=fake_generate):
+        results = ConceptMatcher().calculate_similarity_batch("A surf lamp", PRODUCTS, batch_size=5)
+
+    assert len(calls) == 2
+    assert [r["score"] for r in results] == [70, 61, 20, 33, 90]
+    print("✓ Resent only the 2 missing products")
+
+def test_batch_gives_up_after_resends():
+    """Products the model never scores come back as None"""
+    def fake_generate(prompt, **kwargs):
+        if "Product 0" in prompt:
+            return json.dumps([{"index": 0, "score": 80, "reasoning": "only first"}])
+        return "Sorry, I cannot help with that."
+
+    with patch('llm.client.GeminiClient.generate', side_effect=fake_generate) as mock_generate:
+        results = ConceptMatcher().calculate_similarity_batch("A surf lamp", PRODUCTS[:2], batch_size=2, max_resends=1)
+
+    assert results[0]["score"] == 80
+    assert results[1] is None
+    assert mock_generate.call_count == 2
+    print("✓ Unscored product returned as None after 1 resend")
+
+def test_batch_scalar_response_resent():
+    """A bare JSON scalar counts as every product missing, not a crash"""
+    calls = []
+
+    def fake_generate(prompt, **kwargs):
+        calls.append(prompt)
+        if len(calls) == 1:
+            return "42"
+        return json.dumps([{"index": i, "score": 50, "reasoning": "r"} for i in range(2)])
+
+    with patch('llm.client.GeminiClient.generate', side_effect=fake_generate):
+        results = ConceptMatcher().calculate_similarity_batch("A surf lamp", PRODUCTS[:2], batch_size=2)
+
+    assert len(calls) == 2
+    assert [r["score"] for r in results] == [50, 50]
+    print("✓ Scalar response treated as all-missing and resent")
+
+def test_async_batch_runs_batches_concurrently():
+    """Async path awaits all batches together on one event loop"""
+    in_flight = []
+    peak = []
+
+    async def fake_agenerate(prompt, **kwargs):
+        in_flight.append(prompt)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.05)
+        in_flight.remove(prompt)
+        count = prompt.count("Name: Product")
+        return json.dumps([{"index": i, "score": 50, "reasoning": ""} for i in range(count)])
+
+    with patch('llm.client.GeminiClient.agenerate', side_effect=fake_agenerate):
+        results = asyncio.run(ConceptMatcher().acalculate_similarity_batch("A surf lamp", PRODUCTS, batch_size=2))
+
+    assert all(r["score"] == 50 for r in results)
+    assert max(peak) == 3  # 5 products / batch size 2 = 3 batches in flight at once
+    print("✓ 3 async batches awaited concurrently")
+
+def _fail_on_product(n):
+    def score(prompt):
+        if f"Name: Product {n}" in prompt:
+            raise ResourceExhausted("429 Resource exhausted")
+        count = prompt.count("Name: Product")
+        return json.dumps([{"index": i, "score": 80, "reasoning": ""} for i in range(count)])
+    return score
+
+def test_batch_error_keeps_finished_batches():
+    """One batch hitting a rate limit doesn't throw away the others' scores"""
+    with patch('llm.client.GeminiClient.generate', side_effect=lambda prompt, **kwargs: _fail_on_product(4)(prompt)), \
+         patch.object(settings, 'SIMILARITY_MAX_WORKERS', 1):
+        try:
+            ConceptMatcher().calculate_similarity_batch("A surf lamp", PRODUCTS, batch_size=2)
+        except PartialScoringError as e:
+            results, error = e.results, e.error
+        else:
+            raise AssertionError("Expected PartialScoringError")
+
+    assert isinstance(error, ResourceExhausted)
+    assert [r is not None for r in results] == [True, True, True, True, False]
+    print("✓ Sync: 4 scores kept, 1 product left unscored after a 429")
+
+def test_async_batch_error_keeps_finished_batches():
+    async def fake_agenerate(prompt, **kwargs):
+        if "Name: Product 4" in prompt:
+            await asyncio.sleep(0.05)  # The other batches finish first
+        return _fail_on_product(4)(prompt)
+
+    with patch('llm.client.GeminiClient.agenerate', side_effect=fake_agenerate):
+        try:
+            asyncio.run(ConceptMatcher().acalculate_similarity_batch("A surf lamp", PRODUCTS, batch_size=2))
+        except PartialScoringError as e:
+            results = e.results
+        else:
+            raise AssertionError("Expected PartialScoringError")
+
+    assert [r is not None for r in results] == [True, True, True, True, False]
+    print("✓ Async: finished batches kept after another batch's 429")
+
+def test_cascade_escalates_only_uncertain_band():
+    """Lite model scores all; only scores inside SIMILARITY_CASCADE_BAND go to the full model"""
+    lite_scores = [10, 50, 90, 70, 30]
+    full_calls = []
+
+    def fake_generate(client, prompt, **kwargs):
+        names = re.findall(r"Name: Product (\d)", prompt)
+        if client.model_name == settings.GEMINI_LITE_MODEL:
+            return json.dumps([{"index": i, "score": lite_scores[int(n)], "reasoning": "lite"} for i, n in enumerate(names)])
+        full_calls.append(names)
+        return json.dumps([{"index": i, "score": 99, "reasoning": "full"} for i in range(len(names))])
+
+    matcher = ConceptMatcher()
+    with patch.object(GeminiClient, 'generate', autospec=True, side_effect=fake_generate), \
+         patch.object(settings, 'SIMILARITY_CASCADE_BAND', (45, 75)):
+        results = matcher.calculate_similarity_cascade("A surf lamp", PRODUCTS)
+
+    assert full_calls == [["1", "3"]]
+    assert [r["score"] for r in results] == [10, 99, 90, 99, 30]
+    assert matcher.stats == {"cascade_tier1_lite": 5, "cascade_tier2_full": 2}
+    print("✓ 2 of 5 products escalated to the full model")
+
+if __name__ == "__main__":
+    test_batch_single_call()
+    test_batch_resends_missing_only()
+    test_batch_gives_up_after_resends()
+    test_batch_scalar_response_resent()
+    test_async_batch_runs_batches_concurrently()
+    test_batch_error_keeps_finished_batches()
+    test_async_batch_error_keeps_finished_batches()
+    test_cascade_escalates_only_uncertain_band()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Test the cross-scan similarity memo against an in-memory SQLite DB (no API calls).
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.helpers import memory_session
+from llm.similarity_memo import SimilarityMemo
+
+PRODUCT = {"name": "Surf Lamp", "url": "https://example.com/surf-lamp", "description": "Shows surf conditions", "price": 49.0}
+SIMILARITY = {"score": 72, "reasoning": "Same core function", "user_advantage": "Cheaper"}
+
+def test_unchanged_rescan_needs_no_llm():
+    db = memory_session()
+    memo = SimilarityMemo(db, "A smart surf lamp")
+
+    results, missing = memo.lookup([PRODUCT])
+    assert results == [None] and missing == [0]
+
+    memo.store(PRODUCT, SIMILARITY)
+    db.commit()
+
+    results, missing = SimilarityMemo(db, "A smart surf lamp").lookup([PRODUCT])
+    assert missing == []
+    assert results[0]["score"] == 72 and results[0]["reasoning"] == "Same core function"
+    print("✓ Re-scan of unchanged idea + listing served from memo")
+
+def test_changed_listing_or_idea_is_a_miss():
+    db = memory_session()
+    memo = SimilarityMemo(db, "A smart surf lamp")
+    memo.store(PRODUCT, SIMILARITY)
+    db.commit()
+
+    changed = dict(PRODUCT, description="Now with a speaker")
+    assert memo.lookup([changed])[1] == [0]
+    assert SimilarityMemo(db, "A different idea").lookup([PRODUCT])[1] == [0]
+
+    # Re-scoring the changed listing replaces the stale entry
+    memo.store(changed, dict(SIMILARITY, score=40))
+    db.commit()
+    results, missing = memo.lookup([changed, PRODUCT])
+    assert results[0]["score"] == 40 and missing == [1]
+    print("✓ Changed listing/idea re-scored, stale entry replaced")
+
+if __name__ == "__main__":
+    test_unchanged_rescan_needs_no_llm()
+    test_changed_listing_or_idea_is_a_miss()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test single-flight coalescing of concurrent identical scraper searches (no API calls).
+"""
+import sys
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import patch
+from scrapers.base_scraper import BaseScraper
+from scrapers.single_flight import SingleFlight, CoalescedScraper
+from scrapers.registry import ScraperRegistry
+
+class SlowScraper(BaseScraper):
+    def __init__(self, fail=False):
+        self.calls = 0
+        self.fail = fail
+        self._lock = threading.Lock()
+
+    def search(self, keywords):
+        with self._lock:
+            self.calls += 1
+        time.sleep(0.2)
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return [{"name": f"Lamp for {keywords}", "url": "https://x/1"}]
+
+def _run_concurrently(fn, args):
+    with ThreadPoolExecutor(max_workers=len(args)) as executor:
+        return list(executor.map(fn, args))
+
+def test_identical_searches_share_one_call():
+    flight = SingleFlight()
+    inner = SlowScraper()
+    scraper = CoalescedScraper("amazon", inner, flight)
+
+    results = _run_concurrently(scraper.search, ["surf lamp", "Surf Lamp", "lamp surf", "surf  lamp", "SURF LAMP"])
+
+    assert inner.calls == 1
+    assert all(r == results[0] for r in results)
+    results[0][0]["source"] = "amazon"
+    assert "source" not in results[1][0]  # Each caller gets its own copy
+    assert flight.stats() == {"upstream": 1, "saved": 4, "by_source": {"amazon": {"upstream": 1, "coalesced": 4}}}
+    print("✓ 5 concurrent identical searches -> 1 upstream call, 4 saved")
+
+def test_different_sources_and_later_calls_not_shared():
+    flight = SingleFlight()
+    amazon, google = SlowScraper(), SlowScraper()
+    scrapers = [CoalescedScraper("amazon", amazon, flight), CoalescedScraper("google", google, flight)]
+
+    _run_concurrently(lambda s: s.search("surf lamp"), scrapers)
+    scrapers[0].search("surf lamp")  # Nothing in flight any more
+
+    assert amazon.calls == 2 and google.calls == 1
+    assert flight.stats()["saved"] == 0
+    print("✓ Only concurrent calls for the same source + query are coalesced")
+
+def test_failure_shared_with_waiters():
+    flight = SingleFlight()
+    inner = SlowScraper(fail=True)
+    scraper = CoalescedScraper("patents", inner, flight)
+
+    def search(_):
+        try:
+            return scraper.search("surf lamp")
+        except RuntimeError as e:
+            return str(e)
+
+    assert _run_concurrently(search, range(3)) == ["upstream down"] * 3
+    assert inner.calls == 1
+    print("✓ Upstream failure reaches every waiter once")
+
+def test_registry_wraps_scrapers():
+    flight = SingleFlight()
+    with patch('scrapers.registry.get_scraper_cache', return_value=None), \
+         patch('scrapers.registry.get_single_flight', return_value=flight):
+        scrapers = ScraperRegistry.get_all_scrapers()
+    assert all(isinstance(s, CoalescedScraper) and s.flight is flight for _, s in scrapers)
+    print("✓ Registry scrapers go through single-flight")
+
+if __name__ == "__main__":
+    test_identical_searches_share_one_call()
+    test_different_sources_and_later_calls_not_shared()
+    test_failure_shared_with_waiters()
+    test_registry_wraps_scrapers()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test structured JSON output: tolerant parsing, fallback when the SDK rejects JSON mode,
+and the repair pass for malformed answers (no API calls).
+"""
+import sys
+import os
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import patch, MagicMock
+from llm.client import GeminiClient
+from llm.json_output import JSONExtractionError, SIMILARITY_SCHEMA, parse_json
+from llm.key_pool import KeyPool, KeyRoute
+from llm.matcher import ConceptMatcher
+from llm.metrics import get_llm_metrics
+from config.settings import settings
+
+def test_tolerant_parser():
+    assert parse_json('```json\n{"score": 80}\n```') == ({"score": 80}, "clean")
+    assert parse_json('Sure! Here you go:\n[{"index": 0, "score": 5},]\nHope that helps') == ([{"index": 0, "score": 5}], "extracted")
+    assert parse_json('Scores {not json} then {"score": 1}') == ({"score": 1}, "extracted")
+    for bad in ('{"score": ', "Sorry, I can't help with that.", None):
+        try:
+            parse_json(bad)
+            assert False, bad
+        except JSONExtractionError:
+            pass
+    print("✓ First valid JSON object/array extracted from noisy responses")
+
+def test_sdk_rejection_falls_back_to_plain_prompt():
+    response = MagicMock(spec=["text"])
+    response.text = '{"score": 80, "reasoning": "r"}'
+
+    def generate_content(contents, generation_config=None):
+        if generation_config is not None:
+            raise ValueError("Unknown field for GenerationConfig: response_mime_type")
+        return response
+
+    client = GeminiClient(model_name="structured-test-model")
+    route = KeyRoute("structured-test-model", "key", model=MagicMock())
+    route.model.generate_content.side_effect = generate_content
+    route.limiter = MagicMock()
+    route.limiter.acquire.return_value = 0.0
+    route.limiter.utilization.return_value = 0.0
+    client.key_pool = KeyPool([[route]])
+
+    with patch('llm.client.get_llm_cache', return_value=None):
+        assert client.generate("prompt", response_schema=SIMILARITY_SCHEMA) == response.text
+        assert client.generate("prompt", response_schema=SIMILARITY_SCHEMA) == response.text
+
+    # First call tried JSON mode once, then everything went out as plain prompts
+    kwargs = [call.kwargs for call in route.model.generate_content.call_args_list]
+    assert "generation_config" in kwargs[0]
+    assert kwargs[1:] == [{}, {}]
+    print("✓ JSON mode dropped for a model once the SDK rejects it")
+
+def test_repair_pass_fixes_malformed_json():
+    prompts = []
+
+    def fake_generate(prompt, **kwargs):
+        prompts.append(prompt)
+        if "Fix this JSON" in prompt:
+            return '{"score": 72, "reasoning": "close match"}'
+        return 'Result: {"score": 72, "reasoning": "close match"'  # Cut off mid-object
+
+    get_llm_metrics().reset()
+    matcher = ConceptMatcher()
+    with patch('llm.client.GeminiClient.generate', side_effect=fake_generate):
+        result = matcher.calculate_similarity("A surf lamp", {"name": "Surf Lamp", "description": "Lamp"})
+
+    assert result["score"] == 72
+    assert len(prompts) == 2
+    assert "Compare this invention" not in prompts[1]  # Only the broken fragment is re-sent
+    assert prompts[1].count('{"score": 72') == 1
+    assert matcher.stats == {"json_repaired_similarity": 1}
+    counters = get_llm_metrics().snapshot()[f"{settings.GEMINI_LITE_MODEL}/similarity"]
+    assert counters["llm_json_repaired_total"] == 1
+    print("✓ Malformed answer repaired with one small re-ask")
+
+def test_unrepairable_json_counted_as_failure():
+    def fake_generate(prompt, **kwargs):
+        return '{"search_keywords": ["surf lamp"'
+
+    get_llm_metrics().reset()
+    matcher = ConceptMatcher()
+    with patch('llm.client.GeminiClient.generate', side_effect=fake_generate), \
+         patch.object(settings, 'LLM_JSON_REPAIR_ATTEMPTS', 2):
+        try:
+            matcher.extract_concepts("A surf lamp")
+            assert False, "expected JSONExtractionError"
+        except ValueError as e:
+            assert isinstance(e, JSONExtractionError)
+
+    assert matcher.stats == {"json_failed_extract": 1}
+    counters = get_llm_metrics().snapshot()[f"{settings.GEMINI_MODEL}/extract"]
+    assert counters["llm_json_failed_total"] == 1
+    print(f"✓ Parse failure counted per call type: {json.dumps(counters)}")
+
+if __name__ == "__main__":
+    test_tolerant_parser()
+    test_sdk_rejection_falls_back_to_plain_prompt()
+    test_repair_pass_fixes_malformed_json()
+    test_unrepairable_json_counted_as_failure()
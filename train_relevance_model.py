@@ -0,0 +1,43 @@
+"""
+Retrain the relevance model (llm/relevance.py) from user feedback (competitors.is_relevant)
+and memoized LLM decisions (similarity_cache), then save it where scans pick it up.
+
+Usage:
+    python train_relevance_model.py
+    python train_relevance_model.py --max-miss-rate 0.01 --out relevance_model.json
+"""
+
+import argparse
+import json
+from database.connection import SessionLocal, init_db
+import database.models  # Registers the tables for init_db()
+from llm.relevance import train
+from config.settings import settings
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrain the candidate relevance model")
+    parser.add_argument("--out", default=settings.RELEVANCE_MODEL_PATH, help="Where to write the model JSON")
+    parser.add_argument("--max-miss-rate", type=float, default=settings.RELEVANCE_MAX_MISS_RATE,
+                        help="Max share of held-out real competitors the skip threshold may drop")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Share of ideas held out for validation")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        model = train(db, holdout_fraction=args.holdout, max_miss_rate=args.max_miss_rate)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    finally:
+        db.close()
+
+    model.save(args.out)
+    print(f"Validation: {json.dumps(model.validation, sort_keys=True)}")
+    if model.skip_below:
+        print(f"✅ Saved {args.out} - candidates below p={model.skip_below:.3f} will skip the LLM")
+    else:
+        print(f"⚠️  Saved {args.out}, but skipping stays off: {model.validation.get('reason')}")
+
+if __name__ == "__main__":
+    main()